@@ -13,13 +13,21 @@ REVENUES_CATEGORIES = {
     }
 
 
-def init_country():  # drop_survey_only_variables = False, simulate_f6de = False, start_from = 'imposable'
-    """Create a country-specific TaxBenefitSystem."""
+def init_country(lazy_variables = False):
+    # drop_survey_only_variables = False, simulate_f6de = False, start_from = 'imposable'
+    """Create a country-specific TaxBenefitSystem.
+
+    When `lazy_variables` is True, formula modules are not imported now, but the first time one of their variables is
+    requested (see `model.registry`).
+    """
     # from openfisca_core.columns import FloatCol
-    from openfisca_core.taxbenefitsystems import MultipleXmlBasedTaxBenefitSystem
-    from . import decompositions, entities, scenarios
-    from .model import datatrees
-    from .model import model  # Load output variables into entities. # noqa analysis:ignore
+    from openfisca_core.taxbenefitsystems import AbstractTaxBenefitSystem, MultipleXmlBasedTaxBenefitSystem
+    from . import decompositions, entities, legislation_cache, scenarios
+    from .model import datatrees, extensions, registry
+    if lazy_variables:
+        module_name_by_variable_name = registry.load_manifest()
+    else:
+        from .model import model  # Load output variables into entities. # noqa analysis:ignore
     from .model.prelevements_obligatoires.prelevements_sociaux.cotisations_sociales import preprocessing
 
     # if simulate_f6de:
@@ -65,7 +73,7 @@ def init_country():  # drop_survey_only_variables = False, simulate_f6de = False
             #     os.path.join(COUNTRY_DIR, 'assets', 'xxx', 'yyy.xml'),
             #     ('insert', 'into', 'existing', 'element'),
             #     ),
-            ] + zip(model.extensions.extensions_parameters, itertools.repeat(None))
+            ] + zip(extensions.extensions_parameters, itertools.repeat(None))
 
         preprocess_legislation = staticmethod(preprocessing.preprocess_legislation)
 
@@ -74,6 +82,34 @@ def init_country():  # drop_survey_only_variables = False, simulate_f6de = False
         REVENUES_CATEGORIES = REVENUES_CATEGORIES
         Scenario = scenarios.Scenario
 
+        def __init__(self, entity_class_by_key_plural = None):
+            # Reuse the legislation parsed & preprocessed by a previous process, when its sources didn't change.
+            self.legislation_cache = legislation_cache.LegislationCache.from_tax_benefit_system_class(
+                self.__class__)
+            legislation_json = self.legislation_cache.load_legislation_json()
+            if legislation_json is None:
+                super(TaxBenefitSystem, self).__init__(entity_class_by_key_plural = entity_class_by_key_plural)
+                self.legislation_cache.save_legislation_json(self.legislation_json)
+            else:
+                AbstractTaxBenefitSystem.__init__(self, entity_class_by_key_plural = entity_class_by_key_plural,
+                    legislation_json = legislation_json)
+            if lazy_variables:
+                self.column_by_name = registry.LazyColumnByName(self.column_by_name, module_name_by_variable_name)
+
+        def get_compact_legislation(self, instant, traced_simulation = None):
+            if traced_simulation is not None:
+                return super(TaxBenefitSystem, self).get_compact_legislation(instant,
+                    traced_simulation = traced_simulation)
+            compact_legislation = self.compact_legislation_by_instant_cache.get(instant)
+            if compact_legislation is None:
+                compact_legislation = self.legislation_cache.load_compact_legislation(instant)
+                if compact_legislation is None:
+                    compact_legislation = super(TaxBenefitSystem, self).get_compact_legislation(instant)
+                    self.legislation_cache.save_compact_legislation(instant, compact_legislation)
+                else:
+                    self.compact_legislation_by_instant_cache[instant] = compact_legislation
+            return compact_legislation
+
         def prefill_cache(self):
             # Compute one "zone APL" variable, to pre-load CSV of "code INSEE commune" to "Zone APL".
             from .model.prestations import aides_logement
@@ -0,0 +1,162 @@
+# -*- coding: utf-8 -*-
+
+"""Memory budget for the arrays computed by a simulation, with eviction of the least recently used ones.
+
+Without a budget, the holders of a simulation keep every array they compute, for every period, until the simulation
+is dropped. When a simulation is given an `ArrayCache`, each array stored by a formula is registered in it, and when
+the registered arrays exceed the budget, the least recently used ones are deleted from their holders. An evicted array
+is computed again by its formula when it is requested again.
+
+Only arrays computed by formulas are evicted: input arrays are never registered. Arrays of pinned variables (and, by
+default, of the variables requested directly, outside of any formula) are never evicted either.
+
+The cache only keeps weak references to the holders, so that it doesn't keep alive the holders of dropped simulations.
+A cache belongs to a single simulation: clones of a simulation don't use it.
+"""
+
+
+import collections
+import weakref
+
+
+class ArrayCache(object):
+    bytes = 0  # Bytes of the registered arrays
+    evicted_bytes = 0
+    evictions_count = 0
+    hits_count = 0
+    holder_ref_by_id = None  # Weak reference to each holder having registered arrays, by id
+    item_by_key = None  # (variable name, bytes) by (id(holder), period), the least recently used first
+    max_bytes = None
+    misses_count = 0
+    periods_by_holder_id = None  # Periods of the registered arrays of each holder
+    pin_requested = True  # Whether to pin the variables requested directly
+    pinned_variables_name = None
+
+    def __init__(self, max_bytes, pinned_variables_name = None, pin_requested = True):
+        self.holder_ref_by_id = {}
+        self.item_by_key = collections.OrderedDict()
+        self.max_bytes = max_bytes
+        self.periods_by_holder_id = {}
+        self.pin_requested = pin_requested
+        self.pinned_variables_name = set(pinned_variables_name or [])
+
+    def computed(self, simulation, variable_name, holder, period, stored_periods):
+        """Register the arrays stored by a computation, then evict arrays until the budget is respected.
+
+        `stored_periods` are the periods of the arrays of the holder before the computation.
+        """
+        array_by_period = holder._array_by_period
+        if stored_periods is not None and array_by_period is not None:
+            for stored_period in array_by_period:
+                if stored_period not in stored_periods:
+                    self.register(holder, variable_name, stored_period,
+                        get_stored_bytes(array_by_period, stored_period))
+        if self.bytes > self.max_bytes:
+            # The array just computed is about to be read by its caller, so it is kept.
+            self.evict(simulation, kept_variable_name = variable_name)
+
+    def evict(self, simulation, kept_variable_name = None):
+        """Delete the least recently used arrays from their holders, until the budget is respected."""
+        computing_variables_name = set(simulation.computing_variables_name)
+        computing_variables_name.add(kept_variable_name)
+        for key, (variable_name, array_bytes) in self.item_by_key.items():
+            if self.bytes <= self.max_bytes:
+                break
+            if variable_name in self.pinned_variables_name or variable_name in computing_variables_name:
+                continue
+            holder_id, period = key
+            holder = self.holder_ref_by_id[holder_id]()
+            self.unregister(holder_id, period)
+            array_by_period = holder._array_by_period if holder is not None else None
+            if array_by_period is not None and period in array_by_period:
+                del array_by_period[period]
+                self.evicted_bytes += array_bytes
+                self.evictions_count += 1
+
+    def forget(self, holder, period = None):
+        """Unregister the arrays of a holder that have been deleted (all of them when period is None)."""
+        holder_id = id(holder)
+        periods = self.periods_by_holder_id.get(holder_id)
+        if not periods:
+            return
+        for registered_period in list(periods):
+            if period is None or registered_period == period:
+                self.unregister(holder_id, registered_period)
+
+    def get_stats(self):
+        return dict(
+            arrays_count = len(self.item_by_key),
+            bytes = self.bytes,
+            evicted_bytes = self.evicted_bytes,
+            evictions_count = self.evictions_count,
+            hits_count = self.hits_count,
+            max_bytes = self.max_bytes,
+            misses_count = self.misses_count,
+            )
+
+    def pin(self, variable_name):
+        self.pinned_variables_name.add(variable_name)
+
+    def register(self, holder, variable_name, period, array_bytes):
+        holder_id = id(holder)
+        if holder_id not in self.holder_ref_by_id:
+            self_ref = weakref.ref(self)
+
+            def holder_dropped(holder_ref):
+                array_cache = self_ref()
+                if array_cache is not None:
+                    for registered_period in list(array_cache.periods_by_holder_id.get(holder_id, ())):
+                        array_cache.unregister(holder_id, registered_period)
+
+            self.holder_ref_by_id[holder_id] = weakref.ref(holder, holder_dropped)
+        key = (holder_id, period)
+        item = self.item_by_key.pop(key, None)
+        if item is not None:
+            self.bytes -= item[1]
+        self.item_by_key[key] = (variable_name, array_bytes)
+        self.periods_by_holder_id.setdefault(holder_id, set()).add(period)
+        self.bytes += array_bytes
+
+    def requested(self, variable_name, holder, period, requested_directly = False):
+        """Record a hit or a miss for a requested array, and return the periods of the arrays of its holder.
+
+        Return None for holders whose arrays are never evicted (permanent or input variables).
+        """
+        if requested_directly and self.pin_requested:
+            self.pinned_variables_name.add(variable_name)
+        if holder.column.is_permanent or holder.formula is None:
+            return None
+        array_by_period = holder._array_by_period
+        stored_periods = set(array_by_period) if array_by_period is not None else set()
+        if period in stored_periods:
+            self.hits_count += 1
+        else:
+            self.misses_count += 1
+        # Mark the arrays of the requested period as recently used.
+        holder_id = id(holder)
+        for stored_period in stored_periods:
+            if period.start <= stored_period.start and stored_period.stop <= period.stop:
+                key = (holder_id, stored_period)
+                item = self.item_by_key.pop(key, None)
+                if item is not None:
+                    self.item_by_key[key] = item
+        return stored_periods
+
+    def unpin(self, variable_name):
+        self.pinned_variables_name.discard(variable_name)
+
+    def unregister(self, holder_id, period):
+        variable_name, array_bytes = self.item_by_key.pop((holder_id, period))
+        self.bytes -= array_bytes
+        periods = self.periods_by_holder_id[holder_id]
+        periods.discard(period)
+        if not periods:
+            del self.periods_by_holder_id[holder_id]
+            del self.holder_ref_by_id[holder_id]
+
+
+def get_stored_bytes(array_by_period, period):
+    """Return the bytes of the array stored for a period, without rebuilding compact or sparse arrays."""
+    item_by_period = getattr(array_by_period, 'item_by_period', None)
+    item = item_by_period[period] if item_by_period is not None else array_by_period[period]
+    return getattr(item, 'nbytes', 0)
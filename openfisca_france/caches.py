@@ -0,0 +1,68 @@
+# -*- coding: utf-8 -*-
+
+"""On-disk caches of OpenFisca-France (compiled tables, legislation, etc).
+
+The cache directory is `~/.cache/openfisca-france` unless environment variable `OPENFISCA_FRANCE_CACHE_DIR` is set.
+Set this variable to an empty string to disable every on-disk cache.
+"""
+
+
+import errno
+import hashlib
+import logging
+import os
+import tempfile
+
+
+CACHE_DIR_ENVIRONMENT_VARIABLE = 'OPENFISCA_FRANCE_CACHE_DIR'
+
+log = logging.getLogger(__name__)
+
+
+def get_cache_dir(*sub_dirs):
+    """Return the path of a cache directory, creating it when needed.
+
+    Return None when on-disk caches are disabled or when the directory can't be created.
+    """
+    cache_dir = os.environ.get(CACHE_DIR_ENVIRONMENT_VARIABLE)
+    if cache_dir is None:
+        cache_dir = os.path.join(os.path.expanduser('~'), '.cache', 'openfisca-france')
+    elif not cache_dir:
+        return None
+    cache_dir = os.path.join(cache_dir, *sub_dirs)
+    try:
+        os.makedirs(cache_dir)
+    except OSError as exc:
+        if exc.errno != errno.EEXIST or not os.path.isdir(cache_dir):
+            log.warning(u'Disabling on-disk cache: unable to create directory {}: {}'.format(cache_dir, exc))
+            return None
+    return cache_dir
+
+
+def hash_strings(strings):
+    """Return a hexadecimal digest of an iterable of byte strings, to be used in cache file names."""
+    digest = hashlib.sha1()
+    for string in strings:
+        if isinstance(string, unicode):
+            string = string.encode('utf-8')
+        digest.update(hashlib.sha1(string).digest())
+    return digest.hexdigest()
+
+
+def write_atomically(file_path, write):
+    """Call `write(file)` on a temporary file, then move it to `file_path`.
+
+    Concurrent processes sharing the cache never read a partially written file.
+    """
+    file_dir = os.path.dirname(file_path)
+    file_descriptor, temporary_file_path = tempfile.mkstemp(dir = file_dir, suffix = '.tmp')
+    try:
+        with os.fdopen(file_descriptor, 'wb') as temporary_file:
+            write(temporary_file)
+        os.rename(temporary_file_path, file_path)
+    except (IOError, OSError) as exc:
+        log.warning(u'Unable to write cache file {}: {}'.format(file_path, exc))
+        if os.path.exists(temporary_file_path):
+            os.remove(temporary_file_path)
+        return False
+    return True
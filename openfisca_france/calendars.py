@@ -0,0 +1,28 @@
+# -*- coding: utf-8 -*-
+
+"""Calendars used to count days in payroll formulas.
+
+`numpy.busday_count` converts its `weekmask` & `holidays` arguments at each call. The calendars below are built once,
+from the holidays asset, and shared by every formula.
+"""
+
+
+from numpy import busday_count, busdaycalendar
+
+from .assets.holidays import holidays
+
+
+# Jours ouvrés : du lundi au vendredi, hors jours fériés
+calendrier_jours_ouvres = busdaycalendar(holidays = holidays)
+# Jours calendaires : tous les jours de la semaine, y compris les jours fériés
+calendrier_jours_calendaires = busdaycalendar(weekmask = '1' * 7)
+
+
+def count_jours_calendaires(debut, fin):
+    """Count calendar days in [debut, fin[, element-wise."""
+    return busday_count(debut, fin, busdaycal = calendrier_jours_calendaires)
+
+
+def count_jours_ouvres(debut, fin):
+    """Count working days (excluding holidays) in [debut, fin[, element-wise."""
+    return busday_count(debut, fin, busdaycal = calendrier_jours_ouvres)
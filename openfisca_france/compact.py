@@ -0,0 +1,109 @@
+# -*- coding: utf-8 -*-
+
+"""Storage of the arrays of a simulation in compact dtypes.
+
+When a simulation is given a float tolerance, the holders store their arrays in a `CompactArrays` mapping:
+- boolean arrays are packed, 8 cells by byte;
+- integer arrays (enumerations, counts…) are stored in the smallest of int8, int16 and int32 that holds their values;
+- float64 arrays are stored as float32 arrays, when rounding them changes no cell by more than the tolerance.
+
+Reading an array returns a new array of its original dtype, so formulas compute with the same dtypes as without compact
+storage: integers and booleans are exact, and floats differ at most by the tolerance. Use the script
+`validate_compact_dtypes.py` to compare the results of the YAML tests with and without compact storage.
+"""
+
+
+import collections
+
+import numpy as np
+
+
+class CompactArray(object):
+    """An array stored in a smaller dtype than its own."""
+    array = None  # Stored array
+    count = None
+    dtype = None  # Original dtype
+
+    def __init__(self, array, count, dtype):
+        self.array = array
+        self.count = count
+        self.dtype = dtype
+
+    @property
+    def nbytes(self):
+        return self.array.nbytes
+
+    def to_array(self):
+        if self.dtype == np.bool_:
+            return np.unpackbits(self.array)[:self.count].astype(np.bool_)
+        return self.array.astype(self.dtype)
+
+
+class CompactArrays(collections.MutableMapping):
+    """Arrays of a holder by period, stored in compact dtypes when possible.
+
+    This mapping replaces the `_array_by_period` dictionary of a holder. Getting a compact item returns a new array.
+    """
+    float_tolerance = None
+    item_by_period = None  # Array or compact array of each period
+
+    def __init__(self, float_tolerance, array_by_period = None):
+        self.float_tolerance = float_tolerance
+        self.item_by_period = {}
+        if array_by_period:
+            self.update(array_by_period)
+
+    def __contains__(self, period):
+        return period in self.item_by_period
+
+    def __delitem__(self, period):
+        del self.item_by_period[period]
+
+    def __getitem__(self, period):
+        item = self.item_by_period[period]
+        if isinstance(item, CompactArray):
+            return item.to_array()
+        return item
+
+    def __iter__(self):
+        return iter(self.item_by_period)
+
+    def __len__(self):
+        return len(self.item_by_period)
+
+    def __setitem__(self, period, array):
+        if isinstance(array, np.ndarray) and array.ndim == 1 and len(array) > 0:
+            compact_array = compact(array, self.float_tolerance)
+            if compact_array is not None:
+                array = CompactArray(compact_array, len(array), array.dtype)
+        self.item_by_period[period] = array
+
+    def copy(self):
+        # Compact arrays are never modified in place, so they can be shared.
+        new = CompactArrays(self.float_tolerance)
+        new.item_by_period = self.item_by_period.copy()
+        return new
+
+
+def compact(array, float_tolerance):
+    """Return an array holding the same values (within the tolerance for floats) in a smaller dtype, or None."""
+    if array.dtype == np.bool_:
+        return np.packbits(array)
+    if array.dtype.kind in 'iu':
+        if array.dtype.itemsize <= 1:
+            return None
+        min_value = array.min()
+        max_value = array.max()
+        for dtype in (np.int8, np.int16, np.int32):
+            if np.dtype(dtype).itemsize >= array.dtype.itemsize:
+                return None
+            info = np.iinfo(dtype)
+            if info.min <= min_value and max_value <= info.max:
+                return array.astype(dtype)
+        return None
+    if array.dtype == np.float64:
+        float32_array = array.astype(np.float32)
+        with np.errstate(invalid = 'ignore'):
+            if np.all((np.abs(float32_array - array) <= float_tolerance) | (float32_array == array)):
+                return float32_array
+    return None
@@ -0,0 +1,210 @@
+# -*- coding: utf-8 -*-
+
+"""Tables of values indexed by commune code (depcom).
+
+Depcom codes are interned as int32 INSEE codes (see `depcom_to_code`). Each table is stored as a sorted numpy array
+of codes and an aligned array of values, so that looking up a whole column of depcom codes is a single
+`searchsorted` followed by a `take`.
+
+Tables are built from the CSV & JSON files of `assets` and cached on disk as `.npz` files, keyed by a hash of their
+sources, so that the 37k-rows CSV files are parsed only once per version of the assets.
+"""
+
+
+import csv
+import json
+import logging
+import os
+
+import numpy as np
+import pkg_resources
+
+import openfisca_france
+
+from . import caches
+
+
+FORMAT_VERSION = '2'
+
+log = logging.getLogger(__name__)
+table_by_name = {}
+
+
+# Interned depcom codes
+
+
+def depcom_to_code(depcom):
+    """Convert an array of depcom strings to an array of int32 INSEE codes.
+
+    Corsican départements "2A" & "2B" are coded as "20", because their commune numbers never overlap. Empty or invalid
+    depcom are coded as 0.
+    """
+    depcom = np.asarray(depcom, dtype = 'S5')
+    digits = depcom.reshape(-1).view(np.uint8).reshape(-1, 5).astype(np.int32) - ord('0')
+    corse = (digits[:, 0] == 2) & ((digits[:, 1] == ord('A') - ord('0')) | (digits[:, 1] == ord('B') - ord('0')))
+    digits[corse, 1] = 0
+    code = digits.dot(np.array([10000, 1000, 100, 10, 1], dtype = np.int32)).astype(np.int32)
+    code[((digits < 0) | (digits > 9)).any(axis = 1)] = 0
+    return code.reshape(depcom.shape)
+
+
+def departement_from_code(code):
+    """Return the département of interned depcom codes: 1 to 95 in metropolitan France (20 for Corse), 971 to 976 in
+    overseas départements, 0 when depcom is unknown.
+    """
+    return np.where(code >= 97000, code // 100, code // 1000).astype(np.int32)
+
+
+# Tables
+
+
+class DepcomTable(object):
+    default_value = None
+    keys = None  # Sorted array of interned depcom codes
+    values = None  # Array of values, aligned with keys
+
+    def __init__(self, keys, values, default_value):
+        assert len(keys) == len(values)
+        self.default_value = default_value
+        self.keys = keys
+        self.values = values
+
+    @classmethod
+    def from_value_by_depcom(cls, value_by_depcom, default_value, dtype):
+        depcoms = value_by_depcom.keys()
+        keys = depcom_to_code(np.array(depcoms, dtype = 'S5'))
+        values = np.array([value_by_depcom[depcom] for depcom in depcoms], dtype = dtype)
+        sorted_index = keys.argsort()
+        return cls(
+            keys = keys.take(sorted_index),
+            values = values.take(sorted_index),
+            default_value = default_value,
+            )
+
+    def lookup(self, code):
+        """Return the values of an array of interned depcom codes, using default value for unknown codes.
+
+        Arrays of depcom strings are also accepted, but are interned before each lookup.
+        """
+        code = np.asarray(code)
+        if code.dtype.kind in ('S', 'U'):
+            code = depcom_to_code(code)
+        result = np.empty(code.shape, dtype = self.values.dtype)
+        result.fill(self.default_value)
+        if len(self.keys) == 0:
+            return result
+        index = self.keys.searchsorted(code)
+        np.minimum(index, len(self.keys) - 1, out = index)
+        found = self.keys.take(index) == code
+        result[found] = self.values.take(index[found])
+        return result
+
+
+# Builders of tables from their sources
+
+
+def build_versement_transport_tables(taux_csv):
+    taux_aot_by_depcom = {}
+    taux_smt_by_depcom = {}
+    for row in csv.DictReader(taux_csv.splitlines()):
+        # When a depcom appears several times (one row per postal code), keep the last one.
+        taux_aot_by_depcom[row['code INSEE']] = float(row['taux'] or 0)  # autorité organisatrice des transports
+        taux_smt_by_depcom[row['code INSEE']] = float(row['taux additionnel'] or 0)  # syndicat mixte de transport
+    return dict(
+        taux_aot = DepcomTable.from_value_by_depcom(taux_aot_by_depcom, default_value = 0.0, dtype = float),
+        taux_smt = DepcomTable.from_value_by_depcom(taux_smt_by_depcom, default_value = 0.0, dtype = float),
+        )
+
+
+def build_zone_apl_tables(zonage_csv, commune_depcom_by_subcommune_depcom_json):
+    zone_apl_by_depcom = {
+        # Keep only first char of Zonage column because of 1bis value considered equivalent to 1.
+        row['CODGEO']: int(row['Zonage'][0])
+        for row in csv.DictReader(zonage_csv.splitlines())
+        }
+    # Add subcommunes (arrondissements and communes associées), use the same value as their parent commune.
+    commune_depcom_by_subcommune_depcom = json.loads(commune_depcom_by_subcommune_depcom_json)
+    for subcommune_depcom, commune_depcom in commune_depcom_by_subcommune_depcom.iteritems():
+        zone_apl_by_depcom[str(subcommune_depcom)] = zone_apl_by_depcom[str(commune_depcom)]
+    return dict(
+        zone_apl = DepcomTable.from_value_by_depcom(zone_apl_by_depcom, default_value = 2, dtype = np.int16),
+        )
+
+
+sources_and_builder_by_group_name = dict(
+    versement_transport = (
+        ['assets/versement_transport/taux.csv'],
+        build_versement_transport_tables,
+        ),
+    zone_apl = (
+        ['assets/apl/20110914_zonage.csv', 'assets/apl/commune_depcom_by_subcommune_depcom.json'],
+        build_zone_apl_tables,
+        ),
+    )
+group_name_by_table_name = dict(
+    taux_aot = 'versement_transport',
+    taux_smt = 'versement_transport',
+    zone_apl = 'zone_apl',
+    )
+
+
+# Disk cache
+
+
+def read_tables(npz_file):
+    npz = np.load(npz_file)
+    try:
+        return {
+            key[:-len('_keys')]: DepcomTable(
+                keys = npz[key],
+                values = npz[key[:-len('_keys')] + '_values'],
+                default_value = npz[key[:-len('_keys')] + '_default'][()],
+                )
+            for key in npz.files
+            if key.endswith('_keys')
+            }
+    finally:
+        npz.close()
+
+
+def write_tables(npz_file, table_by_name):
+    array_by_name = {}
+    for name, table in table_by_name.iteritems():
+        array_by_name[name + '_default'] = np.array(table.default_value, dtype = table.values.dtype)
+        array_by_name[name + '_keys'] = table.keys
+        array_by_name[name + '_values'] = table.values
+    np.savez(npz_file, **array_by_name)
+
+
+def load_tables(group_name):
+    """Load the tables of a group, from the disk cache when it is up to date, otherwise from the assets."""
+    source_names, build = sources_and_builder_by_group_name[group_name]
+    sources = [
+        pkg_resources.resource_string(openfisca_france.__name__, source_name)
+        for source_name in source_names
+        ]
+    cache_dir = caches.get_cache_dir('depcom_tables')
+    file_path = os.path.join(cache_dir, '{}-{}.npz'.format(group_name, caches.hash_strings([FORMAT_VERSION] + sources))
+        ) if cache_dir is not None else None
+    if file_path is not None and os.path.exists(file_path):
+        try:
+            return read_tables(file_path)
+        except (IOError, KeyError, ValueError) as exc:
+            log.warning(u'Ignoring invalid depcom tables cache file {}: {}'.format(file_path, exc))
+    group_table_by_name = build(*sources)
+    if file_path is not None:
+        caches.write_atomically(file_path, lambda npz_file: write_tables(npz_file, group_table_by_name))
+    return group_table_by_name
+
+
+def get_table(name):
+    table = table_by_name.get(name)
+    if table is None:
+        table_by_name.update(load_tables(group_name_by_table_name[name]))
+        table = table_by_name[name]
+    return table
+
+
+def lookup(name, code):
+    """Return the values of table `name` for an array of interned depcom codes."""
+    return get_table(name).lookup(code)
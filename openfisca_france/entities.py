@@ -5,8 +5,24 @@ import itertools
 
 from openfisca_core import entities
 
+from . import segments as segments_module
 
-class Entreprises(entities.AbstractEntity):
+
+class AbstractGroupEntity(entities.AbstractEntity):
+    _segments = None
+
+    @property
+    def segments(self):
+        """Segments of the members of each entity, to reduce persons arrays to this entity. See module segments."""
+        persons_holder_by_name = self.simulation.persons.holder_by_name
+        entity_index = persons_holder_by_name[self.index_for_person_variable_name].array
+        role = persons_holder_by_name[self.role_for_person_variable_name].array
+        if self._segments is None or not self._segments.is_up_to_date(entity_index, role, self.count):
+            self._segments = segments_module.EntitySegments(entity_index, role, self.count)
+        return self._segments
+
+
+class Entreprises(AbstractGroupEntity):
     column_by_name = collections.OrderedDict()
     index_for_person_variable_name = 'entreprise_id'
     key_plural = 'entreprises'
@@ -29,7 +45,7 @@ class Entreprises(entities.AbstractEntity):
             yield salarie_role, salarie_id
 
 
-class Familles(entities.AbstractEntity):
+class Familles(AbstractGroupEntity):
     column_by_name = collections.OrderedDict()
     index_for_person_variable_name = 'idfam'
     key_plural = 'familles'
@@ -61,7 +77,7 @@ class Familles(entities.AbstractEntity):
                 yield enfant_role, enfant_id
 
 
-class FoyersFiscaux(entities.AbstractEntity):
+class FoyersFiscaux(AbstractGroupEntity):
     column_by_name = collections.OrderedDict()
     index_for_person_variable_name = 'idfoy'
     key_plural = 'foyers_fiscaux'
@@ -102,7 +118,7 @@ class Individus(entities.AbstractEntity):
     symbol = 'ind'
 
 
-class Menages(entities.AbstractEntity):
+class Menages(AbstractGroupEntity):
     column_by_name = collections.OrderedDict()
     index_for_person_variable_name = 'idmen'
     key_plural = 'menages'
@@ -0,0 +1,149 @@
+# -*- coding: utf-8 -*-
+
+"""Numerical inversion of formulas, element-wise, for the reforms that compute a brut income from a net one.
+
+The inverted formula is evaluated in a single scratch copy of the simulation (see `ScratchSimulation`), and each row
+is solved by a bracketed secant method (see `solve_increasing`). Rows stop moving as soon as they have converged.
+When the formula is piecewise linear with known breakpoints, it is first inverted segment by segment (see
+`invert_piecewise_linear`), so that the secant method usually stops after its first evaluation.
+"""
+
+
+from __future__ import division
+
+import logging
+
+import numpy as np
+
+from . import simulations
+
+
+log = logging.getLogger(__name__)
+
+
+class ScratchSimulation(object):
+    """A copy of a simulation, where a target variable is computed again and again from different input values.
+
+    The simulation is cloned once. Between two evaluations, only the arrays computed from the input variable are
+    deleted, when the simulation records the dependencies of its variables (see `simulations.Simulation`). Otherwise,
+    the holders created by the previous evaluation are removed, so that the input variables of the original simulation
+    are kept.
+    """
+    input_name = None
+    input_variables_name = None  # Names of the holders kept between two evaluations
+    period = None
+    simulation = None
+    target_name = None
+
+    def __init__(self, simulation, input_name, target_name, period, excluded_variables_name = None):
+        self.input_name = input_name
+        self.period = period
+        self.target_name = target_name
+        self.simulation = simulation.clone(debug = simulation.debug, debug_all = simulation.debug_all,
+            trace = simulation.trace)
+        # The clone shares this dictionary with the original simulation, which may be computing the input variable.
+        self.simulation.requested_periods_by_variable_name = {}
+        # Calculated variable holders may contain values computed from an other value of the input variable.
+        excluded_variables_name = set(excluded_variables_name or [])
+        excluded_variables_name.update([input_name, target_name])
+        for name in excluded_variables_name:
+            self.simulation.holder_by_name.pop(name, None)
+        self.input_variables_name = set(self.simulation.holder_by_name)
+
+    def calculate(self, input_array):
+        """Return the target variable computed from the given values of the input variable."""
+        simulation = self.simulation
+        if isinstance(simulation, simulations.Simulation):
+            simulation.invalidate(self.input_name)
+        else:
+            for name in set(simulation.holder_by_name) - self.input_variables_name:
+                del simulation.holder_by_name[name]
+        simulation.get_or_new_holder(self.input_name).put_in_cache(input_array, self.period)
+        return simulation.calculate_add(self.target_name, self.period)
+
+
+def invert_piecewise_linear(function, target, breakpoints, **solve_options):
+    """Solve `function(x) == target` element-wise, for an increasing function that is linear between breakpoints.
+
+    `breakpoints` is a (K × N) array of the values of x where the slope of each row may change, sorted along the first
+    axis. The function is evaluated once at each breakpoint, then each row is inverted on the segment that contains its
+    target. Rows whose function is not exactly piecewise linear (rounding, missing breakpoints…) are then solved by
+    `solve_increasing`, starting from this first solution.
+    """
+    target = np.asarray(target, dtype = np.float64)
+    breakpoints = np.asarray(breakpoints, dtype = np.float64)
+    assert len(breakpoints) >= 2
+    values = np.array([function(x) for x in breakpoints], dtype = np.float64)
+    # Index of the segment of each row that contains its target, extrapolating the first and last segments.
+    segment_index = np.clip((values <= target).sum(axis = 0) - 1, 0, len(breakpoints) - 2)
+    columns = np.arange(len(target))
+    lower = breakpoints[segment_index, columns]
+    lower_value = values[segment_index, columns]
+    with np.errstate(divide = 'ignore', invalid = 'ignore'):
+        slope = (values[segment_index + 1, columns] - lower_value) / (breakpoints[segment_index + 1, columns] - lower)
+        x = np.where(slope > 0, lower + (target - lower_value) / slope, lower)
+    return solve_increasing(function, target, x, **solve_options)
+
+
+def solve_increasing(function, target, guess, max_iterations = 50, tolerance = 0.01, xtolerance = 0.01):
+    """Solve `function(x) == target` element-wise, for a function increasing in each element of x.
+
+    Each row is solved by a secant method, that becomes a false position method (Illinois variant) as soon as the
+    solution of the row is bracketed. A row has converged when its value is within `tolerance` of its target, or when
+    its bracket is narrower than `xtolerance`. The solution of a row that has converged is no longer modified.
+    """
+    target = np.asarray(target, dtype = np.float64)
+    x = np.array(guess, dtype = np.float64)
+    count = len(target)
+    lower = np.empty(count)
+    lower.fill(-np.inf)
+    lower_error = np.zeros(count)
+    upper = np.empty(count)
+    upper.fill(np.inf)
+    upper_error = np.zeros(count)
+    last_side = np.zeros(count, dtype = np.int8)  # -1 when lower was updated last, 1 for upper
+    previous_x = None
+    previous_error = None
+    slope = np.ones(count)
+    converged = np.zeros(count, dtype = np.bool_)
+    for iteration in xrange(max_iterations):
+        error = np.asarray(function(x), dtype = np.float64) - target
+        active = ~converged
+        converged |= np.abs(error) <= tolerance
+        if converged.all():
+            return x
+
+        # Update the bracket of each row.
+        below = active & (error < 0)
+        above = active & (error > 0)
+        # Illinois variant: when the same side is updated twice in a row, halve the error of the other side.
+        upper_error = np.where(below & (last_side == -1), upper_error / 2, upper_error)
+        lower_error = np.where(above & (last_side == 1), lower_error / 2, lower_error)
+        lower = np.where(below, x, lower)
+        lower_error = np.where(below, error, lower_error)
+        upper = np.where(above, x, upper)
+        upper_error = np.where(above, error, upper_error)
+        last_side = np.where(below, -1, np.where(above, 1, last_side)).astype(np.int8)
+        bracketed = np.isfinite(lower) & np.isfinite(upper)
+        converged |= bracketed & (upper - lower <= xtolerance)
+        if converged.all():
+            return x
+
+        # Estimate the slope of each row from the last two evaluations.
+        if previous_x is not None:
+            delta_x = x - previous_x
+            secant_slope = (error - previous_error) / np.where(delta_x == 0, 1, delta_x)
+            slope = np.where((delta_x != 0) & (secant_slope > 0), secant_slope, slope)
+        previous_x = x
+        previous_error = error
+
+        with np.errstate(divide = 'ignore', invalid = 'ignore'):
+            false_position = lower - lower_error * (upper - lower) / (upper_error - lower_error)
+            next_x = np.where(bracketed, false_position, x - error / slope)
+            # Stay strictly inside the bracket.
+            next_x = np.where(bracketed & ~((lower < next_x) & (next_x < upper)), (lower + upper) / 2, next_x)
+        x = np.where(converged, x, next_x)
+
+    log.warning(u'Inversion did not converge for {} rows after {} iterations'.format((~converged).sum(),
+        max_iterations))
+    return x
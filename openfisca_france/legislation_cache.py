@@ -0,0 +1,95 @@
+# -*- coding: utf-8 -*-
+
+"""On-disk cache of the compiled legislation.
+
+Parsing `param.xml` and the parameters of extensions, then preprocessing the legislation, dominates the creation of a
+TaxBenefitSystem. The preprocessed legislation JSON and the compact legislations generated from it are pickled in a
+cache directory whose name is a hash of the XML sources and of the preprocessing code, so that any change of these
+sources invalidates the cache.
+"""
+
+
+import cPickle as pickle
+import inspect
+import logging
+import os
+import sys
+
+from . import caches
+from .model import base
+
+
+FORMAT_VERSION = '1'
+
+log = logging.getLogger(__name__)
+
+
+def get_core_version():
+    try:
+        import pkg_resources
+        return pkg_resources.get_distribution('OpenFisca-Core').version
+    except Exception:  # pkg_resources raises various exceptions when distribution is not installed.
+        return None
+
+
+def get_legislation_key(legislation_xml_info_list, preprocess_legislation = None):
+    """Return a hash of the legislation sources: XML files, their insertion paths and preprocessing code."""
+    strings = [FORMAT_VERSION, str(get_core_version())]
+    for xml_file_path, path_in_legislation in legislation_xml_info_list:
+        strings.append(repr(path_in_legislation))
+        with open(xml_file_path, 'rb') as xml_file:
+            strings.append(xml_file.read())
+    if preprocess_legislation is not None:
+        preprocessing_module = sys.modules[preprocess_legislation.__module__]
+        # Preprocessing depends on the CAT enumeration of model/base.py.
+        for module in (preprocessing_module, base):
+            with open(inspect.getsourcefile(module), 'rb') as source_file:
+                strings.append(source_file.read())
+    return caches.hash_strings(strings)
+
+
+class LegislationCache(object):
+    cache_dir = None  # None when on-disk caches are disabled
+
+    def __init__(self, key):
+        self.cache_dir = caches.get_cache_dir('legislations', key)
+
+    @classmethod
+    def from_tax_benefit_system_class(cls, tax_benefit_system_class):
+        return cls(get_legislation_key(
+            tax_benefit_system_class.legislation_xml_info_list,
+            preprocess_legislation = tax_benefit_system_class.preprocess_legislation,
+            ))
+
+    def load(self, file_name):
+        if self.cache_dir is None:
+            return None
+        file_path = os.path.join(self.cache_dir, file_name)
+        if not os.path.exists(file_path):
+            return None
+        try:
+            with open(file_path, 'rb') as pickle_file:
+                return pickle.load(pickle_file)
+        except Exception as exc:  # Unpickling can raise almost any exception.
+            log.warning(u'Ignoring invalid legislation cache file {}: {}'.format(file_path, exc))
+            return None
+
+    def load_compact_legislation(self, instant):
+        return self.load('compact-{}.pickle'.format(instant))
+
+    def load_legislation_json(self):
+        return self.load('legislation.pickle')
+
+    def save(self, file_name, value):
+        if self.cache_dir is None:
+            return
+        caches.write_atomically(
+            os.path.join(self.cache_dir, file_name),
+            lambda pickle_file: pickle.dump(value, pickle_file, pickle.HIGHEST_PROTOCOL),
+            )
+
+    def save_compact_legislation(self, instant, compact_legislation):
+        self.save('compact-{}.pickle'.format(instant), compact_legislation)
+
+    def save_legislation_json(self, legislation_json):
+        self.save('legislation.pickle', legislation_json)
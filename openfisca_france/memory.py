@@ -0,0 +1,158 @@
+# -*- coding: utf-8 -*-
+
+"""Accounting of the memory held by the arrays of a simulation, by variable, period and entity.
+
+`get_memory_rows` lists the arrays stored in the holders of a simulation. An array that is a view of an array already
+listed (for example a clone sharing its arrays, or a projection returning the same array) is flagged as shared and
+counted only once. Optionally, arrays that have the same content as another array (for example the same input copied
+in each month) are flagged as duplicated. Projections between persons and entities (`EntityToPersonColumn` and
+`PersonToEntityColumn`) and arrays that only contain the default value of their column (mostly unused cerfa fields)
+are flagged too. Sparse arrays (see module sparse) are listed as their indexes and values, and compact arrays (see
+module compact) in their stored dtype.
+
+A `MemoryInspector` given to a simulation takes snapshots of this report during a run: after the computation of some
+variables, or every N computations.
+"""
+
+
+import collections
+import hashlib
+import json
+
+import numpy as np
+from openfisca_core import formulas
+
+from . import compact, panels, sparse
+
+
+class MemoryInspector(object):
+    computations_count = 0
+    every = None  # Take a snapshot every N computations
+    snapshots = None
+    variables_name = None  # Take a snapshot after the computation of these variables
+
+    def __init__(self, every = None, variables_name = None):
+        self.every = every
+        self.snapshots = []
+        self.variables_name = frozenset(variables_name or [])
+
+    def computed(self, simulation, variable_name):
+        """Take a snapshot when required, after the computation of a variable."""
+        self.computations_count += 1
+        if variable_name in self.variables_name or self.every and self.computations_count % self.every == 0:
+            self.take_snapshot(simulation, u'{} (computation {})'.format(variable_name, self.computations_count))
+
+    def take_snapshot(self, simulation, label = None, find_duplicates = False, variables_count = 20):
+        """Record the total memory of the simulation, by entity, and its biggest variables."""
+        rows = get_memory_rows(simulation, find_duplicates = find_duplicates)
+        bytes_by_variable_name = get_bytes_by(rows, 'variable')
+        snapshot = dict(
+            bytes = sum(row['bytes'] for row in rows),
+            bytes_by_entity = get_bytes_by(rows, 'entity'),
+            computations_count = self.computations_count,
+            label = label,
+            projections_bytes = sum(row['bytes'] for row in rows if row['projection']),
+            top_variables = sorted(bytes_by_variable_name.iteritems(), key = lambda item: item[1],
+                reverse = True)[:variables_count],
+            )
+        if find_duplicates:
+            snapshot['duplicated_bytes'] = sum(row['bytes'] for row in rows if row['duplicate_of'] is not None)
+        self.snapshots.append(snapshot)
+        return snapshot
+
+    def write_snapshots(self, file_path):
+        with open(file_path, 'w') as snapshots_file:
+            json.dump(self.snapshots, snapshots_file, indent = 2)
+
+
+def get_bytes_by(rows, key):
+    """Return the total bytes of the given rows by value of a key (variable, period, entity…)."""
+    bytes_by_key = collections.defaultdict(int)
+    for row in rows:
+        bytes_by_key[row[key]] += row['bytes']
+    return dict(bytes_by_key)
+
+
+def get_memory_rows(simulation, find_duplicates = False):
+    """Return a row for each array stored by the holders of a simulation.
+
+    Each row gives the variable, its entity, the period, the number of cells, the bytes of the array (0 when the array
+    is a view of an array already listed, given by `shared_with`) and flags. When `find_duplicates` is true, the content
+    of the arrays is hashed to find arrays equal to another one (`duplicate_of`).
+    """
+    rows = []
+    row_by_buffer_id = {}
+    row_by_content_key = {}
+    for variable_name, holder in sorted(simulation.holder_by_name.iteritems()):
+        column = holder.column
+        projection = isinstance(holder.formula, (formulas.EntityToPerson, formulas.PersonToEntity))
+        for period, kind, array in iter_holder_arrays(holder):
+            buffer = get_buffer(array)
+            row = dict(
+                all_default = kind == 'array' and array.dtype.kind in 'biuf' and array.size > 0
+                    and bool((array == column.default).all()),
+                bytes = 0,
+                cells = array.size,
+                dtype = unicode(array.dtype),
+                duplicate_of = None,
+                entity = holder.entity.key_plural,
+                kind = kind,
+                period = unicode(period) if period is not None else None,
+                projection = projection,
+                shared_with = None,
+                variable = variable_name,
+                )
+            owner_row = row_by_buffer_id.get(id(buffer))
+            if owner_row is None:
+                row_by_buffer_id[id(buffer)] = row
+                row['bytes'] = buffer.nbytes
+            else:
+                row['shared_with'] = (owner_row['variable'], owner_row['period'])
+            if find_duplicates and owner_row is None and kind == 'array' and array.dtype.kind != 'O':
+                content_key = (array.dtype.str, array.shape, hashlib.md5(np.ascontiguousarray(array).view(
+                    np.uint8)).hexdigest())
+                original_row = row_by_content_key.setdefault(content_key, row)
+                if original_row is not row:
+                    row['duplicate_of'] = (original_row['variable'], original_row['period'])
+            rows.append(row)
+    return rows
+
+
+def get_buffer(array):
+    """Return the array that owns the memory of an array."""
+    while isinstance(array.base, np.ndarray):
+        array = array.base
+    return array
+
+
+def iter_holder_arrays(holder):
+    """Iterate on the (period, kind, array) of the arrays stored by a holder."""
+    if holder._array is not None:
+        yield None, 'array', holder._array
+    array_by_period = holder._array_by_period
+    if array_by_period is None:
+        return
+    if isinstance(array_by_period, panels.MonthlyPanels):
+        for year, panel in sorted(array_by_period.panel_by_year.iteritems()):
+            panel.flush()
+            yield year, 'panel', panel.array
+            if panel.cumulative_sums is not None:
+                yield year, 'cumulative_sums', panel.cumulative_sums
+        array_by_period = array_by_period.array_by_other_period
+    elif isinstance(array_by_period, compact.CompactArrays):
+        for period, item in sorted(array_by_period.item_by_period.iteritems()):
+            if isinstance(item, compact.CompactArray):
+                yield period, 'compact', item.array
+            else:
+                yield period, 'array', item
+        return
+    elif isinstance(array_by_period, sparse.SparseArrays):
+        for period, item in sorted(array_by_period.item_by_period.iteritems()):
+            if isinstance(item, sparse.SparseArray):
+                yield period, 'sparse_index', item.index
+                yield period, 'sparse_values', item.values
+            else:
+                yield period, 'array', item
+        return
+    for period, array in sorted(array_by_period.iteritems()):
+        yield period, 'array', array
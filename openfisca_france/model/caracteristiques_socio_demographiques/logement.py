@@ -1,9 +1,6 @@
 # -*- coding: utf-8 -*-
 
-from numpy import logical_not as not_, logical_or as or_
-from numpy.core.defchararray import startswith
-
-
+from ... import depcom_tables
 from ..base import *  # noqa analysis:ignore
 
 
@@ -12,6 +9,18 @@ build_column('coloc', BoolCol(label = u"Vie en colocation"))
 build_column('depcom', FixedStrCol(label = u"Code INSEE (depcom) du lieu de résidence", entity = 'men', max_length = 5))
 
 
+class code_insee_commune(Variable):
+    column = IntCol
+    entity_class = Menages
+    label = u"Code INSEE (depcom) du lieu de résidence, sous forme d'entier"
+    # Surveys may give this integer code directly, instead of the depcom strings.
+
+    def function(self, simulation, period):
+        depcom = simulation.calculate('depcom', period)
+
+        return period, depcom_tables.depcom_to_code(depcom)
+
+
 build_column('logement_chambre', BoolCol(label = u"Le logement est considéré comme une chambre"))
 
 class loyer(Variable):
@@ -44,7 +53,8 @@ class statut_occupation_logement(Variable):
             u"Locataire ou sous-locataire d'un logement loué vide non-HLM",
             u"Locataire ou sous-locataire d'un logement loué meublé ou d'une chambre d'hôtel",
             u"Logé gratuitement par des parents, des amis ou l'employeur",
-            u"Locataire d'un foyer (résidence universitaire, maison de retraite, foyer de jeune travailleur, résidence sociale...)",
+            u"Locataire d'un foyer (résidence universitaire, maison de retraite, foyer de jeune travailleur, "
+                u"résidence sociale...)",
             u"Sans domicile stable"])
     )
     entity_class = Menages
@@ -57,12 +67,10 @@ class residence_dom(Variable):
     entity_class = Familles
 
     def function(self, simulation, period):
-        residence_guadeloupe = simulation.calculate('residence_guadeloupe', period)
-        residence_martinique = simulation.calculate('residence_martinique', period)
-        residence_guyane = simulation.calculate('residence_guyane', period)
-        residence_reunion = simulation.calculate('residence_reunion', period)
-        residence_mayotte = simulation.calculate('residence_mayotte', period)
-        return period, or_(or_(residence_guadeloupe, residence_martinique), or_(or_(residence_reunion, residence_guyane), residence_mayotte))
+        departement = get_departement_chef(self, simulation, period)
+
+        # Saint-Pierre-et-Miquelon (975) is not a DOM.
+        return period, (departement >= 971) * (departement <= 976) * (departement != 975)
 
 
 class residence_guadeloupe(Variable):
@@ -70,11 +78,9 @@ class residence_guadeloupe(Variable):
     entity_class = Familles
 
     def function(self, simulation, period):
-        depcom_holder = simulation.compute('depcom', period)
+        departement = get_departement_chef(self, simulation, period)
 
-        depcom = self.cast_from_entity_to_roles(depcom_holder)
-        depcom = self.filter_role(depcom, role = CHEF)
-        return period, startswith(depcom, '971')
+        return period, departement == 971
 
 
 class residence_martinique(Variable):
@@ -82,11 +88,9 @@ class residence_martinique(Variable):
     entity_class = Familles
 
     def function(self, simulation, period):
-        depcom_holder = simulation.compute('depcom', period)
+        departement = get_departement_chef(self, simulation, period)
 
-        depcom = self.cast_from_entity_to_roles(depcom_holder)
-        depcom = self.filter_role(depcom, role = CHEF)
-        return period, startswith(depcom, '972')
+        return period, departement == 972
 
 
 class residence_guyane(Variable):
@@ -94,11 +98,9 @@ class residence_guyane(Variable):
     entity_class = Familles
 
     def function(self, simulation, period):
-        depcom_holder = simulation.compute('depcom', period)
+        departement = get_departement_chef(self, simulation, period)
 
-        depcom = self.cast_from_entity_to_roles(depcom_holder)
-        depcom = self.filter_role(depcom, role = CHEF)
-        return period, startswith(depcom, '973')
+        return period, departement == 973
 
 
 class residence_reunion(Variable):
@@ -106,11 +108,9 @@ class residence_reunion(Variable):
     entity_class = Familles
 
     def function(self, simulation, period):
-        depcom_holder = simulation.compute('depcom', period)
+        departement = get_departement_chef(self, simulation, period)
 
-        depcom = self.cast_from_entity_to_roles(depcom_holder)
-        depcom = self.filter_role(depcom, role = CHEF)
-        return period, startswith(depcom, '974')
+        return period, departement == 974
 
 
 class residence_mayotte(Variable):
@@ -118,8 +118,15 @@ class residence_mayotte(Variable):
     entity_class = Familles
 
     def function(self, simulation, period):
-        depcom_holder = simulation.compute('depcom', period)
+        departement = get_departement_chef(self, simulation, period)
+
+        return period, departement == 976
+
+
+def get_departement_chef(formula, simulation, period):
+    """Return the département of the ménage of the chef of each famille, without storing it."""
+    code_insee_commune_holder = simulation.compute('code_insee_commune', period)
 
-        depcom = self.cast_from_entity_to_roles(depcom_holder)
-        depcom = self.filter_role(depcom, role = CHEF)
-        return period, startswith(depcom, '976')
+    code_insee_commune = formula.cast_from_entity_to_roles(code_insee_commune_holder)
+    code_insee_commune = formula.filter_role(code_insee_commune, role = CHEF)
+    return depcom_tables.departement_from_code(code_insee_commune)
@@ -2874,10 +2874,11 @@ class ppe_brute(Variable):
         nbH = simulation.calculate('nbH', period)
         ppe = simulation.legislation_at(period.start).ir.credits_impot.ppe
 
-        ppe_base = self.split_by_roles(ppe_base_holder)
-        ppe_coef_tp = self.split_by_roles(ppe_coef_tp_holder)
-        ppe_elig_i = self.split_by_roles(ppe_elig_i_holder)
-        ppe_rev = self.split_by_roles(ppe_rev_holder)
+        # Only split the roles used below, instead of every role of the foyer fiscal.
+        ppe_base = self.split_by_roles(ppe_base_holder, roles = [VOUS, CONJ, PAC1, PAC2])
+        ppe_coef_tp = self.split_by_roles(ppe_coef_tp_holder, roles = [VOUS, CONJ, PAC1, PAC2])
+        ppe_elig_i = self.split_by_roles(ppe_elig_i_holder, roles = [VOUS, CONJ, PAC1, PAC2, PAC3])
+        ppe_rev = self.split_by_roles(ppe_rev_holder, roles = [VOUS, CONJ])
 
         eliv, elic, eli1, eli2, eli3 = ppe_elig_i[VOUS], ppe_elig_i[CONJ], ppe_elig_i[PAC1], \
             ppe_elig_i[PAC2], ppe_elig_i[PAC3]
@@ -2,11 +2,10 @@
 
 from __future__ import division
 
-from functools import partial
 import logging
 
 from numpy import (
-    busday_count as original_busday_count, datetime64, logical_not as not_, logical_or as or_, logical_and as and_,
+    datetime64, logical_not as not_, logical_or as or_, logical_and as and_,
     maximum as max_, minimum as min_, round as round_, timedelta64
     )
 from datetime import datetime
@@ -15,7 +14,7 @@ from datetime import datetime
 from openfisca_core import periods
 
 from ....base import *  # noqa analysis:ignore
-from .....assets.holidays import holidays
+from ..... import calendars
 
 
 log = logging.getLogger(__name__)
@@ -61,12 +60,11 @@ class coefficient_proratisation(Variable):
         # Décompte des jours en début et fin de contrat
         # http://www.gestiondelapaie.com/flux-paie/?1029-la-bonne-premiere-paye
 
-        busday_count = partial(original_busday_count, holidays = holidays)
         debut_mois = datetime64(period.start.offset('first-of', 'month'))
         fin_mois = datetime64(period.start.offset('last-of', 'month')) + timedelta64(1, 'D')
 
         mois_incomplet = or_(contrat_de_travail_debut > debut_mois, contrat_de_travail_fin < fin_mois)
-        jours_travailles = busday_count(
+        jours_travailles = calendars.count_jours_ouvres(
             max_(contrat_de_travail_debut, debut_mois),
             min_(contrat_de_travail_fin, fin_mois)
             )
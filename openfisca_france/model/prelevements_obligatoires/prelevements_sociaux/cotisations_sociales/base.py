@@ -1,7 +1,180 @@
 # -*- coding: utf-8 -*-
 
+import weakref
+
+import numpy as np
+from numpy import maximum as max_, minimum as min_
+from openfisca_core.taxscales import MarginalRateTaxScale
+
 from ....base import CAT
 
+
+# Compiled baremes, by legislation node they are compiled from, dropped with their node
+compiled_baremes_by_node = weakref.WeakKeyDictionary()
+# Matrix of cotisations of the last period computed by apply_bareme, by cotisation type, by simulation
+cotisations_matrix_by_type_by_simulation = weakref.WeakKeyDictionary()
+
+
+class CompiledBaremes(object):
+    """Baremes of every category of salarié, compiled into threshold & rate arrays indexed by category.
+
+    `thresholds[category, bareme, bracket]` and `rates[category, bareme, bracket]` stack the marginal rate tax scales of
+    a `cotisations_employeur` or `cotisations_salarie` node. Missing baremes and brackets are padded with infinite
+    thresholds and null rates, so that every bareme can be evaluated at once for every salarié.
+
+    The compiled baremes don't keep a reference to their node, so that they are dropped with it.
+    """
+    index_by_bareme_name = None
+    rates = None
+    thresholds = None
+
+    def __init__(self, bareme_by_type_sal_name):
+        bareme_by_name_by_type_sal_index = {}
+        other_baremes_name = set()
+        for type_sal_name, type_sal_index in CAT:
+            if type_sal_name not in bareme_by_type_sal_name:  # to deal with public_titulaire_militaire
+                continue
+            bareme_by_name = bareme_by_name_by_type_sal_index[type_sal_index] = {}
+            for bareme_name, bareme in bareme_by_type_sal_name[type_sal_name].iteritems():
+                if isinstance(bareme, MarginalRateTaxScale):
+                    bareme_by_name[bareme_name] = bareme
+                else:
+                    other_baremes_name.add(bareme_name)
+        # Baremes that are not marginal rate tax scales in every category are left to their own calc method.
+        baremes_name = sorted(
+            set(
+                bareme_name
+                for bareme_by_name in bareme_by_name_by_type_sal_index.itervalues()
+                for bareme_name in bareme_by_name
+                ).difference(other_baremes_name)
+            )
+        self.index_by_bareme_name = dict(
+            (bareme_name, bareme_index)
+            for bareme_index, bareme_name in enumerate(baremes_name)
+            )
+        brackets_count = max([
+            len(bareme.thresholds)
+            for bareme_by_name in bareme_by_name_by_type_sal_index.itervalues()
+            for bareme in bareme_by_name.itervalues()
+            ] or [1])
+        categories_count = max(type_sal_index for type_sal_name, type_sal_index in CAT) + 1
+        self.thresholds = np.empty((categories_count, len(baremes_name), brackets_count + 1))
+        self.thresholds.fill(np.inf)
+        self.rates = np.zeros((categories_count, len(baremes_name), brackets_count))
+        for type_sal_index, bareme_by_name in bareme_by_name_by_type_sal_index.iteritems():
+            for bareme_name, bareme in bareme_by_name.iteritems():
+                bareme_index = self.index_by_bareme_name.get(bareme_name)
+                if bareme_index is None:
+                    continue
+                self.thresholds[type_sal_index, bareme_index, :len(bareme.thresholds)] = bareme.thresholds
+                self.rates[type_sal_index, bareme_index, :len(bareme.rates)] = bareme.rates
+
+    def calc(self, categorie_salarie, base, factor, baremes_name = None, round_base_decimals = None):
+        """Compute the baremes (all of them by default) for every salarié, in a single pass grouped by category.
+
+        Return a matrix with one row by bareme (in the order of `baremes_name`) and one column by salarié.
+        """
+        if baremes_name is None:
+            baremes_index = slice(None)
+            baremes_count = len(self.index_by_bareme_name)
+        else:
+            baremes_index = [self.index_by_bareme_name[bareme_name] for bareme_name in baremes_name]
+            baremes_count = len(baremes_index)
+        base = np.asarray(base, dtype = float)
+        factor = np.ones(len(base)) * factor
+        cotisations = np.zeros((baremes_count, len(base)))
+
+        categories_count = self.rates.shape[0]
+        order = np.argsort(categorie_salarie, kind = 'mergesort')
+        bounds = np.searchsorted(categorie_salarie[order], np.arange(categories_count + 1))
+        for type_sal_index in xrange(categories_count):
+            members = order[bounds[type_sal_index]:bounds[type_sal_index + 1]]
+            rates = self.rates[type_sal_index, baremes_index]
+            if len(members) == 0 or not rates.any():
+                continue
+            cotisations[:, members] = calc_marginal_rates(
+                self.thresholds[type_sal_index, baremes_index],
+                rates,
+                base[members],
+                factor[members],
+                round_base_decimals = round_base_decimals,
+                ).T
+        return cotisations
+
+    @classmethod
+    def get(cls, bareme_by_type_sal_name):
+        compiled_baremes = compiled_baremes_by_node.get(bareme_by_type_sal_name)
+        if compiled_baremes is None:
+            compiled_baremes = compiled_baremes_by_node[bareme_by_type_sal_name] = cls(bareme_by_type_sal_name)
+        return compiled_baremes
+
+
+class CotisationsMatrix(object):
+    """Cotisations of every compiled bareme, computed by apply_bareme for a given period.
+
+    The inputs the cotisations depend on are kept (without copying them), to check that the matrix is up to date. Only
+    the matrix of the last period is kept, because it is not stored in a holder, so the memory tools of the simulation
+    don't see it.
+    """
+    base = None
+    categorie_salarie = None
+    compiled_baremes = None
+    cotisations = None
+    period = None
+    plafond_securite_sociale = None
+
+    def __init__(self, compiled_baremes, period, categorie_salarie, base, plafond_securite_sociale):
+        self.compiled_baremes = compiled_baremes
+        self.period = period
+        self.categorie_salarie = categorie_salarie
+        self.base = base
+        self.plafond_securite_sociale = plafond_securite_sociale
+        self.cotisations = compiled_baremes.calc(categorie_salarie, base, plafond_securite_sociale,
+            round_base_decimals = 2)
+
+    def get(self, bareme_name):
+        return self.cotisations[self.compiled_baremes.index_by_bareme_name[bareme_name]]
+
+    def is_up_to_date(self, compiled_baremes, period, categorie_salarie, base, plafond_securite_sociale):
+        # The arrays of the holders are usually the same objects as those of the previous call: compare them first.
+        return self.compiled_baremes is compiled_baremes and self.period == period and all(
+            array is up_to_date_array or np.array_equal(array, up_to_date_array)
+            for array, up_to_date_array in (
+                (self.base, base),
+                (self.categorie_salarie, categorie_salarie),
+                (self.plafond_securite_sociale, plafond_securite_sociale),
+                )
+            )
+
+
+def calc_marginal_rates(thresholds, rates, base, factor, round_base_decimals = None):
+    """Compute several marginal rate tax scales at once, like MarginalRateTaxScale.calc.
+
+    `thresholds` (with a trailing infinite threshold) and `rates` have one row by tax scale. Return an array with one
+    row by element of `base` and one column by tax scale.
+    """
+    def scale_thresholds(bracket_thresholds):
+        infinite = np.isinf(bracket_thresholds)
+        scaled_thresholds = np.outer(factor, np.where(infinite, 0, bracket_thresholds))
+        if round_base_decimals is not None:
+            scaled_thresholds = np.round(scaled_thresholds, round_base_decimals)
+        scaled_thresholds[:, infinite] = np.inf
+        return scaled_thresholds
+
+    base = base[:, np.newaxis]
+    result = np.zeros((len(base), len(rates)))
+    lower_thresholds = scale_thresholds(thresholds[:, 0])
+    for bracket_index in xrange(rates.shape[1]):
+        upper_thresholds = scale_thresholds(thresholds[:, bracket_index + 1])
+        amount = max_(min_(base, upper_thresholds) - lower_thresholds, 0)
+        if round_base_decimals is None:
+            result += amount * rates[:, bracket_index]
+        else:
+            result += np.round(np.round(amount, round_base_decimals) * rates[:, bracket_index], round_base_decimals)
+        lower_thresholds = upper_thresholds
+    return result
+
+
 def apply_bareme_for_relevant_type_sal(
         bareme_by_type_sal_name,
         bareme_name,
@@ -15,6 +188,16 @@ def apply_bareme_for_relevant_type_sal(
     assert categorie_salarie is not None
     assert base is not None
     assert plafond_securite_sociale is not None
+    compiled_baremes = CompiledBaremes.get(bareme_by_type_sal_name)
+    if bareme_name in compiled_baremes.index_by_bareme_name:
+        return - compiled_baremes.calc(
+            categorie_salarie,
+            base,
+            plafond_securite_sociale,
+            baremes_name = [bareme_name],
+            round_base_decimals = round_base_decimals,
+            )[0]
+
     def iter_cotisations():
         for type_sal_name, type_sal_index in CAT:
             if type_sal_name not in bareme_by_type_sal_name:  # to deal with public_titulaire_militaire
@@ -69,14 +252,27 @@ def compute_cotisation(simulation, period, cotisation_type = None, bareme_name =
     plafond_securite_sociale = simulation.calculate_add('plafond_securite_sociale', period)
     categorie_salarie = simulation.calculate('categorie_salarie', period)
 
-    cotisation = apply_bareme_for_relevant_type_sal(
-        bareme_by_type_sal_name = bareme_by_type_sal_name,
-        bareme_name = bareme_name,
-        base = assiette_cotisations_sociales,
-        plafond_securite_sociale = plafond_securite_sociale,
-        categorie_salarie = categorie_salarie,
-        )
-    return cotisation
+    compiled_baremes = CompiledBaremes.get(bareme_by_type_sal_name)
+    if bareme_name not in compiled_baremes.index_by_bareme_name:
+        return apply_bareme_for_relevant_type_sal(
+            bareme_by_type_sal_name = bareme_by_type_sal_name,
+            bareme_name = bareme_name,
+            base = assiette_cotisations_sociales,
+            plafond_securite_sociale = plafond_securite_sociale,
+            categorie_salarie = categorie_salarie,
+            )
+
+    # All the cotisations of the same type share their inputs: compute them together and keep their matrix, until the
+    # cotisations of another period are computed.
+    cotisations_matrix_by_type = cotisations_matrix_by_type_by_simulation.setdefault(simulation, {})
+    cotisations_matrix = cotisations_matrix_by_type.get(cotisation_type)
+    if cotisations_matrix is None or not cotisations_matrix.is_up_to_date(compiled_baremes, period,
+            categorie_salarie, assiette_cotisations_sociales, plafond_securite_sociale):
+        # Drop the previous matrix before computing the new one.
+        cotisations_matrix_by_type[cotisation_type] = None
+        cotisations_matrix = cotisations_matrix_by_type[cotisation_type] = CotisationsMatrix(compiled_baremes, period,
+            categorie_salarie, assiette_cotisations_sociales, plafond_securite_sociale)
+    return - cotisations_matrix.get(bareme_name)
 
 
 def compute_cotisation_annuelle(simulation, period, cotisation_type = None, bareme_name = None):
@@ -2,22 +2,17 @@
 
 from __future__ import division
 
-import csv
 import logging
-import pkg_resources
 
-from numpy import fromiter, logical_or as or_, round as round_
+from numpy import logical_or as or_, round as round_
 
 
-import openfisca_france
+from .... import depcom_tables
 from ...base import *  # noqa analysis:ignore
 
 
 log = logging.getLogger(__name__)
 
-taux_aot_by_depcom = None
-taux_smt_by_depcom = None
-
 
 # TODO:
 # check hsup everywhere !
@@ -302,29 +297,15 @@ class taux_versement_transport(Variable):
 
     def function(self, simulation, period):
         period = period.start.period(u'month').offset('first-of')
-        depcom_entreprise = simulation.calculate('depcom_entreprise', period)
+        code_insee_commune_entreprise = simulation.calculate('code_insee_commune_entreprise', period)
         effectif_entreprise = simulation.calculate('effectif_entreprise', period)
         categorie_salarie = simulation.calculate('categorie_salarie', period)
 
         seuil_effectif = simulation.legislation_at(period.start).cotsoc.versement_transport.seuil_effectif
 
-        preload_taux_versement_transport()
         public = (categorie_salarie >= 2)
-        default_value = 0.0
-        taux_aot = fromiter(
-            (
-                taux_aot_by_depcom.get(depcom_cell, default_value)
-                for depcom_cell in depcom_entreprise
-                ),
-            dtype = 'float',
-            )
-        taux_smt = fromiter(
-            (
-                taux_smt_by_depcom.get(depcom_cell, default_value)
-                for depcom_cell in depcom_entreprise
-                ),
-            dtype = 'float',
-            )
+        taux_aot = depcom_tables.lookup('taux_aot', code_insee_commune_entreprise)
+        taux_smt = depcom_tables.lookup('taux_smt', code_insee_commune_entreprise)
         # "L'entreprise emploie-t-elle plus de 9 salariés  dans le périmètre de l'Autorité organisatrice de transport
         # (AOT) suivante ou syndicat mixte de transport (SMT)"
         return period, (taux_aot + taux_smt) * or_(effectif_entreprise >= seuil_effectif, public) / 100
@@ -344,25 +325,5 @@ class versement_transport(Variable):
 
 
 def preload_taux_versement_transport():
-    global taux_aot_by_depcom
-    global taux_smt_by_depcom
-    if taux_aot_by_depcom is None:
-        with pkg_resources.resource_stream(
-                openfisca_france.__name__,
-                'assets/versement_transport/taux.csv',
-                ) as csv_file:
-            csv_reader = csv.DictReader(csv_file)
-            taux_aot_by_depcom = {
-                row['code INSEE']: float(row['taux'] or 0)  # autorité organisatrice des transports
-                for row in csv_reader
-                }
-    if taux_smt_by_depcom is None:
-        with pkg_resources.resource_stream(
-                openfisca_france.__name__,
-                'assets/versement_transport/taux.csv',
-                ) as csv_file:
-            csv_reader = csv.DictReader(csv_file)
-            taux_smt_by_depcom = {
-                row['code INSEE']: float(row['taux additionnel'] or 0)  # syndicat mixte de transport
-                for row in csv_reader
-                }
+    depcom_tables.get_table('taux_aot')
+    depcom_tables.get_table('taux_smt')
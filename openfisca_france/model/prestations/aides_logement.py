@@ -2,24 +2,20 @@
 
 from __future__ import division
 
-import csv
-import json
 import logging
-import pkg_resources
 
-from numpy import (ceil, fromiter, int16, logical_not as not_, logical_or as or_, logical_and as and_, maximum as max_,
+from numpy import (ceil, logical_not as not_, logical_or as or_, logical_and as and_, maximum as max_,
     minimum as min_, round as round_, where, select, take)
 
-import openfisca_france
 from openfisca_core.periods import Instant
 
+from ... import depcom_tables
+
 from ..base import *  # noqa  analysis:ignore
 from .prestations_familiales.base_ressource import nb_enf
 
 log = logging.getLogger(__name__)
 
-zone_apl_by_depcom = None
-
 
 class al_nb_personnes_a_charge(Variable):
     column = FloatCol
@@ -53,11 +49,13 @@ class al_nb_personnes_a_charge(Variable):
 
         def al_nb_enfants():
             autonomie_financiere_holder = simulation.compute('autonomie_financiere', period)
-            age = self.split_by_roles(age_holder, roles = ENFS)
-            autonomie_financiere = self.split_by_roles(autonomie_financiere_holder, roles = ENFS)
+            familles = self.holder.entity
+            age = age_holder.array
+            autonomie_financiere = autonomie_financiere_holder.array
             age_min_enfant = simulation.legislation_at(period.start).fam.af.age1
 
-            return nb_enf(age, autonomie_financiere, age_min_enfant, age_max_enfant - 1) # La limite sur l'age max est stricte.
+            # La limite sur l'age max est stricte.
+            return nb_enf(familles, age, autonomie_financiere, age_min_enfant, age_max_enfant - 1)
 
         def al_nb_adultes_handicapes():
 
@@ -626,41 +624,13 @@ class zone_apl(Variable):
         Retrouve la zone APL (aide personnalisée au logement) de la commune
         en fonction du depcom (code INSEE)
         '''
-        period = period
-        depcom = simulation.calculate('depcom', period)
-
-        preload_zone_apl()
-        default_value = 2
-        return period, fromiter(
-            (
-                zone_apl_by_depcom.get(depcom_cell, default_value)
-                for depcom_cell in depcom
-                ),
-            dtype = int16,
-            )
+        code_insee_commune = simulation.calculate('code_insee_commune', period)
+
+        return period, depcom_tables.lookup('zone_apl', code_insee_commune)
 
 
 def preload_zone_apl():
-    global zone_apl_by_depcom
-    if zone_apl_by_depcom is None:
-        with pkg_resources.resource_stream(
-                openfisca_france.__name__,
-                'assets/apl/20110914_zonage.csv',
-                ) as csv_file:
-            csv_reader = csv.DictReader(csv_file)
-            zone_apl_by_depcom = {
-                # Keep only first char of Zonage column because of 1bis value considered equivalent to 1.
-                row['CODGEO']: int(row['Zonage'][0])
-                for row in csv_reader
-                }
-        # Add subcommunes (arrondissements and communes associées), use the same value as their parent commune.
-        with pkg_resources.resource_stream(
-                openfisca_france.__name__,
-                'assets/apl/commune_depcom_by_subcommune_depcom.json',
-                ) as json_file:
-            commune_depcom_by_subcommune_depcom = json.load(json_file)
-            for subcommune_depcom, commune_depcom in commune_depcom_by_subcommune_depcom.iteritems():
-                zone_apl_by_depcom[subcommune_depcom] = zone_apl_by_depcom[commune_depcom]
+    depcom_tables.get_table('zone_apl')
 
 
 class zone_apl_individu(EntityToPersonColumn):
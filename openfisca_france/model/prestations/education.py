@@ -24,16 +24,9 @@ class bourse_college(Variable):
         scolarite_holder = simulation.compute('scolarite', period)
         P = simulation.legislation_at(period.start).bourses_education.bourse_college
 
-        ages = self.split_by_roles(age_holder, roles = ENFS)
-        nb_enfants = sum(
-            age >= 0 for age in ages.itervalues()
-        )
-
-        scolarites = self.split_by_roles(scolarite_holder, roles = ENFS)
-
-        nb_enfants_college = sum(
-            scolarite == SCOLARITE_COLLEGE for scolarite in scolarites.itervalues()
-        )
+        familles_segments = self.holder.entity.segments
+        nb_enfants = familles_segments.count(age_holder.array >= 0, roles = ENFS)
+        nb_enfants_college = familles_segments.count(scolarite_holder.array == SCOLARITE_COLLEGE, roles = ENFS)
 
         montant_par_enfant = apply_thresholds(
             rfr,
@@ -62,10 +55,7 @@ class bourse_lycee_points_de_charge(Variable):
         isole = not_(simulation.calculate('en_couple', period))
 
         # compte le nombre d'enfants
-        ages = self.split_by_roles(age_holder, roles = ENFS)
-        nb_enfants = sum(
-            age >= 0 for age in ages.itervalues()
-        )
+        nb_enfants = self.holder.entity.segments.count(age_holder.array >= 0, roles = ENFS)
 
         points_de_charge = 11 * (nb_enfants >= 1)
         points_de_charge += 1 * (nb_enfants >= 2) # 1 point de charge pour le 2ème enfant
@@ -115,11 +105,7 @@ class bourse_lycee(Variable):
         scolarite_holder = simulation.compute('scolarite', period)
         valeur_part = simulation.legislation_at(period.start).bourses_education.bourse_lycee.valeur_part
 
-        scolarites = self.split_by_roles(scolarite_holder, roles = ENFS)
-
-        nb_enfants_lycee = sum(
-            scolarite == SCOLARITE_LYCEE for scolarite in scolarites.itervalues()
-        )
+        nb_enfants_lycee = self.holder.entity.segments.count(scolarite_holder.array == SCOLARITE_LYCEE, roles = ENFS)
 
         montant = nombre_parts * valeur_part * nb_enfants_lycee
 
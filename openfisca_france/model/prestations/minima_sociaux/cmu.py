@@ -8,6 +8,7 @@ from numpy import (absolute as abs_, apply_along_axis, array, int32, logical_not
                    maximum as max_, minimum as min_, select)
 
 from ...base import *  # noqa analysis:ignore
+from ...caracteristiques_socio_demographiques.logement import get_departement_chef
 
 
 class acs_montant(DatedVariable):
@@ -21,13 +22,17 @@ class acs_montant(DatedVariable):
         age_holder = simulation.compute('age', period)
         P = simulation.legislation_at(period.start).cmu
 
-        ages_couple = self.split_by_roles(age_holder, roles = [CHEF, PART])
-        ages_pac = self.split_by_roles(age_holder, roles = ENFS)
+        age = age_holder.array
+        familles = self.holder.entity
 
-        return period, ((nb_par_age(ages_couple, 0, 15) + nb_par_age(ages_pac, 0, 15)) * P.acs_moins_16_ans +
-            (nb_par_age(ages_couple, 16, 49) + nb_par_age(ages_pac, 16, 25)) * P.acs_16_49_ans +
-            nb_par_age(ages_couple, 50, 59) * P.acs_50_59_ans +
-            nb_par_age(ages_couple, 60, 200) * P.acs_plus_60_ans)
+        return period, (
+            (nb_par_age(familles, age, 0, 15, roles = [CHEF, PART]) + nb_par_age(familles, age, 0, 15)) *
+            P.acs_moins_16_ans +
+            (nb_par_age(familles, age, 16, 49, roles = [CHEF, PART]) + nb_par_age(familles, age, 16, 25)) *
+            P.acs_16_49_ans +
+            nb_par_age(familles, age, 50, 59, roles = [CHEF, PART]) * P.acs_50_59_ans +
+            nb_par_age(familles, age, 60, 200, roles = [CHEF, PART]) * P.acs_plus_60_ans
+            )
 
 
 class cmu_forfait_logement_base(Variable):
@@ -77,12 +82,10 @@ class cmu_eligible_majoration_dom(Variable):
 
     def function(self, simulation, period):
         period = period.this_month
-        residence_guadeloupe = simulation.calculate('residence_guadeloupe', period)
-        residence_martinique = simulation.calculate('residence_martinique', period)
-        residence_guyane = simulation.calculate('residence_guyane', period)
-        residence_reunion = simulation.calculate('residence_reunion', period)
+        departement = get_departement_chef(self, simulation, period)
 
-        return period, residence_guadeloupe | residence_martinique | residence_guyane | residence_reunion
+        # Guadeloupe, Martinique, Guyane & Réunion
+        return period, (departement >= 971) * (departement <= 974)
 
 
 class cmu_c_plafond(Variable):
@@ -243,9 +246,8 @@ class cmu_base_ressources(Variable):
         P = simulation.legislation_at(period.start).cmu
 
         cmu_br_i_par = self.split_by_roles(cmu_base_ressources_i_holder, roles = [CHEF, PART])
-        cmu_br_i_pac = self.split_by_roles(cmu_base_ressources_i_holder, roles = ENFS)
-
-        age_pac = self.split_by_roles(age_holder, roles = ENFS)
+        cmu_br_i = cmu_base_ressources_i_holder.array
+        age = age_holder.array
 
         forfait_logement = (((statut_occupation_logement == 2) + (statut_occupation_logement == 6)) * cmu_forfait_logement_base +
             (aide_logement > 0) * min_(cmu_forfait_logement_al, aide_logement))
@@ -256,8 +258,8 @@ class cmu_base_ressources(Variable):
 
         res += paje_clca + paje_prepare
 
-        for key, age in age_pac.iteritems():
-            res += (0 <= age) * (age <= P.age_limite_pac) * cmu_br_i_pac[key]
+        res += self.holder.entity.segments.sum(cmu_br_i, condition = (0 <= age) * (age <= P.age_limite_pac),
+            roles = ENFS)
 
         return period, res
 
@@ -272,8 +274,7 @@ class cmu_nb_pac(Variable):
         age_holder = simulation.compute('age', period)
         P = simulation.legislation_at(period.start).cmu
 
-        ages = self.split_by_roles(age_holder, roles = ENFS)
-        return period, nb_par_age(ages, 0, P.age_limite_pac)
+        return period, nb_par_age(self.holder.entity, age_holder.array, 0, P.age_limite_pac)
 
 
 class cmu_c(Variable):
@@ -342,14 +343,11 @@ def forfait_logement(nbp_foyer, P, law_rsa):
             [P.taux_1p, P.taux_2p, P.taux_3p_plus]
             )
 
-def nb_par_age(age_by_role, min, max):
+def nb_par_age(familles, ages, min, max, roles = ENFS):
     '''
-    Calcule le nombre d'individus ayant un âge compris entre min et max
+    Calcule le nombre d'individus (des enfants par défaut) ayant un âge compris entre min et max
     '''
-    return sum(
-        (min <= age) & (age <= max)
-        for age in age_by_role.itervalues()
-        )
+    return familles.segments.count((min <= ages) & (ages <= max), roles = roles)
 
 
 def rsa_socle_base(nbp, P):
@@ -43,9 +43,10 @@ class aefa(DatedVariable):
         P = simulation.legislation_at(period.start).minim.aefa
         af = simulation.legislation_at(period.start).fam.af
 
-        age = self.split_by_roles(age_holder, roles = ENFS)
+        familles = self.holder.entity
+        age = age_holder.array
         aer = self.sum_by_entity(aer_holder)
-        autonomie_financiere = self.split_by_roles(autonomie_financiere_holder, roles = ENFS)
+        autonomie_financiere = autonomie_financiere_holder.array
         dummy_ass = ass > 0
         dummy_aer = aer > 0
         dummy_api = api > 0
@@ -53,7 +54,7 @@ class aefa(DatedVariable):
         maj = 0  # TODO
         condition = (dummy_ass + dummy_aer + dummy_api + dummy_rmi > 0)
         if hasattr(af, "age3"):
-            nbPAC = nb_enf(age, autonomie_financiere, af.age1, af.age3)
+            nbPAC = nb_enf(familles, age, autonomie_financiere, af.age1, af.age3)
         else:
             nbPAC = af_nbenf
         # TODO check nombre de PAC pour une famille
@@ -80,9 +81,10 @@ class aefa(DatedVariable):
         P = simulation.legislation_at(period.start).minim.aefa
         af = simulation.legislation_at(period.start).fam.af
 
-        age = self.split_by_roles(age_holder, roles = ENFS)
+        familles = self.holder.entity
+        age = age_holder.array
         aer = self.sum_by_entity(aer_holder)
-        autonomie_financiere = self.split_by_roles(autonomie_financiere_holder, roles = ENFS)
+        autonomie_financiere = autonomie_financiere_holder.array
         dummy_ass = ass > 0
         dummy_aer = aer > 0
         dummy_api = api > 0
@@ -90,7 +92,7 @@ class aefa(DatedVariable):
         maj = 0  # TODO
         condition = (dummy_ass + dummy_aer + dummy_api + dummy_rmi > 0)
         if hasattr(af, "age3"):
-            nbPAC = nb_enf(age, autonomie_financiere, af.age1, af.age3)
+            nbPAC = nb_enf(familles, age, autonomie_financiere, af.age1, af.age3)
         else:
             nbPAC = af_nbenf
         # TODO check nombre de PAC pour une famille
@@ -118,9 +120,10 @@ class aefa(DatedVariable):
         P = simulation.legislation_at(period.start).minim.aefa
         af = simulation.legislation_at(period.start).fam.af
 
-        age = self.split_by_roles(age_holder, roles = ENFS)
+        familles = self.holder.entity
+        age = age_holder.array
         aer = self.sum_by_entity(aer_holder)
-        autonomie_financiere = self.split_by_roles(autonomie_financiere_holder, roles = ENFS)
+        autonomie_financiere = autonomie_financiere_holder.array
         dummy_ass = ass > 0
         dummy_aer = aer > 0
         dummy_api = api > 0
@@ -128,7 +131,7 @@ class aefa(DatedVariable):
         maj = 0  # TODO
         condition = (dummy_ass + dummy_aer + dummy_api + dummy_rmi > 0)
         if hasattr(af, "age3"):
-            nbPAC = nb_enf(age, autonomie_financiere, af.age1, af.age3)
+            nbPAC = nb_enf(familles, age, autonomie_financiere, af.age1, af.age3)
         else:
             nbPAC = af_nbenf
         # TODO check nombre de PAC pour une famille
@@ -165,9 +168,10 @@ class api(DatedVariable):
         af = simulation.legislation_at(period.start).fam.af
         api = simulation.legislation_at(period.start).minim.api
 
-        age = self.split_by_roles(age_holder, roles = ENFS)
-        age_en_mois = self.split_by_roles(age_en_mois_holder, roles = ENFS)
-        autonomie_financiere = self.split_by_roles(autonomie_financiere_holder, roles = ENFS)
+        familles = self.holder.entity
+        age = age_holder.array
+        age_en_mois = age_en_mois_holder.array
+        autonomie_financiere = autonomie_financiere_holder.array
         # TODO:
         #    Majoration pour isolement
         #    Si vous êtes parent isolé, c’est-à-dire célibataire, divorcé(e), séparé(e) ou veuf(ve) avec des enfants
@@ -184,7 +188,7 @@ class api(DatedVariable):
         #    d’une période de 18 mois suivant l’événement.
         #    Si votre plus jeune enfant à charge a moins de 3 ans, le montant forfaitaire majoré vous est accordé
         #    jusqu'à ses 3 ans.
-        benjamin = age_en_mois_benjamin(age_en_mois)
+        benjamin = age_en_mois_benjamin(familles, age_en_mois)
         enceinte = (benjamin < 0) * (benjamin > -6)
         # TODO: quel mois mettre ?
         # TODO: pas complètement exact
@@ -198,11 +202,15 @@ class api(DatedVariable):
         # # Calcul de l'année et mois de naissance du benjamin
 
         condition = (floor(benjamin / 12) <= api.age - 1)
-        eligib = isole * ((enceinte != 0) | (nb_enf(age, autonomie_financiere, 0, api.age - 1) > 0)) * condition
+        eligib = isole * (
+            (enceinte != 0) | (nb_enf(familles, age, autonomie_financiere, 0, api.age - 1) > 0)
+            ) * condition
 
         # moins de 20 ans avant inclusion dans rsa
         # moins de 25 ans après inclusion dans rsa
-        api1 = eligib * af.bmaf * (api.base + api.enf_sup * nb_enf(age, autonomie_financiere, af.age1, api.age_pac - 1))
+        api1 = eligib * af.bmaf * (
+            api.base + api.enf_sup * nb_enf(familles, age, autonomie_financiere, af.age1, api.age_pac - 1)
+            )
         rsa = (api.age_pac >= 25)  # dummy passage au rsa majoré
         br_api = rsa_base_ressources + af_majoration * not_(rsa)
         # On pourrait mensualiser RMI, BRrmi et forfait logement
@@ -439,10 +447,11 @@ class enceinte_fam(Variable):
         age_en_mois_holder = simulation.compute('age_en_mois', period)
         enceinte_holder = simulation.compute('enceinte', period)
 
-        age_en_mois_enf = self.split_by_roles(age_en_mois_holder, roles = ENFS)
+        familles = self.holder.entity
+        age_en_mois_enf = age_en_mois_holder.array
         enceinte = self.split_by_roles(enceinte_holder, roles = [CHEF, PART])
 
-        benjamin = age_en_mois_benjamin(age_en_mois_enf)
+        benjamin = age_en_mois_benjamin(familles, age_en_mois_enf)
         enceinte_compat = and_(benjamin < 0, benjamin > -6)
         return period, or_(or_(enceinte_compat, enceinte[CHEF]), enceinte[PART])
 
@@ -923,9 +932,10 @@ class rsa_majore_eligibilite(Variable):
         def has_enfant_moins_3_ans():
             age_holder = simulation.compute('age', period)
             autonomie_financiere_holder = simulation.compute('autonomie_financiere', period)
-            age_enf = self.split_by_roles(age_holder, roles = ENFS)
-            autonomie_financiere_enf = self.split_by_roles(autonomie_financiere_holder, roles = ENFS)
-            nbenf = nb_enf(age_enf, autonomie_financiere_enf, 0, 2)
+            familles = self.holder.entity
+            age_enf = age_holder.array
+            autonomie_financiere_enf = autonomie_financiere_holder.array
+            nbenf = nb_enf(familles, age_enf, autonomie_financiere_enf, 0, 2)
 
             return nbenf > 0
 
@@ -50,11 +50,12 @@ class af_allocation_forfaitaire_nb_enfants(Variable):
     def function(self, simulation, period):
         period = period.this_month
         age_holder = simulation.compute('age', period)
-        age = self.split_by_roles(age_holder, roles = ENFS)
+        familles = self.holder.entity
+        age = age_holder.array
         autonomie_financiere_holder = simulation.compute('autonomie_financiere', period)
-        autonomie_financiere = self.split_by_roles(autonomie_financiere_holder, roles = ENFS)
+        autonomie_financiere = autonomie_financiere_holder.array
         pfam = simulation.legislation_at(period.start).fam.af
-        af_forfaitaire_nbenf = nb_enf(age, autonomie_financiere, pfam.age3, pfam.age3)
+        af_forfaitaire_nbenf = nb_enf(familles, age, autonomie_financiere, pfam.age3, pfam.age3)
 
         return period, af_forfaitaire_nbenf
 
@@ -177,20 +178,14 @@ class af_age_aine(Variable):
     def function(self, simulation, period):
         period = period.this_month
 
-        age_holder = simulation.compute('age', period)
-        age_enfants = self.split_by_roles(age_holder, roles = ENFS)
-
-        pfam_enfant_a_charge_holder = simulation.compute('prestations_familiales_enfant_a_charge', period)
-        af_enfants_a_charge = self.split_by_roles(pfam_enfant_a_charge_holder, roles = ENFS)
+        age = simulation.calculate('age', period)
+        pfam_enfant_a_charge = simulation.calculate('prestations_familiales_enfant_a_charge', period)
 
         pfam = simulation.legislation_at(period.start).fam
 
         # Calcul de l'âge de l'aîné
-        age_aine = -9999
-        for key, age in age_enfants.iteritems():
-            a_charge = af_enfants_a_charge[key] * (age <= pfam.af.age2)
-            aine_potentiel = a_charge * (age > age_aine)
-            age_aine = aine_potentiel * age + not_(aine_potentiel) * age_aine
+        a_charge = pfam_enfant_a_charge * (age <= pfam.af.age2)
+        age_aine = self.holder.entity.segments.max(age, condition = a_charge, default = -9999, roles = ENFS)
 
         return period, age_aine
 
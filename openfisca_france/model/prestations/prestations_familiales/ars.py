@@ -28,20 +28,22 @@ class ars(Variable):
         # TODO: convention sur la mensualisation
         # On tient compte du fait qu'en cas de léger dépassement du plafond, une allocation dégressive
         # (appelée allocation différentielle), calculée en fonction des revenus, peut être versée.
-        age = self.split_by_roles(age_holder, roles = ENFS)
-        autonomie_financiere = self.split_by_roles(autonomie_financiere_holder, roles = ENFS)
+        familles = self.holder.entity
+        age = age_holder.array
+        autonomie_financiere = autonomie_financiere_holder.array
 
         bmaf = P.af.bmaf
         # On doit prendre l'âge en septembre
-        enf_05 = nb_enf(age, autonomie_financiere, P.ars.agep - 1, P.ars.agep - 1)  # 5 ans et 6 ans avant le 31 décembre
+        # 5 ans et 6 ans avant le 31 décembre
+        enf_05 = nb_enf(familles, age, autonomie_financiere, P.ars.agep - 1, P.ars.agep - 1)
         # enf_05 = 0
         # Un enfant scolarisé qui n'a pas encore atteint l'âge de 6 ans
         # avant le 1er février 2012 peut donner droit à l'ARS à condition qu'il
         # soit inscrit à l'école primaire. Il faudra alors présenter un
         # certificat de scolarité.
-        enf_primaire = enf_05 + nb_enf(age, autonomie_financiere, P.ars.agep, P.ars.agec - 1)
-        enf_college = nb_enf(age, autonomie_financiere, P.ars.agec, P.ars.agel - 1)
-        enf_lycee = nb_enf(age, autonomie_financiere, P.ars.agel, P.ars.ages)
+        enf_primaire = enf_05 + nb_enf(familles, age, autonomie_financiere, P.ars.agep, P.ars.agec - 1)
+        enf_college = nb_enf(familles, age, autonomie_financiere, P.ars.agec, P.ars.agel - 1)
+        enf_lycee = nb_enf(familles, age, autonomie_financiere, P.ars.agel, P.ars.ages)
 
         arsnbenf = enf_primaire + enf_college + enf_lycee
 
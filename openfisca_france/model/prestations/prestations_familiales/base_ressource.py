@@ -179,7 +179,7 @@ class prestations_familiales_base_ressources(Variable):
 ############################################################################
 
 
-def nb_enf(ages, autonomie_financiere, ag1, ag2):
+def nb_enf(familles, ages, autonomie_financiere, ag1, ag2):
     """
     Renvoie le nombre d'enfant au sens des allocations familiales dont l'âge est compris entre ag1 et ag2
     """
@@ -188,17 +188,11 @@ def nb_enf(ages, autonomie_financiere, ag1, ag2):
 #        Un enfant est reconnu à charge pour le versement des prestations
 #        jusqu'au mois précédant son age limite supérieur (ag2 + 1) mais
 #        le versement à lieu en début de mois suivant
-    return sum(
-        (age >= ag1) & (age <= ag2) & not_(autonomie_financiere[key]) for key, age in ages.iteritems()
-    )
+    return familles.segments.count((ages >= ag1) & (ages <= ag2) & not_(autonomie_financiere), roles = ENFS)
 
 
-def age_en_mois_benjamin(ages_en_mois):
+def age_en_mois_benjamin(familles, ages_en_mois):
     '''
     Renvoie un vecteur (une entree pour chaque famille) avec l'age du benjamin.  # TODO check age_en_mois > 0
     '''
-    age_en_mois_benjamin = 12 * 9999
-    for age_en_mois in ages_en_mois.itervalues():
-        isbenjamin = (age_en_mois < age_en_mois_benjamin) & (age_en_mois != -9999)
-        age_en_mois_benjamin = isbenjamin * age_en_mois + not_(isbenjamin) * age_en_mois_benjamin
-    return age_en_mois_benjamin
+    return familles.segments.min(ages_en_mois, condition = ages_en_mois != -9999, default = 12 * 9999, roles = ENFS)
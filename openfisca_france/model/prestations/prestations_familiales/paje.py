@@ -199,17 +199,15 @@ class paje_naissance(Variable):
         P = simulation.legislation_at(period.start).fam
 
         # age = self.split_by_roles(age_holder, roles = ENFS)
-        age_en_mois = self.split_by_roles(age_en_mois_holder, roles = ENFS)
+        age_en_mois = age_en_mois_holder.array
 
         date_gel_paje = Instant((2013, 04, 01)) # Le montant de la PAJE est gelé depuis avril 2013.
         bmaf = P.af.bmaf if period.start < date_gel_paje else simulation.legislation_at(date_gel_paje).fam.af.bmaf
         nais_prime = round(100 * P.paje.nais.prime_tx * bmaf) / 100
         # Versée au 7e mois de grossesse dans l'année
         # donc les enfants concernés sont les enfants qui ont -2 mois
-        nbnais = 0
-        for age_m in age_en_mois.itervalues():
-            nbnais += (age_m == -2)  # cas mensuel
-            # nbnais += (age_m >= -2) * (age_m < 10) # cas annuel
+        nbnais = self.holder.entity.segments.count(age_en_mois == -2, roles = ENFS)  # cas mensuel
+        # cas annuel : (age_en_mois >= -2) * (age_en_mois < 10)
 
         nbenf = af_nbenf + nbnais  # On ajoute l'enfant à  naître;
 
@@ -262,7 +260,8 @@ class paje_clca(Variable):
 
         P = simulation.legislation_at(period.start).fam
 
-        age_en_mois = self.split_by_roles(age_en_mois_holder, roles = ENFS)
+        familles = self.holder.entity
+        age_en_mois = age_en_mois_holder.array
 
         paje = paje_base >= 0
         # durée de versement :
@@ -273,7 +272,7 @@ class paje_clca(Variable):
 
         # Calcul de l'année et mois de naisage_in_months( du cadet
         # TODO: ajuster en fonction de la cessation des IJ etc
-        age_m_benjamin = age_en_mois_benjamin(age_en_mois)
+        age_m_benjamin = age_en_mois_benjamin(familles, age_en_mois)
         condition1 = (af_nbenf == 1) * (age_m_benjamin >= 0) * (age_m_benjamin < P.paje.clca.duree1)
         age_benjamin = floor(age_m_benjamin / 12)
         condition2 = (age_benjamin <= (P.paje.base.age - 1))
@@ -381,17 +380,18 @@ class paje_clmg(Variable):
         P = simulation.legislation_at(period.start).fam
         P_n_2 = simulation.legislation_at(period.start.offset(-2, 'year')).fam
 
-        age = self.split_by_roles(age_holder, roles = ENFS)
+        familles = self.holder.entity
+        age = age_holder.array
         etudiant = self.split_by_roles(etu_holder, roles = [CHEF, PART])
         hsup = self.split_by_roles(hsup_holder, roles = [CHEF, PART])
         salaire_imposable = self.split_by_roles(salaire_imposable_holder, roles = [CHEF, PART])
-        autonomie_financiere = self.split_by_roles(autonomie_financiere_holder, roles = ENFS)
+        autonomie_financiere = autonomie_financiere_holder.array
         aah = self.sum_by_entity(aah_holder)
 
         # condition de revenu minimal
 
         bmaf_n_2 = P_n_2.af.bmaf
-        cond_age_enf = (nb_enf(age, autonomie_financiere, P.paje.clmg.age1, P.paje.clmg.age2 - 1) > 0)
+        cond_age_enf = (nb_enf(familles, age, autonomie_financiere, P.paje.clmg.age1, P.paje.clmg.age2 - 1) > 0)
         cond_sal = (
             salaire_imposable[CHEF] + salaire_imposable[PART] + hsup[CHEF] + hsup[PART] >
             12 * bmaf_n_2 * (1 + en_couple)
@@ -415,8 +415,9 @@ class paje_clmg(Variable):
         seuil1 = seuil1 * (1 - .5 * paje_clca_taux_partiel)
         seuil2 = seuil2 * (1 - .5 * paje_clca_taux_partiel)
 
-        clmg = P.af.bmaf * ((nb_enf(age, autonomie_financiere, 0, P.paje.clmg.age1 - 1) > 0) +
-                            0.5 * (nb_enf(age, autonomie_financiere, P.paje.clmg.age1, P.paje.clmg.age2 - 1) > 0)
+        clmg = P.af.bmaf * ((nb_enf(familles, age, autonomie_financiere, 0, P.paje.clmg.age1 - 1) > 0) +
+                            0.5 * (nb_enf(familles, age, autonomie_financiere, P.paje.clmg.age1,
+                                P.paje.clmg.age2 - 1) > 0)
                             ) * (
             empl_dir * (
                 (base_ressources < seuil1) * P.paje.clmg.empl_dir1 +
@@ -460,8 +461,9 @@ class paje_colca(Variable):
 
         P = simulation.legislation_at(period.start).fam
 
-        age_en_mois = self.split_by_roles(age_en_mois_holder, roles = ENFS)
-        age_m_benjamin = age_en_mois_benjamin(age_en_mois)
+        familles = self.holder.entity
+        age_en_mois = age_en_mois_holder.array
+        age_m_benjamin = age_en_mois_benjamin(familles, age_en_mois)
         condition = (age_m_benjamin < 12 * P.paje.colca.age) * (age_m_benjamin >= 0)
         nbenf = af_nbenf
         paje = (paje_base > 0)
@@ -496,7 +498,7 @@ class paje_colca(Variable):
 #
 #     # TODO calcul des cotisations urssaf
 #     #
-#     nbenf_afeama = nb_enf(age, autonomie_financiere, P.af.age1, P.afeama.age - 1)
+#     nbenf_afeama = nb_enf(familles, age, autonomie_financiere, P.af.age1, P.afeama.age - 1)
 #     nbenf = elig * af_nbenf * (nbenf_afeama > 0)
 #
 #     nb_par_ars = (nbenf == 1 + max_(nbenf - 1, 0) * (1 + P.ars.plaf_enf_supp))
@@ -548,8 +550,8 @@ class paje_colca(Variable):
 #     age = self.split_by_roles(age_holder, roles = ENFS)
 #     autonomie_financiere = self.split_by_roles(autonomie_financiere_holder, roles = ENFS)
 #
-#     nbenf = nb_enf(age, autonomie_financiere, 0, P.aged.age1 - 1)
-#     nbenf2 = nb_enf(age, autonomie_financiere, 0, P.aged.age2 - 1)
+#     nbenf = nb_enf(familles, age, autonomie_financiere, 0, P.aged.age1 - 1)
+#     nbenf2 = nb_enf(familles, age, autonomie_financiere, 0, P.aged.age2 - 1)
 #     elig1 = (nbenf > 0)
 #     elig2 = not_(elig1) * (nbenf2 > 0) * ape_taux_partiel
 #     depenses = 4 * dep_trim  # gérer les dépenses trimestrielles
@@ -604,10 +606,12 @@ class ape_avant_cumul(Variable):
         partiel2 = simulation.calculate('partiel2', period)
         P = simulation.legislation_at(period.start).fam
 
-        age = self.split_by_roles(age_holder, roles = ENFS)
-        autonomie_financiere = self.split_by_roles(autonomie_financiere_holder, roles = ENFS)
+        familles = self.holder.entity
+        age = age_holder.array
+        autonomie_financiere = autonomie_financiere_holder.array
 
-        elig = (nb_enf(age, autonomie_financiere, 0, P.ape.age - 1) >= 1) & (nb_enf(age, autonomie_financiere, 0, P.af.age2) >= 2)
+        elig = (nb_enf(familles, age, autonomie_financiere, 0, P.ape.age - 1) >= 1) & \
+            (nb_enf(familles, age, autonomie_financiere, 0, P.af.age2) >= 2)
         # Inactif
         # Temps partiel 1
         # Salarié:
@@ -647,11 +651,12 @@ class apje_avant_cumul(Variable):
         P = simulation.legislation_at(period.start).fam
         P_n_2 = simulation.legislation_at(period.start.offset(-2, 'year')).fam
 
-        age = self.split_by_roles(age_holder, roles = ENFS)
-        autonomie_financiere = self.split_by_roles(autonomie_financiere_holder, roles = ENFS)
+        familles = self.holder.entity
+        age = age_holder.array
+        autonomie_financiere = autonomie_financiere_holder.array
 
         # TODO: APJE courte voir doc ERF 2006
-        nbenf = nb_enf(age, autonomie_financiere, 0, P.apje.age - 1)
+        nbenf = nb_enf(familles, age, autonomie_financiere, 0, P.apje.age - 1)
         bmaf = P.af.bmaf
         bmaf_n_2 = P_n_2.af.bmaf
         base = round(P.apje.taux * bmaf, 2)
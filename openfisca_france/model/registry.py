@@ -0,0 +1,242 @@
+# -*- coding: utf-8 -*-
+
+"""Registry of the modules defining variables, used to import formulas only when they are needed.
+
+The manifest maps each variable name to the formula module that defines it. It is built once, by importing every
+formula module, then cached on disk, keyed by a hash of the sources of the model. When formula modules have already been
+imported by the current process, their variables can't be attributed to them anymore, so the manifest is built in a
+fresh Python process.
+
+To build the manifest ahead of time (for example when deploying a service), run:
+
+    python -m openfisca_france.model.registry
+"""
+
+
+import collections
+import importlib
+import json
+import logging
+import os
+import subprocess
+import sys
+
+from .. import caches, entities
+
+
+FORMAT_VERSION = '1'
+
+# Modules of formulas, relative to this package, in loading order.
+formula_modules_name = [
+    'caracteristiques_socio_demographiques.demographie',
+    'caracteristiques_socio_demographiques.logement',
+    'mesures',
+    'prelevements_obligatoires.isf',
+    'prelevements_obligatoires.taxe_habitation',
+    'prelevements_obligatoires.impot_revenu.charges_deductibles',
+    'prelevements_obligatoires.impot_revenu.credits_impot',
+    'prelevements_obligatoires.impot_revenu.ir',
+    'prelevements_obligatoires.impot_revenu.plus_values_immobilieres',
+    'prelevements_obligatoires.impot_revenu.reductions_impot',
+    'prelevements_obligatoires.impot_revenu.variables_reductions_credits',
+    'prelevements_obligatoires.prelevements_sociaux.contributions_sociales.activite',
+    'prelevements_obligatoires.prelevements_sociaux.contributions_sociales.capital',
+    'prelevements_obligatoires.prelevements_sociaux.contributions_sociales.remplacement',
+    'prelevements_obligatoires.prelevements_sociaux.cotisations_sociales.allegements',
+    'prelevements_obligatoires.prelevements_sociaux.cotisations_sociales.apprentissage',
+    'prelevements_obligatoires.prelevements_sociaux.cotisations_sociales.exonerations',
+    # 'prelevements_obligatoires.prelevements_sociaux.cotisations_sociales.penalites',
+    # 'prelevements_obligatoires.prelevements_sociaux.cotisations_sociales.remuneration_public',
+    'prelevements_obligatoires.prelevements_sociaux.cotisations_sociales.stage',
+    'prelevements_obligatoires.prelevements_sociaux.cotisations_sociales.travail_fonction_publique',
+    'prelevements_obligatoires.prelevements_sociaux.cotisations_sociales.travail_prive',
+    'prelevements_obligatoires.prelevements_sociaux.cotisations_sociales.travail_totaux',
+    'prelevements_obligatoires.prelevements_sociaux.taxes_salaires_main_oeuvre',
+    'prestations.aides_logement',
+    'prestations.education',
+    'prestations.minima_sociaux.aah',
+    'prestations.minima_sociaux.asi_aspa',
+    'prestations.minima_sociaux.ass',
+    'prestations.minima_sociaux.cmu',
+    'prestations.minima_sociaux.rsa',
+    'prestations.minima_sociaux.ppa',
+    'prestations.prestations_familiales.aeeh',
+    'prestations.prestations_familiales.af',
+    'prestations.prestations_familiales.ars',
+    'prestations.prestations_familiales.asf',
+    'prestations.prestations_familiales.paje',
+    'prestations.prestations_familiales.cf',
+    'revenus.autres',
+    'revenus.activite.non_salarie',
+    'revenus.activite.salarie',
+    'revenus.capital.financier',
+    'revenus.capital.foncier',
+    'revenus.capital.plus_value',
+    'revenus.remplacement.chomage',
+    'revenus.remplacement.retraite',
+    'revenus.remplacement.indemnites_journalieres_securite_sociale',
+    ]
+log = logging.getLogger(__name__)
+model_dir = os.path.dirname(os.path.abspath(__file__))
+package_name = __name__.rsplit('.', 1)[0]
+
+
+def import_formula_module(module_name):
+    return importlib.import_module('{}.{}'.format(package_name, module_name))
+
+
+def iter_columns_name():
+    for entity_class in entities.entity_class_by_symbol.itervalues():
+        for column_name in entity_class.column_by_name:
+            yield column_name
+
+
+# Manifest
+
+
+def build_manifest():
+    """Import every formula module and return the name of the first module whose import defines each variable."""
+    if is_model_loaded():
+        # Build the manifest in a process where no formula module has been imported yet.
+        manifest_json = subprocess.check_output(
+            [
+                sys.executable,
+                '-c',
+                'import json, sys; from {} import build_manifest; json.dump(build_manifest(), sys.stdout)'.format(
+                    __name__),
+                ],
+            env = dict(os.environ, PYTHONPATH = os.pathsep.join(sys.path)),
+            )
+        return json.loads(manifest_json)
+    module_name_by_variable_name = {}
+    known_columns_name = set(iter_columns_name())
+    for module_name in formula_modules_name:
+        import_formula_module(module_name)
+        for column_name in iter_columns_name():
+            if column_name not in known_columns_name:
+                known_columns_name.add(column_name)
+                module_name_by_variable_name[column_name] = module_name
+    return module_name_by_variable_name
+
+
+def get_model_key():
+    """Return a hash of the sources of the model."""
+    strings = [FORMAT_VERSION]
+    for dir_path, dirs_name, files_name in os.walk(model_dir):
+        dirs_name.sort()
+        for file_name in sorted(files_name):
+            if file_name.endswith('.py'):
+                file_path = os.path.join(dir_path, file_name)
+                strings.append(os.path.relpath(file_path, model_dir))
+                with open(file_path, 'rb') as source_file:
+                    strings.append(source_file.read())
+    return caches.hash_strings(strings)
+
+
+def is_model_loaded():
+    """Return whether a formula module has already been imported by the current process."""
+    return any(
+        '{}.{}'.format(package_name, module_name) in sys.modules
+        for module_name in formula_modules_name
+        )
+
+
+def load_manifest():
+    """Load the manifest from the disk cache when it is up to date, otherwise build it (and cache it)."""
+    cache_dir = caches.get_cache_dir('registry')
+    file_path = os.path.join(cache_dir, 'manifest-{}.json'.format(get_model_key())) \
+        if cache_dir is not None else None
+    if file_path is not None and os.path.exists(file_path):
+        try:
+            with open(file_path) as manifest_file:
+                return json.load(manifest_file)
+        except (IOError, ValueError) as exc:
+            log.warning(u'Ignoring invalid variables manifest {}: {}'.format(file_path, exc))
+    module_name_by_variable_name = build_manifest()
+    if not module_name_by_variable_name:
+        raise ValueError(u'The variables manifest is empty')
+    if file_path is not None:
+        caches.write_atomically(file_path, lambda manifest_file: json.dump(module_name_by_variable_name,
+            manifest_file, indent = 2, sort_keys = True))
+    return module_name_by_variable_name
+
+
+# Lazy column_by_name
+
+
+class LazyColumnByName(collections.OrderedDict):
+    """A column_by_name that imports the formula module of a variable the first time this variable is requested.
+
+    Looking up a variable by name only imports the module that defines it (and the modules it depends on).
+    Iterating over all the variables (or copying them, for example to build a reform) imports every formula module.
+    """
+    module_name_by_variable_name = None
+
+    def __init__(self, column_by_name, module_name_by_variable_name):
+        # OrderedDict.__setitem__ calls __contains__, which needs module_name_by_variable_name.
+        self.module_name_by_variable_name = {}
+        super(LazyColumnByName, self).__init__(column_by_name)
+        self.module_name_by_variable_name = {
+            variable_name: module_name
+            for variable_name, module_name in module_name_by_variable_name.iteritems()
+            if not dict.__contains__(self, variable_name)
+            }
+
+    def __contains__(self, name):
+        return dict.__contains__(self, name) or name in self.module_name_by_variable_name
+
+    def __getitem__(self, name):
+        if not dict.__contains__(self, name):
+            self.load_variable(name)
+        return super(LazyColumnByName, self).__getitem__(name)
+
+    def __iter__(self):
+        self.load_all()
+        return super(LazyColumnByName, self).__iter__()
+
+    def __len__(self):
+        self.load_all()
+        return super(LazyColumnByName, self).__len__()
+
+    def __reversed__(self):
+        self.load_all()
+        return super(LazyColumnByName, self).__reversed__()
+
+    def copy(self):
+        self.load_all()
+        return collections.OrderedDict(self.iteritems())
+
+    def get(self, name, default = None):
+        return self[name] if name in self else default
+
+    def load_all(self):
+        if self.module_name_by_variable_name:
+            for module_name in formula_modules_name:
+                import_formula_module(module_name)
+            self.update_from_entities()
+            self.module_name_by_variable_name = {}
+
+    def load_variable(self, name):
+        module_name = self.module_name_by_variable_name.get(name)
+        if module_name is not None:
+            import_formula_module(module_name)
+            self.update_from_entities()
+
+    def update_from_entities(self):
+        for entity_class in entities.entity_class_by_symbol.itervalues():
+            for column_name, column in entity_class.column_by_name.iteritems():
+                # Remove variable from manifest before adding it, for OrderedDict.__setitem__ to link it.
+                self.module_name_by_variable_name.pop(column_name, None)
+                if not dict.__contains__(self, column_name):
+                    self[column_name] = column
+
+
+def main():
+    logging.basicConfig(level = logging.INFO, stream = sys.stdout)
+    module_name_by_variable_name = load_manifest()
+    log.info(u'Variables manifest contains {} variables'.format(len(module_name_by_variable_name)))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -1,10 +1,8 @@
 # -*- coding: utf-8 -*-
 
-from functools import partial
-from numpy import (
-    busday_count as original_busday_count, datetime64, maximum as max_, minimum as min_, timedelta64,
-    )
+from numpy import datetime64, maximum as max_, minimum as min_, timedelta64
 
+from .... import calendars, depcom_tables
 from ...base import *  # noqa analysis:ignore
 from ...prestations.prestations_familiales.base_ressource import nb_enf
 
@@ -240,6 +238,17 @@ class depcom_entreprise(Variable):
     label = u"Localisation entreprise (depcom)"
 
 
+class code_insee_commune_entreprise(Variable):
+    column = IntCol
+    entity_class = Individus
+    label = u"Localisation entreprise (depcom), sous forme d'entier"
+
+    def function(self, simulation, period):
+        depcom_entreprise = simulation.calculate('depcom_entreprise', period)
+
+        return period, depcom_tables.depcom_to_code(depcom_entreprise)
+
+
 class code_postal_entreprise(Variable):
     column = FixedStrCol(max_length = 5)
     entity_class = Individus
@@ -527,11 +536,10 @@ class nombre_jours_calendaires(Variable):
         contrat_de_travail_debut = simulation.calculate('contrat_de_travail_debut', period)
         contrat_de_travail_fin = simulation.calculate('contrat_de_travail_fin', period)
 
-        busday_count = partial(original_busday_count, weekmask = "1" * 7)
         debut_mois = datetime64(period.start.offset('first-of', 'month'))
         fin_mois = datetime64(period.start.offset('last-of', 'month'))
         jours_travailles = max_(
-            busday_count(
+            calendars.count_jours_calendaires(
                 max_(contrat_de_travail_debut, debut_mois),
                 min_(contrat_de_travail_fin, fin_mois) + timedelta64(1, 'D')
                 ),
@@ -639,10 +647,10 @@ class af_nbenf_fonc(Variable):
         law = simulation.legislation_at(period.start)
         nbh_travaillees = 169
         smic_mensuel_brut = law.cotsoc.gen.smic_h_b * nbh_travaillees
-        autonomie_financiere_holder = (salaire_de_base / 6) >= (law.fam.af.seuil_rev_taux * smic_mensuel_brut)
-        age = self.split_by_roles(age_holder, roles = ENFS)
-        autonomie_financiere = self.split_by_roles(autonomie_financiere_holder, roles = ENFS)
-        af_nbenf = nb_enf(age, autonomie_financiere, law.fam.af.age1, law.fam.af.age2)
+        autonomie_financiere = (salaire_de_base / 6) >= (law.fam.af.seuil_rev_taux * smic_mensuel_brut)
+        familles = self.holder.entity
+        age = age_holder.array
+        af_nbenf = nb_enf(familles, age, autonomie_financiere, law.fam.af.age1, law.fam.af.age2)
 
         return period, af_nbenf
 
@@ -0,0 +1,229 @@
+# -*- coding: utf-8 -*-
+
+"""Storage of the monthly values of a variable in yearly panels.
+
+By default, a holder stores the array of each month in its own entry of `_array_by_period`. When a variable is stored
+in monthly panels, the arrays of the 12 months of a year are the rows of a single contiguous (12 × N) array, so that
+sums over several months are sums of slices of a panel, and the trajectory of a whole year is a single array.
+
+The cumulative sums of the months of each panel are cached, so that the sum over any range of months is the difference
+of two cumulative sums. They are invalidated when the array of a month is set or deleted. To keep them valid, the rows
+and the panels that are read are read-only: to change the value of a month, set a new array.
+"""
+
+
+import collections
+
+import numpy as np
+
+
+class MonthlyPanel(object):
+    """The arrays of the 12 months of a year, stored as the rows of a (12 × N) array."""
+    array = None
+    cumulative_sums = None  # Cached (13 × N) cumulative sums of the rows, starting with a row of zeros
+    period_by_month_index = None  # Period of each row, or None when the row is empty.
+    pending_array_by_month_index = None  # Arrays set but not yet copied into their row
+
+    def __init__(self, count, dtype):
+        self.array = np.zeros((12, count), dtype = dtype)
+        self.pending_array_by_month_index = {}
+        self.period_by_month_index = [None] * 12
+
+    def accepts(self, array):
+        return isinstance(array, np.ndarray) and array.shape == self.array.shape[1:] and array.dtype == self.array.dtype
+
+    def copy(self):
+        self.flush()
+        new = MonthlyPanel(self.array.shape[1], self.array.dtype)
+        new.array[:] = self.array
+        new.period_by_month_index = list(self.period_by_month_index)
+        return new
+
+    def delete(self, month_index):
+        self.cumulative_sums = None
+        self.period_by_month_index[month_index] = None
+        self.pending_array_by_month_index.pop(month_index, None)
+
+    def flush(self):
+        """Copy the arrays that have been set into their row."""
+        if self.pending_array_by_month_index:
+            self.cumulative_sums = None
+        for month_index, array in self.pending_array_by_month_index.iteritems():
+            self.array[month_index] = array
+        self.pending_array_by_month_index.clear()
+
+    def get(self, month_index):
+        if self.period_by_month_index[month_index] is None:
+            return None
+        # Once read, the value of a month is always a read-only view of the row of the panel, so that the cached
+        # cumulative sums stay valid.
+        array = self.pending_array_by_month_index.pop(month_index, None)
+        if array is not None:
+            self.array[month_index] = array
+            self.cumulative_sums = None
+        row = self.array[month_index]
+        row.flags.writeable = False
+        return row
+
+    def get_cumulative_sums(self):
+        if self.cumulative_sums is None:
+            self.flush()
+            kind = self.array.dtype.kind
+            # Booleans are summed as integers, then converted back (like `+=` does, as a logical or).
+            dtype = np.float64 if kind in ('c', 'f') else np.int64
+            cumulative_sums = np.zeros((13, self.array.shape[1]), dtype = dtype)
+            np.cumsum(self.array, axis = 0, dtype = dtype, out = cumulative_sums[1:])
+            self.cumulative_sums = cumulative_sums
+        return self.cumulative_sums
+
+    def is_full(self, start_month_index, stop_month_index):
+        return all(
+            period is not None
+            for period in self.period_by_month_index[start_month_index:stop_month_index]
+            )
+
+    def set(self, period, month_index, array):
+        self.cumulative_sums = None
+        self.period_by_month_index[month_index] = period
+        if array.base is self.array and np.may_share_memory(array, self.array[month_index]):
+            # Array is already the row of the panel.
+            self.pending_array_by_month_index.pop(month_index, None)
+        else:
+            # Keep a reference to the array until it is read, because the code that sets an array may still fill it.
+            self.pending_array_by_month_index[month_index] = array
+
+    def sum(self, start_month_index, stop_month_index):
+        """Return the sum of the rows of the months in [start_month_index, stop_month_index[."""
+        if stop_month_index - start_month_index == 1:
+            self.flush()
+            return self.array[start_month_index].copy()
+        cumulative_sums = self.get_cumulative_sums()
+        array_sum = cumulative_sums[stop_month_index] - cumulative_sums[start_month_index]
+        if self.array.dtype == np.bool_:
+            return array_sum > 0
+        return array_sum.astype(self.array.dtype)
+
+
+class MonthlyPanels(collections.MutableMapping):
+    """Arrays of a holder by period, where the arrays of single months are stored in yearly panels.
+
+    This mapping replaces the `_array_by_period` dictionary of a holder. Arrays of other periods (and months whose
+    array doesn't fit in a panel) are stored in a regular dictionary.
+    """
+    array_by_other_period = None
+    panel_by_year = None
+
+    def __init__(self, array_by_period = None):
+        self.array_by_other_period = {}
+        self.panel_by_year = {}
+        if array_by_period:
+            self.update(array_by_period)
+
+    def __delitem__(self, period):
+        year_and_month_index = get_year_and_month_index(period)
+        if year_and_month_index is not None:
+            year, month_index = year_and_month_index
+            panel = self.panel_by_year.get(year)
+            if panel is not None and panel.period_by_month_index[month_index] is not None:
+                panel.delete(month_index)
+                return
+        del self.array_by_other_period[period]
+
+    def __getitem__(self, period):
+        year_and_month_index = get_year_and_month_index(period)
+        if year_and_month_index is not None:
+            year, month_index = year_and_month_index
+            panel = self.panel_by_year.get(year)
+            if panel is not None:
+                array = panel.get(month_index)
+                if array is not None:
+                    return array
+        return self.array_by_other_period[period]
+
+    def __iter__(self):
+        for year, panel in sorted(self.panel_by_year.iteritems()):
+            for period in panel.period_by_month_index:
+                if period is not None:
+                    yield period
+        for period in self.array_by_other_period:
+            yield period
+
+    def __len__(self):
+        return len(self.array_by_other_period) + sum(
+            1
+            for panel in self.panel_by_year.itervalues()
+            for period in panel.period_by_month_index
+            if period is not None
+            )
+
+    def __setitem__(self, period, array):
+        year_and_month_index = get_year_and_month_index(period)
+        if year_and_month_index is not None:
+            year, month_index = year_and_month_index
+            panel = self.panel_by_year.get(year)
+            if panel is None and isinstance(array, np.ndarray) and array.ndim == 1:
+                panel = self.panel_by_year[year] = MonthlyPanel(len(array), array.dtype)
+            if panel is not None:
+                if panel.accepts(array):
+                    panel.set(period, month_index, array)
+                    self.array_by_other_period.pop(period, None)
+                    return
+                panel.delete(month_index)
+        self.array_by_other_period[period] = array
+
+    def copy(self):
+        new = MonthlyPanels()
+        new.array_by_other_period = self.array_by_other_period.copy()
+        new.panel_by_year = dict(
+            (year, panel.copy())
+            for year, panel in self.panel_by_year.iteritems()
+            )
+        return new
+
+    def get_panel(self, year):
+        """Return the (12 × N) panel of a year (read-only), or None when some months of this year are missing."""
+        panel = self.panel_by_year.get(year)
+        if panel is None or not panel.is_full(0, 12):
+            return None
+        panel.flush()
+        array = panel.array.view()
+        array.flags.writeable = False
+        return array
+
+    def sum_months(self, period):
+        """Return the sum of the arrays of the months of period, or None when some months are not in panels."""
+        if period.start.day != 1:
+            return None
+        if period.unit == u'month':
+            months_count = period.size
+        elif period.unit == u'year':
+            months_count = period.size * 12
+        else:
+            return None
+        year = period.start.year
+        month_index = period.start.month - 1
+        slices = []
+        while months_count > 0:
+            stop_month_index = min(month_index + months_count, 12)
+            panel = self.panel_by_year.get(year)
+            if panel is None or not panel.is_full(month_index, stop_month_index):
+                return None
+            slices.append((panel, month_index, stop_month_index))
+            months_count -= stop_month_index - month_index
+            year += 1
+            month_index = 0
+        array = None
+        for panel, start_month_index, stop_month_index in slices:
+            panel_sum = panel.sum(start_month_index, stop_month_index)
+            if array is None:
+                array = panel_sum
+            else:
+                array += panel_sum
+        return array
+
+
+def get_year_and_month_index(period):
+    """Return the year and the index (from 0) of the month of a single-month period, or None for other periods."""
+    if period is None or period.unit != u'month' or period.size != 1 or period.start.day != 1:
+        return None
+    return period.start.year, period.start.month - 1
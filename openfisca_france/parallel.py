@@ -0,0 +1,164 @@
+# -*- coding: utf-8 -*-
+
+"""Parallel computation of surveys, sharded by household, in a pool of processes.
+
+A simulation runs on a single core. The persons of a survey (see module surveys) are partitioned into shards along the
+connected components of their familles, foyers fiscaux and ménages, so that no entity is split between shards. Each
+shard is computed in a worker process, that creates its tax-benefit system once, when it starts. The results of the
+shards are then reassembled into arrays in the order of the whole survey: the persons in the order of the individus
+table, and the group entities in the order of their sorted ids, like in `surveys.new_simulation`.
+"""
+
+
+import multiprocessing
+
+import numpy as np
+
+from . import entities, init_tax_benefit_system, surveys
+
+
+worker_tax_benefit_system = None  # Tax-benefit system of the current worker process
+
+
+def calculate(table_by_key_plural, period, variables_name, new_tax_benefit_system = init_tax_benefit_system,
+        processes_count = None, shards_count = None, **kwargs):
+    """Compute variables of a survey in a pool of processes, and return their arrays by variable name.
+
+    `new_tax_benefit_system` is a (picklable) function called once by each worker to create its tax-benefit system.
+    Other keyword arguments are given to the simulation of each shard.
+    """
+    table_by_key_plural = dict(
+        (key_plural, surveys.load_table(table) if isinstance(table, basestring) else table)
+        for key_plural, table in table_by_key_plural.iteritems()
+        )
+    individus = table_by_key_plural['individus']
+    if processes_count is None:
+        processes_count = multiprocessing.cpu_count()
+    if shards_count is None:
+        # More shards than processes, to balance the load of the workers.
+        shards_count = processes_count * 4
+    ids_name = get_ids_name(individus)
+    persons_shard = get_persons_shard(get_components(individus, ids_name), shards_count)
+    ids_by_name = dict(
+        (id_name, np.unique(individus[id_name]))
+        for id_name in ids_name.itervalues()
+        )
+    persons_index_by_shard = [
+        np.flatnonzero(persons_shard == shard)
+        for shard in np.unique(persons_shard)
+        ]
+    tasks = [
+        (period, get_shard_tables(table_by_key_plural, ids_name, persons_index), variables_name, kwargs)
+        for persons_index in persons_index_by_shard
+        ]
+
+    if processes_count == 1:
+        init_worker(new_tax_benefit_system)
+        results = map(calculate_shard, tasks)
+    else:
+        pool = multiprocessing.Pool(processes = processes_count, initializer = init_worker,
+            initargs = (new_tax_benefit_system,))
+        try:
+            results = pool.map(calculate_shard, tasks, chunksize = 1)
+        finally:
+            pool.close()
+            pool.join()
+
+    array_by_name = {}
+    for persons_index, key_plural_and_array_by_name in zip(persons_index_by_shard, results):
+        shard_individus = dict(
+            (id_name, np.asarray(individus[id_name])[persons_index])
+            for id_name in ids_name.itervalues()
+            )
+        for name, (key_plural, shard_array) in key_plural_and_array_by_name.iteritems():
+            if key_plural == 'individus':
+                index = persons_index
+                count = len(persons_shard)
+            else:
+                id_name = ids_name[key_plural]
+                index = np.searchsorted(ids_by_name[id_name], np.unique(shard_individus[id_name]))
+                count = len(ids_by_name[id_name])
+            array = array_by_name.get(name)
+            if array is None:
+                array = array_by_name[name] = np.empty(count, dtype = shard_array.dtype)
+            array[index] = shard_array
+    return array_by_name
+
+
+def calculate_shard(task):
+    """Compute variables in the simulation of a shard, and return their entity and array by variable name."""
+    period, table_by_key_plural, variables_name, kwargs = task
+    simulation = surveys.new_simulation(worker_tax_benefit_system, period, table_by_key_plural, **kwargs)
+    return dict(
+        (variable_name, (simulation.get_or_new_holder(variable_name).entity.key_plural,
+            simulation.calculate(variable_name, period)))
+        for variable_name in variables_name
+        )
+
+
+def get_components(individus, ids_name):
+    """Return for each person the index of the first person of its connected component of group entities."""
+    persons_count = len(individus.itervalues().next()) if individus else 0
+    component = np.arange(persons_count)
+    entities_index = [
+        np.unique(individus[id_name], return_inverse = True)[1]
+        for id_name in ids_name.itervalues()
+        ]
+    while True:
+        previous_component = component
+        for entity_index in entities_index:
+            # Give to each person the smallest component of the persons of its entity.
+            entity_component = np.empty(entity_index.max() + 1 if persons_count else 0, dtype = component.dtype)
+            entity_component.fill(persons_count)
+            np.minimum.at(entity_component, entity_index, component)
+            component = entity_component[entity_index]
+        component = component[component]
+        if (component == previous_component).all():
+            return component
+
+
+def get_ids_name(individus):
+    """Return the name of the id column of individus of each group entity, by entity key plural."""
+    return dict(
+        (key_plural, entity_class.index_for_person_variable_name)
+        for key_plural, entity_class in entities.entity_class_by_key_plural.iteritems()
+        if not entity_class.is_persons_entity and entity_class.index_for_person_variable_name in individus
+        )
+
+
+def get_persons_shard(component, shards_count):
+    """Return the shard of each person, giving to each shard the persons of successive components, about evenly."""
+    persons_count = len(component)
+    component_size = np.bincount(component, minlength = persons_count)
+    persons_before_component = np.cumsum(component_size) - component_size
+    component_shard = persons_before_component * shards_count // max(persons_count, 1)
+    return component_shard[component]
+
+
+def get_shard_tables(table_by_key_plural, ids_name, persons_index):
+    """Return the tables of the persons of a shard and of their group entities."""
+    individus = table_by_key_plural['individus']
+    shard_table_by_key_plural = dict(
+        individus = dict(
+            (name, np.asarray(array)[persons_index])
+            for name, array in individus.iteritems()
+            ),
+        )
+    for key_plural, table in table_by_key_plural.iteritems():
+        if key_plural == 'individus' or not table:
+            continue
+        if key_plural not in ids_name:
+            raise ValueError(u'Persons of {} are missing'.format(key_plural))
+        id_name = ids_name[key_plural]
+        table_ids = np.asarray(table[id_name])
+        selected = np.in1d(table_ids, shard_table_by_key_plural['individus'][id_name])
+        shard_table_by_key_plural[key_plural] = dict(
+            (name, np.asarray(array)[selected])
+            for name, array in table.iteritems()
+            )
+    return shard_table_by_key_plural
+
+
+def init_worker(new_tax_benefit_system):
+    global worker_tax_benefit_system
+    worker_tax_benefit_system = new_tax_benefit_system()
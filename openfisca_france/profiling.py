@@ -0,0 +1,112 @@
+# -*- coding: utf-8 -*-
+
+"""Profiling of the formulas computed by a simulation, variable by variable.
+
+A profiler is given to a simulation (`Simulation(profiler = Profiler())` or `scenario.new_simulation(profiler = ...)`).
+Each call to the compute methods of the simulation is then recorded: wall time, self time (wall time minus the time
+spent computing the variables read by the formula), calls, cache hits, size of the computed arrays and requested
+periods, by variable and by dated function. The chain of nested computations is also recorded, to be exported as
+collapsed stacks, the input format of flamegraph tools (FlameGraph, speedscope…).
+
+Without a profiler, the simulation doesn't measure anything.
+"""
+
+
+import collections
+import csv
+import timeit
+
+
+class Profiler(object):
+    self_time_by_stack = None  # Self time of each chain of nested computations, as a tuple of variables names
+    stack = None  # Frames of the computations in progress: [variable name, start time, children time]
+    stats_by_key = None  # Statistics by (variable name, start of dated function)
+
+    def __init__(self):
+        self.self_time_by_stack = collections.defaultdict(float)
+        self.stack = []
+        self.stats_by_key = {}
+
+    def get_rows(self):
+        """Return the statistics of each variable and dated function, the most expensive (by self time) first."""
+        rows = [
+            dict(
+                cache_hits = stats['cache_hits'],
+                calls = stats['calls'],
+                cells = stats['cells'],
+                function = function_start,
+                periods = u' '.join(sorted(unicode(period) for period in stats['periods'])),
+                self_seconds = stats['self_seconds'],
+                variable = variable_name,
+                wall_seconds = stats['wall_seconds'],
+                )
+            for (variable_name, function_start), stats in self.stats_by_key.iteritems()
+            ]
+        rows.sort(key = lambda row: row['self_seconds'], reverse = True)
+        return rows
+
+    def start(self, variable_name):
+        self.stack.append([variable_name, timeit.default_timer(), 0.0])
+
+    def stop(self, variable_name, period, function_start = None, array = None, cache_hit = False):
+        frame_variable_name, start_time, children_time = self.stack.pop()
+        assert frame_variable_name == variable_name
+        wall_time = timeit.default_timer() - start_time
+        self_time = wall_time - children_time
+        if self.stack:
+            self.stack[-1][2] += wall_time
+        stats = self.stats_by_key.get((variable_name, function_start))
+        if stats is None:
+            self.stats_by_key[(variable_name, function_start)] = stats = dict(
+                cache_hits = 0,
+                calls = 0,
+                cells = 0,
+                periods = set(),
+                self_seconds = 0.0,
+                wall_seconds = 0.0,
+                )
+        stats['calls'] += 1
+        if cache_hit:
+            stats['cache_hits'] += 1
+        elif array is not None:
+            stats['cells'] += array.size
+        if period is not None:
+            stats['periods'].add(period)
+        stats['self_seconds'] += self_time
+        # Recursive calls (a variable computed for another period) are counted only once in the wall time.
+        if all(frame[0] != variable_name for frame in self.stack):
+            stats['wall_seconds'] += wall_time
+        self.self_time_by_stack[tuple(frame[0] for frame in self.stack) + (variable_name,)] += self_time
+
+    def write_collapsed_stacks(self, file_path):
+        """Write the self time (in microseconds) of each chain of computations, in collapsed stacks format."""
+        with open(file_path, 'w') as stacks_file:
+            for stack, self_time in sorted(self.self_time_by_stack.iteritems()):
+                stacks_file.write('{} {}\n'.format(';'.join(stack), int(round(self_time * 1e6))))
+
+    def write_table(self, file_path):
+        """Write the statistics of each variable and dated function as a CSV file."""
+        columns_name = ['variable', 'function', 'calls', 'cache_hits', 'wall_seconds', 'self_seconds', 'cells',
+            'periods']
+        with open(file_path, 'wb') as csv_file:
+            writer = csv.writer(csv_file)
+            writer.writerow(columns_name)
+            for row in self.get_rows():
+                writer.writerow([
+                    unicode(row[column_name]).encode('utf-8') if row[column_name] is not None else ''
+                    for column_name in columns_name
+                    ])
+
+
+def get_function_start(holder, period):
+    """Return the start date of the dated function of the formula of a holder used for a period, if any."""
+    dated_formulas = getattr(holder.formula, 'dated_formulas', None)
+    if not dated_formulas or period is None:
+        return None
+    for dated_formula in dated_formulas:
+        start_instant = dated_formula['start_instant']
+        stop_instant = dated_formula['stop_instant']
+        if (start_instant is None or start_instant <= period.start) \
+                and (stop_instant is None or period.start <= stop_instant):
+            return unicode(start_instant) if start_instant is not None else None
+    return None
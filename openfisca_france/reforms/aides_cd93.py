@@ -3,8 +3,9 @@
 from __future__ import division
 
 from openfisca_core import reforms
-from numpy import vectorize, maximum as max_, logical_not as not_, logical_or as or_, absolute as abs_
+from numpy import maximum as max_, logical_not as not_, logical_or as or_, absolute as abs_
 
+from .. import depcom_tables
 from ..model.base import *
 
 def build_reform(tax_benefit_system):
@@ -26,18 +27,9 @@ def build_reform(tax_benefit_system):
 
         def function(self, simulation, period):
             period = period.this_month
-            depcom = simulation.calculate('depcom', period)
+            code_insee_commune = simulation.calculate('code_insee_commune', period)
 
-            def is_resident_93(code_insee):
-                prefix = code_insee[0:2]
-                result = (prefix == "93")
-                return result
-
-            is_resident_93_vec = vectorize(is_resident_93)
-
-            result = is_resident_93_vec(depcom)
-
-            return period, result
+            return period, depcom_tables.departement_from_code(code_insee_commune) == 93
 
 
     class adpa_eligibilite(Reform.Variable):
@@ -3,32 +3,8 @@
 from __future__ import division
 
 from openfisca_core import columns, reforms
-from scipy.optimize import fsolve
 
-from .. import entities
-
-
-def calculate_net_from(salaire_de_base, simulation, period, requested_variable_names):
-
-    # We're not wanting to calculate salaire_de_base again, but instead manually set it as an input variable
-    # To avoid possible conflicts, remove its function
-    simulation.holder_by_name['salaire_de_base'].formula.function = None
-    simulation.get_or_new_holder('salaire_de_base').array = salaire_de_base
-
-    # Work in isolation
-    temp_simulation = simulation.clone()
-
-    # Calculated variable holders might contain undesired cache
-    # (their entity.simulation points to the original simulation above)
-    for name in requested_variable_names:
-        del temp_simulation.holder_by_name[name]
-
-    # Force recomputing of salaire_net
-    del temp_simulation.holder_by_name['salaire_net_a_payer']
-
-    net = temp_simulation.calculate('salaire_net_a_payer', period)[0]
-
-    return net
+from .. import entities, inversions
 
 
 def build_reform(tax_benefit_system):
@@ -55,28 +31,17 @@ def build_reform(tax_benefit_system):
 
             simulation = self.holder.entity.simulation
 
-            # List of variables already calculated. We will need it to remove their holders,
-            # that might contain undesired cache
-            requested_variable_names = simulation.requested_periods_by_variable_name.keys()
-            if requested_variable_names:
-                requested_variable_names.remove(u'salaire_de_base')
-            # Clean 'requested_periods_by_variable_name', that is used by -core to check for computation cycles.
-            # This variable, salaire_de_base, might have been called from variable X,
-            # that will be calculated again in our iterations to compute the salaire_net requested
-            # as an input variable, hence producing a cycle error
-            simulation.requested_periods_by_variable_name = dict()
-
-            def solve_func(net):
-                def innerfunc(essai):
-                    return calculate_net_from(essai, simulation, period, requested_variable_names) - net
-                return innerfunc
-
-            brut_calcule = \
-                fsolve(
-                    solve_func(net),
-                    net*1.5,  # on entend souvent parler cette méthode...
-                    xtol = 1/10  # précision
-                    )
+            # List of variables already calculated. Their holders might contain undesired cache.
+            requested_variables_name = simulation.requested_periods_by_variable_name.keys()
+            scratch_simulation = inversions.ScratchSimulation(simulation, 'salaire_de_base', 'salaire_net_a_payer',
+                period, excluded_variables_name = requested_variables_name)
+
+            # Start from the salaire de base of the previous month, when it has already been computed.
+            brut_calcule = self.holder.get_array(period.offset(-1)) if period.unit == u'month' else None
+            if brut_calcule is None:
+                brut_calcule = net * 1.3
+            brut_calcule = inversions.solve_increasing(scratch_simulation.calculate, net, brut_calcule,
+                xtolerance = 0.1)
 
             return period, brut_calcule
 
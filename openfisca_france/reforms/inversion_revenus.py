@@ -4,26 +4,84 @@ from __future__ import division
 
 # import logging
 
+import numpy as np
 from openfisca_core import columns, reforms
 # from openfisca_core.taxscales import MarginalRateTaxScale
 
-from .. import entities
+from .. import entities, inversions
+from ..model.prelevements_obligatoires.prelevements_sociaux.cotisations_sociales.base import CompiledBaremes
 
 
 # log = logging.getLogger(__name__)
 
 
-def brut_to_target(target_name = None, period = None, simulation = None, **input_array_by_name):
-    simulation = simulation.clone(debug = simulation.debug, debug_all = simulation.debug_all, trace = simulation.trace)
-    simulation.get_or_new_holder(target_name).delete_arrays()
-    for variable_name, array in input_array_by_name.iteritems():
-        simulation.get_or_new_holder(variable_name).put_in_cache(array, period)
-    return simulation.calculate_add(target_name)
+def brut_to_target(simulation, input_name, target_name, target, period, thresholds, plafond_securite_sociale,
+        extra_breakpoints = None):
+    """Return the brut income whose target variable is `target`, by inversion of the brut → target mapping.
+
+    For a given period, this mapping is piecewise linear: its slope only changes at the thresholds of the barèmes of
+    cotisations and of the abattements of CSG & CRDS (expressed in plafonds de la sécurité sociale), and at
+    `extra_breakpoints` (expressed in euros).
+    """
+    thresholds = sorted(set(threshold for threshold in thresholds if 0 <= threshold < np.inf) | set([0]))
+    # An extra breakpoint above the last threshold gives the slope of the last bracket.
+    thresholds.append(thresholds[-1] + 1)
+    breakpoints = np.outer(thresholds, np.ones(len(target))) * plafond_securite_sociale
+    if extra_breakpoints:
+        breakpoints = np.sort(np.vstack([breakpoints] + [
+            np.ones(len(target)) * extra_breakpoint
+            for extra_breakpoint in extra_breakpoints
+            ]), axis = 0)
+    scratch_simulation = inversions.ScratchSimulation(simulation, input_name, target_name, period)
+    return inversions.invert_piecewise_linear(scratch_simulation.calculate, target, breakpoints)
+
+
+def get_abattements_thresholds(*law_nodes):
+    return [
+        threshold
+        for law_node in law_nodes
+        if getattr(law_node, 'abattement', None) is not None
+        for threshold in law_node.abattement.thresholds
+        ]
+
+
+def get_months_count(period):
+    return period.size * 12 if period.unit == u'year' else period.size
+
+
+def invert_chomage(simulation, target_name, target, period):
+    law = simulation.legislation_at(period.start)
+    # Below this amount (in brut), chômage is exonerated of CSG & CRDS.
+    seuil_exoneration = law.csg.chomage.min_exo * 35 * 52 / 12 * law.cotsoc.gen.smic_h_b * get_months_count(period)
+    return brut_to_target(simulation, 'chomage_brut', target_name, target, period,
+        thresholds = get_abattements_thresholds(law.csg.chomage.deductible, law.csg.chomage.imposable,
+            law.crds.activite),
+        plafond_securite_sociale = law.cotsoc.gen.plafond_securite_sociale * get_months_count(period),
+        extra_breakpoints = [seuil_exoneration],
+        )
 
 
-def build_reform(tax_benefit_system):
-    from scipy.optimize import fsolve
+def invert_retraite(simulation, target_name, target, period):
+    law = simulation.legislation_at(period.start)
+    return brut_to_target(simulation, 'retraite_brute', target_name, target, period,
+        thresholds = get_abattements_thresholds(law.csg.retraite.deductible, law.csg.retraite.imposable,
+            law.crds.retraite),
+        plafond_securite_sociale = law.cotsoc.gen.plafond_securite_sociale * get_months_count(period),
+        )
+
+
+def invert_salaire(simulation, target_name, target, period):
+    law = simulation.legislation_at(period.start)
+    thresholds = list(np.unique(CompiledBaremes.get(law.cotsoc.cotisations_salarie).thresholds))
+    thresholds.extend(get_abattements_thresholds(law.csg.activite.deductible, law.csg.activite.imposable,
+        law.crds.activite))
+    return brut_to_target(simulation, 'salaire_de_base', target_name, target, period,
+        thresholds = thresholds,
+        plafond_securite_sociale = simulation.calculate_add('plafond_securite_sociale', period),
+        )
+
 
+def build_reform(tax_benefit_system):
     Reform = reforms.make_reform(
         key = 'inversion_revenus',
         name = u'Inversion des revenus',
@@ -68,37 +126,19 @@ def build_reform(tax_benefit_system):
                 if salaire_net is not None:
                     # Calcule le salaire brut à partir du salaire net par inversion numérique.
                     if (salaire_net == 0).all():
-                        # Quick path to avoid fsolve when using default value of input variables.
+                        # Quick path to avoid the inversion when using default value of input variables.
                         return period, salaire_net
-                    simulation = self.holder.entity.simulation
-
-                    def solve_function(salaire_de_base):
-                        return brut_to_target(
-                            target_name = 'salaire_net',
-                            period = period,
-                            salaire_de_base = salaire_de_base,
-                            simulation = simulation,
-                            ) - salaire_net
-                    return period, fsolve(solve_function, salaire_net)
+                    return period, invert_salaire(self.holder.entity.simulation, 'salaire_net', salaire_net, period)
 
                 salaire_imposable_pour_inversion = simulation.calculate_add_divide('salaire_imposable_pour_inversion',
                     period)
 
             # Calcule le salaire brut à partir du salaire imposable par inversion numérique.
             if (salaire_imposable_pour_inversion == 0).all():
-                # Quick path to avoid fsolve when using default value of input variables.
+                # Quick path to avoid the inversion when using default value of input variables.
                 return period, salaire_imposable_pour_inversion
-            simulation = self.holder.entity.simulation
-
-            def solve_function(salaire_de_base):
-                return brut_to_target(
-                    target_name = 'salaire_imposable',
-                    period = period,
-                    salaire_de_base = salaire_de_base,
-                    simulation = simulation,
-                    ) - salaire_imposable_pour_inversion
-
-            return period, fsolve(solve_function, salaire_imposable_pour_inversion)
+            return period, invert_salaire(self.holder.entity.simulation, 'salaire_imposable',
+                salaire_imposable_pour_inversion, period)
 
     #       TODO: inclure un taux de prime et calculer les primes en même temps que salaire_de_base
 
@@ -193,37 +233,19 @@ def build_reform(tax_benefit_system):
                 if chomage_net is not None:
                     # Calcule les allocations chomage brutes à partir des allocations nettes par inversion numérique.
                     if (chomage_net == 0).all():
-                        # Quick path to avoid fsolve when using default value of input variables.
+                        # Quick path to avoid the inversion when using default value of input variables.
                         return period, chomage_net
-                    simulation = self.holder.entity.simulation
-
-                    def solve_function(chomage_brut):
-                        return brut_to_target(
-                            chomage_brut = chomage_brut,
-                            target_name = 'chomage_net',
-                            period = period,
-                            simulation = simulation,
-                            ) - chomage_net
-                    return period, fsolve(solve_function, chomage_net)
+                    return period, invert_chomage(self.holder.entity.simulation, 'chomage_net', chomage_net, period)
 
                 chomage_imposable_pour_inversion = simulation.calculate_add_divide('chomage_imposable_pour_inversion', period)
 
             # Calcule les allocations chômage brutes à partir des allocations imposables.
             # taux_csg_remplacement = simulation.calculate('taux_csg_remplacement', period)
             if (chomage_imposable_pour_inversion == 0).all():
-                # Quick path to avoid fsolve when using default value of input variables.
+                # Quick path to avoid the inversion when using default value of input variables.
                 return period, chomage_imposable_pour_inversion
-            simulation = self.holder.entity.simulation
-
-            def solve_function(chomage_brut):
-                return brut_to_target(
-                    chomage_brut = chomage_brut,
-                    # taux_csg_remplacement = taux_csg_remplacement,
-                    target_name = 'chomage_imposable',
-                    period = period,
-                    simulation = simulation,
-                    ) - chomage_imposable_pour_inversion
-            return period, fsolve(solve_function, chomage_imposable_pour_inversion)
+            return period, invert_chomage(self.holder.entity.simulation, 'chomage_imposable',
+                chomage_imposable_pour_inversion, period)
 
     class retraite_brute(Reform.Variable):
         column = columns.FloatCol
@@ -243,36 +265,20 @@ def build_reform(tax_benefit_system):
                 if retraite_nette is not None:
                     # Calcule les pensions de retraite brutes à partir des pensions nettes par inversion numérique.
                     if (retraite_nette == 0).all():
-                        # Quick path to avoid fsolve when using default value of input variables.
+                        # Quick path to avoid the inversion when using default value of input variables.
                         return period, retraite_nette
-                    simulation = self.holder.entity.simulation
-
-                    def solve_function(retraite_brute):
-                        return brut_to_target(
-                            target_name = 'retraite_nette',
-                            period = period,
-                            retraite_brute = retraite_brute,
-                            simulation = simulation,
-                            ) - retraite_nette
-                    return period, fsolve(solve_function, retraite_nette)
+                    return period, invert_retraite(self.holder.entity.simulation, 'retraite_nette', retraite_nette,
+                        period)
 
                 retraite_imposable_pour_inversion = simulation.calculate_add_divide('retraite_imposable_pour_inversion', period)
 
             # Calcule les pensions de retraite brutes à partir des pensions imposables.
-            taux_csg_remplacement = simulation.calculate('taux_csg_remplacement', period)
+            # taux_csg_remplacement is computed before the inversion, to be kept by its scratch simulation.
+            simulation.calculate('taux_csg_remplacement', period)
             if (retraite_imposable_pour_inversion == 0).all():
-                # Quick path to avoid fsolve when using default value of input variables.
+                # Quick path to avoid the inversion when using default value of input variables.
                 return period, retraite_imposable_pour_inversion
-            simulation = self.holder.entity.simulation
-
-            def solve_function(retraite_brute):
-                return brut_to_target(
-                    retraite_brute = retraite_brute,
-                    taux_csg_remplacement = taux_csg_remplacement,
-                    target_name = 'retraite_imposable',
-                    period = period,
-                    simulation = simulation,
-                    ) - retraite_imposable_pour_inversion
-            return period, fsolve(solve_function, retraite_imposable_pour_inversion)
+            return period, invert_retraite(self.holder.entity.simulation, 'retraite_imposable',
+                retraite_imposable_pour_inversion, period)
 
     return Reform()
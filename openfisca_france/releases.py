@@ -0,0 +1,164 @@
+# -*- coding: utf-8 -*-
+
+"""Output-oriented computation, releasing the intermediate arrays as soon as their last consumer is computed.
+
+By default, the holders of a simulation keep every array computed to get the requested outputs (`salaire_net`,
+`csg_deductible_salaire`, `rsa_base_ressources`…) until the simulation is dropped. A `ReleasePlan` knows, for the given
+output variables, which variables (and periods) are read by the formula of each variable (and period). This graph is
+recorded once, on a small simulation of the same period (see `ReleasePlan.record`). When the plan then computes the
+outputs of another simulation (see `ReleasePlan.calculate_outputs`), it counts the consumers of each intermediate array
+that remain to be computed, and deletes the array from its holder as soon as this count falls to zero. So the peak
+memory is roughly the width of the dependency frontier instead of the whole graph.
+
+Input arrays (every array stored before the run, even for variables having a formula), permanent variables and outputs
+are never released. When a released array is requested again (because the recorded graph differs from the computed
+one), it is computed again by its formula: the results are the same, only slower, and `recomputations_count` tells it.
+"""
+
+
+import collections
+
+
+class ReleasePlan(object):
+    completed_keys = None  # (variable name, period) whose formula has been computed during the current run
+    computing_keys = None  # Stack of the (variable name, period) being computed
+    consumers_key_by_key = None  # (variable name, period) read by the formula of each (variable name, period)
+    input_periods_by_variable_name = None  # Periods of the arrays stored before the current run, never released
+    outputs_name = None
+    periods_by_variable_name = None  # Periods of each variable read by a formula
+    read_keys_by_key = None  # Inverse of consumers_key_by_key
+    recomputations_count = 0
+    recording = False
+    released_bytes = 0
+    released_keys = None
+    releases_count = 0
+    remaining_count_by_key = None  # Number of consumers of each (variable name, period) not computed yet
+
+    def __init__(self, outputs_name):
+        self.computing_keys = []
+        self.consumers_key_by_key = collections.defaultdict(set)
+        self.periods_by_variable_name = collections.defaultdict(set)
+        self.outputs_name = list(outputs_name)
+        self.reset()
+
+    def calculate_outputs(self, simulation, period = None):
+        """Compute the outputs of a simulation, releasing the intermediate arrays. Return the arrays by output name."""
+        assert self.consumers_key_by_key, u'The plan must be recorded before computing outputs'
+        self.reset()
+        self.input_periods_by_variable_name = dict(
+            (variable_name, set(holder._array_by_period))
+            for variable_name, holder in simulation.holder_by_name.iteritems()
+            if holder._array_by_period
+            )
+        simulation.release_plan = self
+        try:
+            return collections.OrderedDict(
+                (output_name, simulation.calculate(output_name, period))
+                for output_name in self.outputs_name
+                )
+        finally:
+            simulation.release_plan = None
+
+    def get_read_keys_by_key(self):
+        """Return the (variable name, period) read by the formula of each (variable name, period)."""
+        read_keys_by_key = collections.defaultdict(set)
+        for key, consumers_key in self.consumers_key_by_key.iteritems():
+            for consumer_key in consumers_key:
+                read_keys_by_key[consumer_key].add(key)
+        return read_keys_by_key
+
+    def get_stats(self):
+        return dict(
+            recomputations_count = self.recomputations_count,
+            released_bytes = self.released_bytes,
+            releases_count = self.releases_count,
+            variables_count = len(self.periods_by_variable_name),
+            )
+
+    def read(self, simulation, variable_name, period):
+        """Record that the variable being computed reads the array of a variable for a period."""
+        key = (variable_name, period)
+        if self.recording:
+            if self.computing_keys and self.computing_keys[-1] != key:
+                self.consumers_key_by_key[key].add(self.computing_keys[-1])
+                self.periods_by_variable_name[variable_name].add(period)
+        elif key in self.released_keys:
+            self.released_keys.discard(key)
+            self.recomputations_count += 1
+
+    def record(self, simulation, period = None):
+        """Record the variables read by the formulas computing the outputs of a (small) simulation."""
+        simulation.release_plan = self
+        self.recording = True
+        try:
+            for output_name in self.outputs_name:
+                simulation.calculate(output_name, period)
+        finally:
+            self.recording = False
+            simulation.release_plan = None
+        self.reset()
+
+    def release(self, simulation, variable_name, period):
+        """Delete the arrays of a variable during a period, except those still needed by another consumer."""
+        holder = simulation.holder_by_name.get(variable_name)
+        if holder is None or holder.formula is None or holder.column.is_permanent \
+                or variable_name in self.outputs_name:
+            return
+        array_by_period = holder._array_by_period
+        if not array_by_period:
+            return
+        input_periods = self.input_periods_by_variable_name.get(variable_name, ())
+        needed_periods = [
+            needed_period
+            for needed_period in self.periods_by_variable_name[variable_name]
+            if self.remaining_count_by_key.get((variable_name, needed_period))
+            ]
+        for stored_period in list(array_by_period):
+            if stored_period in input_periods or not (
+                    period.start <= stored_period.start and stored_period.stop <= period.stop):
+                continue
+            if any(
+                    needed_period.start < stored_period.stop and stored_period.start < needed_period.stop
+                    for needed_period in needed_periods
+                    ):
+                continue
+            item_by_period = getattr(array_by_period, 'item_by_period', None)
+            item = item_by_period[stored_period] if item_by_period is not None else array_by_period[stored_period]
+            del array_by_period[stored_period]
+            if simulation.array_cache is not None:
+                simulation.array_cache.forget(holder, stored_period)
+            self.released_bytes += getattr(item, 'nbytes', 0)
+            self.releases_count += 1
+        self.released_keys.add((variable_name, period))
+
+    def reset(self):
+        """Start a new run: every consumer remains to be computed."""
+        self.completed_keys = set()
+        self.computing_keys = []
+        self.input_periods_by_variable_name = {}
+        self.read_keys_by_key = self.get_read_keys_by_key()
+        self.recomputations_count = 0
+        self.released_bytes = 0
+        self.released_keys = set()
+        self.releases_count = 0
+        self.remaining_count_by_key = dict(
+            (key, len(consumers_key))
+            for key, consumers_key in self.consumers_key_by_key.iteritems()
+            )
+
+    def started(self, simulation, variable_name, period):
+        """Record the request of a variable, before its computation."""
+        self.read(simulation, variable_name, period)
+        self.computing_keys.append((variable_name, period))
+
+    def stopped(self, simulation, variable_name, period):
+        """After the computation of a variable, release the arrays that it was the last consumer of."""
+        key = self.computing_keys.pop()
+        if self.recording or key in self.completed_keys:
+            return
+        self.completed_keys.add(key)
+        for read_key in self.read_keys_by_key.get(key, ()):
+            remaining_count = self.remaining_count_by_key[read_key] - 1
+            self.remaining_count_by_key[read_key] = remaining_count
+            if remaining_count == 0:
+                self.release(simulation, *read_key)
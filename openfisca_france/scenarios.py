@@ -1,19 +1,26 @@
 # -*- coding: utf-8 -*-
 
 import collections
+import copy
 import datetime
 import itertools
 import logging
 import re
 import uuid
+import weakref
 
 from openfisca_core import conv, scenarios
 
+from . import simulations
+
 
 def N_(message):
     return message
 
 
+# Converters of the first validation step of test cases (see `get_test_case_first_step_converter`), with the number of
+# columns of the tax-benefit system they were built for
+first_step_converter_by_tax_benefit_system = weakref.WeakKeyDictionary()
 log = logging.getLogger(__name__)
 year_or_month_or_day_re = re.compile(ur'(18|19|20)\d{2}(-(0[1-9]|1[0-2])(-([0-2]\d|3[0-1]))?)?$')
 
@@ -59,6 +66,29 @@ class Scenario(scenarios.AbstractScenario):
             ))
         return self
 
+    def iter_axes_simulations(self, chunk_size = 10000, **kwargs):
+        """Yield the simulations of successive chunks of the grid of the axes of the scenario.
+
+        Each chunk has at most `chunk_size` steps, so that memory is bounded by the size of a chunk, whatever the size
+        of the grid. The steps of the chunks follow each other in the same order as in the simulation of the whole grid.
+        Keyword arguments are given to `new_simulation`.
+        """
+        if self.axes is None:
+            yield self.new_simulation(**kwargs)
+            return
+        for chunk_axes in iter_chunks_axes(self.axes, chunk_size):
+            chunk_scenario = copy.copy(self)
+            chunk_scenario.axes = chunk_axes
+            yield chunk_scenario.new_simulation(**kwargs)
+
+    def iter_calculate_axes(self, variables_name, chunk_size = 10000, period = None, **kwargs):
+        """Yield, for each chunk of the grid of the axes of the scenario, the arrays of the given variables by name."""
+        for simulation in self.iter_axes_simulations(chunk_size = chunk_size, **kwargs):
+            yield dict(
+                (variable_name, simulation.calculate(variable_name, period))
+                for variable_name in variables_name
+                )
+
     def make_json_or_python_to_test_case(self, period = None, repair = False):
         assert period is not None
 
@@ -68,200 +98,17 @@ class Scenario(scenarios.AbstractScenario):
             if state is None:
                 state = conv.default_state
 
-            column_by_name = self.tax_benefit_system.column_by_name
-
             # First validation and conversion step
-            test_case, error = conv.pipe(
-                conv.test_isinstance(dict),
-                conv.struct(
-                    dict(
-                        familles = conv.pipe(
-                            conv.make_item_to_singleton(),
-                            conv.test_isinstance(list),
-                            conv.uniform_sequence(
-                                conv.test_isinstance(dict),
-                                drop_none_items = True,
-                                ),
-                            conv.function(scenarios.set_entities_json_id),
-                            conv.uniform_sequence(
-                                conv.struct(
-                                    dict(itertools.chain(
-                                        dict(
-                                            enfants = conv.pipe(
-                                                conv.make_item_to_singleton(),
-                                                conv.test_isinstance(list),
-                                                conv.uniform_sequence(
-                                                    conv.test_isinstance((basestring, int)),
-                                                    drop_none_items = True,
-                                                    ),
-                                                conv.default([]),
-                                                ),
-                                            id = conv.pipe(
-                                                conv.test_isinstance((basestring, int)),
-                                                conv.not_none,
-                                                ),
-                                            parents = conv.pipe(
-                                                conv.make_item_to_singleton(),
-                                                conv.test_isinstance(list),
-                                                conv.uniform_sequence(
-                                                    conv.test_isinstance((basestring, int)),
-                                                    drop_none_items = True,
-                                                    ),
-                                                conv.default([]),
-                                                ),
-                                            ).iteritems(),
-                                        (
-                                            (column.name, column.json_to_python)
-                                            for column in column_by_name.itervalues()
-                                            if column.entity == 'fam'
-                                            ),
-                                        )),
-                                    drop_none_values = True,
-                                    ),
-                                drop_none_items = True,
-                                ),
-                            conv.default([]),
-                            ),
-                        foyers_fiscaux = conv.pipe(
-                            conv.make_item_to_singleton(),
-                            conv.test_isinstance(list),
-                            conv.uniform_sequence(
-                                conv.test_isinstance(dict),
-                                drop_none_items = True,
-                                ),
-                            conv.function(scenarios.set_entities_json_id),
-                            conv.uniform_sequence(
-                                conv.struct(
-                                    dict(itertools.chain(
-                                        dict(
-                                            declarants = conv.pipe(
-                                                conv.make_item_to_singleton(),
-                                                conv.test_isinstance(list),
-                                                conv.uniform_sequence(
-                                                    conv.test_isinstance((basestring, int)),
-                                                    drop_none_items = True,
-                                                    ),
-                                                conv.default([]),
-                                                ),
-                                            id = conv.pipe(
-                                                conv.test_isinstance((basestring, int)),
-                                                conv.not_none,
-                                                ),
-                                            personnes_a_charge = conv.pipe(
-                                                conv.make_item_to_singleton(),
-                                                conv.test_isinstance(list),
-                                                conv.uniform_sequence(
-                                                    conv.test_isinstance((basestring, int)),
-                                                    drop_none_items = True,
-                                                    ),
-                                                conv.default([]),
-                                                ),
-                                            ).iteritems(),
-                                        (
-                                            (column.name, column.json_to_python)
-                                            for column in column_by_name.itervalues()
-                                            if column.entity == 'foy'
-                                            ),
-                                        )),
-                                    drop_none_values = True,
-                                    ),
-                                drop_none_items = True,
-                                ),
-                            conv.default([]),
-                            ),
-                        individus = conv.pipe(
-                            conv.make_item_to_singleton(),
-                            conv.test_isinstance(list),
-                            conv.uniform_sequence(
-                                conv.test_isinstance(dict),
-                                drop_none_items = True,
-                                ),
-                            conv.function(scenarios.set_entities_json_id),
-                            conv.uniform_sequence(
-                                conv.struct(
-                                    dict(itertools.chain(
-                                        dict(
-                                            id = conv.pipe(
-                                                conv.test_isinstance((basestring, int)),
-                                                conv.not_none,
-                                                ),
-                                            ).iteritems(),
-                                        (
-                                            (column.name, column.json_to_python)
-                                            for column in column_by_name.itervalues()
-                                            if column.entity == 'ind' and column.name not in (
-                                                'idfam', 'idfoy', 'idmen', 'quifam', 'quifoy', 'quimen')
-                                            ),
-                                        )),
-                                    drop_none_values = True,
-                                    ),
-                                drop_none_items = True,
-                                ),
-                            conv.empty_to_none,
-                            conv.not_none,
-                            ),
-                        menages = conv.pipe(
-                            conv.make_item_to_singleton(),
-                            conv.test_isinstance(list),
-                            conv.uniform_sequence(
-                                conv.test_isinstance(dict),
-                                drop_none_items = True,
-                                ),
-                            conv.function(scenarios.set_entities_json_id),
-                            conv.uniform_sequence(
-                                conv.struct(
-                                    dict(itertools.chain(
-                                        dict(
-                                            autres = conv.pipe(
-                                                # personnes ayant un lien autre avec la personne de référence
-                                                conv.make_item_to_singleton(),
-                                                conv.test_isinstance(list),
-                                                conv.uniform_sequence(
-                                                    conv.test_isinstance((basestring, int)),
-                                                    drop_none_items = True,
-                                                    ),
-                                                conv.default([]),
-                                                ),
-                                            # conjoint de la personne de référence
-                                            conjoint = conv.test_isinstance((basestring, int)),
-                                            enfants = conv.pipe(
-                                                # enfants de la personne de référence ou de son conjoint
-                                                conv.make_item_to_singleton(),
-                                                conv.test_isinstance(list),
-                                                conv.uniform_sequence(
-                                                    conv.test_isinstance((basestring, int)),
-                                                    drop_none_items = True,
-                                                    ),
-                                                conv.default([]),
-                                                ),
-                                            id = conv.pipe(
-                                                conv.test_isinstance((basestring, int)),
-                                                conv.not_none,
-                                                ),
-                                            personne_de_reference = conv.test_isinstance((basestring, int)),
-                                            ).iteritems(),
-                                        (
-                                            (column.name, column.json_to_python)
-                                            for column in column_by_name.itervalues()
-                                            if column.entity == 'men'
-                                            ),
-                                        )),
-                                    drop_none_values = True,
-                                    ),
-                                drop_none_items = True,
-                                ),
-                            conv.default([]),
-                            ),
-                        ),
-                    ),
-                )(value, state = state)
+            test_case, error = get_test_case_first_step_converter(self.tax_benefit_system)(value, state = state)
             if error is not None:
                 return test_case, error
 
             # Second validation step
-            familles_individus_id = [individu['id'] for individu in test_case['individus']]
-            foyers_fiscaux_individus_id = [individu['id'] for individu in test_case['individus']]
-            menages_individus_id = [individu['id'] for individu in test_case['individus']]
+            # Sets of the persons not yet found in a famille, a foyer fiscal or a ménage
+            individus_id = [individu['id'] for individu in test_case['individus']]
+            familles_individus_id = set(individus_id)
+            foyers_fiscaux_individus_id = set(individus_id)
+            menages_individus_id = set(individus_id)
             test_case, error = conv.struct(
                 dict(
                     familles = conv.uniform_sequence(
@@ -304,77 +151,92 @@ class Scenario(scenarios.AbstractScenario):
                 }
 
             if repair:
+                famille_and_role_by_id = get_entity_and_role_by_individu_id(test_case[u'familles'],
+                    (u'parents', u'enfants'))
+                foyer_fiscal_and_role_by_id = get_entity_and_role_by_individu_id(test_case[u'foyers_fiscaux'],
+                    (u'declarants', u'personnes_a_charge'))
+                menage_and_role_by_id = get_entity_and_role_by_individu_id(test_case[u'menages'],
+                    (u'personne_de_reference', u'conjoint', u'enfants', u'autres'))
+
                 # Affecte à une famille chaque individu qui n'appartient à aucune d'entre elles.
                 new_famille = dict(
                     enfants = [],
                     parents = [],
                     )
                 new_famille_id = None
-                for individu_id in familles_individus_id[:]:
+                for individu_id in [
+                        individu_id
+                        for individu_id in individus_id
+                        if individu_id in familles_individus_id
+                        ]:
                     # Tente d'affecter l'individu à une famille d'après son foyer fiscal.
-                    foyer_fiscal, foyer_fiscal_role = find_foyer_fiscal_and_role(test_case, individu_id)
+                    foyer_fiscal, foyer_fiscal_role = foyer_fiscal_and_role_by_id.get(individu_id, (None, None))
                     if foyer_fiscal_role == u'declarants' and len(foyer_fiscal[u'declarants']) == 2:
                         for declarant_id in foyer_fiscal[u'declarants']:
                             if declarant_id != individu_id:
-                                famille, other_role = find_famille_and_role(test_case, declarant_id)
+                                famille, other_role = famille_and_role_by_id.get(declarant_id, (None, None))
                                 if other_role == u'parents' and len(famille[u'parents']) == 1:
                                     # Quand l'individu n'est pas encore dans une famille, mais qu'il est déclarant
                                     # dans un foyer fiscal, qu'il y a un autre déclarant dans ce même foyer fiscal
                                     # et que cet autre déclarant est seul parent dans sa famille, alors ajoute
                                     # l'individu comme autre parent de cette famille.
                                     famille[u'parents'].append(individu_id)
+                                    famille_and_role_by_id[individu_id] = (famille, u'parents')
                                     familles_individus_id.remove(individu_id)
                                 break
                     elif foyer_fiscal_role == u'personnes_a_charge' and foyer_fiscal[u'declarants']:
                         for declarant_id in foyer_fiscal[u'declarants']:
-                            famille, other_role = find_famille_and_role(test_case, declarant_id)
+                            famille, other_role = famille_and_role_by_id.get(declarant_id, (None, None))
                             if other_role == u'parents':
                                 # Quand l'individu n'est pas encore dans une famille, mais qu'il est personne à charge
                                 # dans un foyer fiscal, qu'il y a un déclarant dans ce foyer fiscal et que ce déclarant
                                 # est parent dans sa famille, alors ajoute l'individu comme enfant de cette famille.
                                 famille[u'enfants'].append(individu_id)
+                                famille_and_role_by_id[individu_id] = (famille, u'enfants')
                                 familles_individus_id.remove(individu_id)
                             break
 
                     if individu_id in familles_individus_id:
                         # L'individu n'est toujours pas affecté à une famille.
                         # Tente d'affecter l'individu à une famille d'après son ménage.
-                        menage, menage_role = find_menage_and_role(test_case, individu_id)
+                        menage, menage_role = menage_and_role_by_id.get(individu_id, (None, None))
                         if menage_role == u'personne_de_reference':
                             conjoint_id = menage[u'conjoint']
                             if conjoint_id is not None:
-                                famille, other_role = find_famille_and_role(test_case, conjoint_id)
+                                famille, other_role = famille_and_role_by_id.get(conjoint_id, (None, None))
                                 if other_role == u'parents' and len(famille[u'parents']) == 1:
                                     # Quand l'individu n'est pas encore dans une famille, mais qu'il est personne de
                                     # référence dans un ménage, qu'il y a un conjoint dans ce ménage et que ce
                                     # conjoint est seul parent dans sa famille, alors ajoute l'individu comme autre
                                     # parent de cette famille.
                                     famille[u'parents'].append(individu_id)
+                                    famille_and_role_by_id[individu_id] = (famille, u'parents')
                                     familles_individus_id.remove(individu_id)
                         elif menage_role == u'conjoint':
                             personne_de_reference_id = menage[u'personne_de_reference']
                             if personne_de_reference_id is not None:
-                                famille, other_role = find_famille_and_role(test_case,
-                                    personne_de_reference_id)
+                                famille, other_role = famille_and_role_by_id.get(personne_de_reference_id, (None, None))
                                 if other_role == u'parents' and len(famille[u'parents']) == 1:
                                     # Quand l'individu n'est pas encore dans une famille, mais qu'il est conjoint
                                     # dans un ménage, qu'il y a une personne de référence dans ce ménage et que
                                     # cette personne est seul parent dans une famille, alors ajoute l'individu comme
                                     # autre parent de cette famille.
                                     famille[u'parents'].append(individu_id)
+                                    famille_and_role_by_id[individu_id] = (famille, u'parents')
                                     familles_individus_id.remove(individu_id)
                         elif menage_role == u'enfants' and (menage['personne_de_reference'] is not None
                                 or menage[u'conjoint'] is not None):
                             for other_id in (menage['personne_de_reference'], menage[u'conjoint']):
                                 if other_id is None:
                                     continue
-                                famille, other_role = find_famille_and_role(test_case, other_id)
+                                famille, other_role = famille_and_role_by_id.get(other_id, (None, None))
                                 if other_role == u'parents':
                                     # Quand l'individu n'est pas encore dans une famille, mais qu'il est enfant dans un
                                     # ménage, qu'il y a une personne à charge ou un conjoint dans ce ménage et que
                                     # celui-ci est parent dans une famille, alors ajoute l'individu comme enfant de
                                     # cette famille.
                                     famille[u'enfants'].append(individu_id)
+                                    famille_and_role_by_id[individu_id] = (famille, u'enfants')
                                     familles_individus_id.remove(individu_id)
                                 break
 
@@ -384,8 +246,10 @@ class Scenario(scenarios.AbstractScenario):
                         age = find_age(individu, period.start.date)
                         if len(new_famille[u'parents']) < 2 and (age is None or age >= 18):
                             new_famille[u'parents'].append(individu_id)
+                            famille_and_role_by_id[individu_id] = (new_famille, u'parents')
                         else:
                             new_famille[u'enfants'].append(individu_id)
+                            famille_and_role_by_id[individu_id] = (new_famille, u'enfants')
                         if new_famille_id is None:
                             new_famille[u'id'] = new_famille_id = unicode(uuid.uuid4())
                             test_case[u'familles'].append(new_famille)
@@ -397,71 +261,80 @@ class Scenario(scenarios.AbstractScenario):
                     personnes_a_charge = [],
                     )
                 new_foyer_fiscal_id = None
-                for individu_id in foyers_fiscaux_individus_id[:]:
+                for individu_id in [
+                        individu_id
+                        for individu_id in individus_id
+                        if individu_id in foyers_fiscaux_individus_id
+                        ]:
                     # Tente d'affecter l'individu à un foyer fiscal d'après sa famille.
-                    famille, famille_role = find_famille_and_role(test_case, individu_id)
+                    famille, famille_role = famille_and_role_by_id.get(individu_id, (None, None))
                     if famille_role == u'parents' and len(famille[u'parents']) == 2:
                         for parent_id in famille[u'parents']:
                             if parent_id != individu_id:
-                                foyer_fiscal, other_role = find_foyer_fiscal_and_role(test_case, parent_id)
+                                foyer_fiscal, other_role = foyer_fiscal_and_role_by_id.get(parent_id, (None, None))
                                 if other_role == u'declarants' and len(foyer_fiscal[u'declarants']) == 1:
                                     # Quand l'individu n'est pas encore dans un foyer fiscal, mais qu'il est parent
                                     # dans une famille, qu'il y a un autre parent dans cette famille et que cet autre
                                     # parent est seul déclarant dans son foyer fiscal, alors ajoute l'individu comme
                                     # autre déclarant de ce foyer fiscal.
                                     foyer_fiscal[u'declarants'].append(individu_id)
+                                    foyer_fiscal_and_role_by_id[individu_id] = (foyer_fiscal, u'declarants')
                                     foyers_fiscaux_individus_id.remove(individu_id)
                                 break
                     elif famille_role == u'enfants' and famille[u'parents']:
                         for parent_id in famille[u'parents']:
-                            foyer_fiscal, other_role = find_foyer_fiscal_and_role(test_case, parent_id)
+                            foyer_fiscal, other_role = foyer_fiscal_and_role_by_id.get(parent_id, (None, None))
                             if other_role == u'declarants':
                                 # Quand l'individu n'est pas encore dans un foyer fiscal, mais qu'il est enfant dans une
                                 # famille, qu'il y a un parent dans cette famille et que ce parent est déclarant dans
                                 # son foyer fiscal, alors ajoute l'individu comme personne à charge de ce foyer fiscal.
                                 foyer_fiscal[u'personnes_a_charge'].append(individu_id)
+                                foyer_fiscal_and_role_by_id[individu_id] = (foyer_fiscal, u'personnes_a_charge')
                                 foyers_fiscaux_individus_id.remove(individu_id)
                                 break
 
                     if individu_id in foyers_fiscaux_individus_id:
                         # L'individu n'est toujours pas affecté à un foyer fiscal.
                         # Tente d'affecter l'individu à un foyer fiscal d'après son ménage.
-                        menage, menage_role = find_menage_and_role(test_case, individu_id)
+                        menage, menage_role = menage_and_role_by_id.get(individu_id, (None, None))
                         if menage_role == u'personne_de_reference':
                             conjoint_id = menage[u'conjoint']
                             if conjoint_id is not None:
-                                foyer_fiscal, other_role = find_foyer_fiscal_and_role(test_case, conjoint_id)
+                                foyer_fiscal, other_role = foyer_fiscal_and_role_by_id.get(conjoint_id, (None, None))
                                 if other_role == u'declarants' and len(foyer_fiscal[u'declarants']) == 1:
                                     # Quand l'individu n'est pas encore dans un foyer fiscal, mais qu'il est personne de
                                     # référence dans un ménage, qu'il y a un conjoint dans ce ménage et que ce
                                     # conjoint est seul déclarant dans un foyer fiscal, alors ajoute l'individu comme
                                     # autre déclarant de ce foyer fiscal.
                                     foyer_fiscal[u'declarants'].append(individu_id)
+                                    foyer_fiscal_and_role_by_id[individu_id] = (foyer_fiscal, u'declarants')
                                     foyers_fiscaux_individus_id.remove(individu_id)
                         elif menage_role == u'conjoint':
                             personne_de_reference_id = menage[u'personne_de_reference']
                             if personne_de_reference_id is not None:
-                                foyer_fiscal, other_role = find_foyer_fiscal_and_role(test_case,
-                                    personne_de_reference_id)
+                                foyer_fiscal, other_role = foyer_fiscal_and_role_by_id.get(
+                                    personne_de_reference_id, (None, None))
                                 if other_role == u'declarants' and len(foyer_fiscal[u'declarants']) == 1:
                                     # Quand l'individu n'est pas encore dans un foyer fiscal, mais qu'il est conjoint
                                     # dans un ménage, qu'il y a une personne de référence dans ce ménage et que
                                     # cette personne est seul déclarant dans un foyer fiscal, alors ajoute l'individu
                                     # comme autre déclarant de ce foyer fiscal.
                                     foyer_fiscal[u'declarants'].append(individu_id)
+                                    foyer_fiscal_and_role_by_id[individu_id] = (foyer_fiscal, u'declarants')
                                     foyers_fiscaux_individus_id.remove(individu_id)
                         elif menage_role == u'enfants' and (menage['personne_de_reference'] is not None
                                 or menage[u'conjoint'] is not None):
                             for other_id in (menage['personne_de_reference'], menage[u'conjoint']):
                                 if other_id is None:
                                     continue
-                                foyer_fiscal, other_role = find_foyer_fiscal_and_role(test_case, other_id)
+                                foyer_fiscal, other_role = foyer_fiscal_and_role_by_id.get(other_id, (None, None))
                                 if other_role == u'declarants':
                                     # Quand l'individu n'est pas encore dans un foyer fiscal, mais qu'il est enfant dans
                                     # un ménage, qu'il y a une personne à charge ou un conjoint dans ce ménage et que
                                     # celui-ci est déclarant dans un foyer fiscal, alors ajoute l'individu comme
                                     # personne à charge de ce foyer fiscal.
                                     foyer_fiscal[u'declarants'].append(individu_id)
+                                    foyer_fiscal_and_role_by_id[individu_id] = (foyer_fiscal, u'declarants')
                                     foyers_fiscaux_individus_id.remove(individu_id)
                                     break
 
@@ -471,8 +344,10 @@ class Scenario(scenarios.AbstractScenario):
                         age = find_age(individu, period.start.date)
                         if len(new_foyer_fiscal[u'declarants']) < 2 and (age is None or age >= 18):
                             new_foyer_fiscal[u'declarants'].append(individu_id)
+                            foyer_fiscal_and_role_by_id[individu_id] = (new_foyer_fiscal, u'declarants')
                         else:
                             new_foyer_fiscal[u'personnes_a_charge'].append(individu_id)
+                            foyer_fiscal_and_role_by_id[individu_id] = (new_foyer_fiscal, u'personnes_a_charge')
                         if new_foyer_fiscal_id is None:
                             new_foyer_fiscal[u'id'] = new_foyer_fiscal_id = unicode(uuid.uuid4())
                             test_case[u'foyers_fiscaux'].append(new_foyer_fiscal)
@@ -486,19 +361,24 @@ class Scenario(scenarios.AbstractScenario):
                     personne_de_reference = None,
                     )
                 new_menage_id = None
-                for individu_id in menages_individus_id[:]:
+                for individu_id in [
+                        individu_id
+                        for individu_id in individus_id
+                        if individu_id in menages_individus_id
+                        ]:
                     # Tente d'affecter l'individu à un ménage d'après sa famille.
-                    famille, famille_role = find_famille_and_role(test_case, individu_id)
+                    famille, famille_role = famille_and_role_by_id.get(individu_id, (None, None))
                     if famille_role == u'parents' and len(famille[u'parents']) == 2:
                         for parent_id in famille[u'parents']:
                             if parent_id != individu_id:
-                                menage, other_role = find_menage_and_role(test_case, parent_id)
+                                menage, other_role = menage_and_role_by_id.get(parent_id, (None, None))
                                 if other_role == u'personne_de_reference' and menage[u'conjoint'] is None:
                                     # Quand l'individu n'est pas encore dans un ménage, mais qu'il est parent
                                     # dans une famille, qu'il y a un autre parent dans cette famille et que cet autre
                                     # parent est personne de référence dans un ménage et qu'il n'y a pas de conjoint
                                     # dans ce ménage, alors ajoute l'individu comme conjoint de ce ménage.
                                     menage[u'conjoint'] = individu_id
+                                    menage_and_role_by_id[individu_id] = (menage, u'conjoint')
                                     menages_individus_id.remove(individu_id)
                                 elif other_role == u'conjoint' and menage[u'personne_de_reference'] is None:
                                     # Quand l'individu n'est pas encore dans un ménage, mais qu'il est parent
@@ -506,28 +386,30 @@ class Scenario(scenarios.AbstractScenario):
                                     # parent est conjoint dans un ménage et qu'il n'y a pas de personne de référence
                                     # dans ce ménage, alors ajoute l'individu comme personne de référence de ce ménage.
                                     menage[u'personne_de_reference'] = individu_id
+                                    menage_and_role_by_id[individu_id] = (menage, u'personne_de_reference')
                                     menages_individus_id.remove(individu_id)
                                 break
                     elif famille_role == u'enfants' and famille[u'parents']:
                         for parent_id in famille[u'parents']:
-                            menage, other_role = find_menage_and_role(test_case, parent_id)
+                            menage, other_role = menage_and_role_by_id.get(parent_id, (None, None))
                             if other_role in (u'personne_de_reference', u'conjoint'):
                                 # Quand l'individu n'est pas encore dans un ménage, mais qu'il est enfant dans une
                                 # famille, qu'il y a un parent dans cette famille et que ce parent est personne de
                                 # référence ou conjoint dans un ménage, alors ajoute l'individu comme enfant de ce
                                 # ménage.
                                 menage[u'enfants'].append(individu_id)
+                                menage_and_role_by_id[individu_id] = (menage, u'enfants')
                                 menages_individus_id.remove(individu_id)
                                 break
 
                     if individu_id in menages_individus_id:
                         # L'individu n'est toujours pas affecté à un ménage.
                         # Tente d'affecter l'individu à un ménage d'après son foyer fiscal.
-                        foyer_fiscal, foyer_fiscal_role = find_foyer_fiscal_and_role(test_case, individu_id)
+                        foyer_fiscal, foyer_fiscal_role = foyer_fiscal_and_role_by_id.get(individu_id, (None, None))
                         if foyer_fiscal_role == u'declarants' and len(foyer_fiscal[u'declarants']) == 2:
                             for declarant_id in foyer_fiscal[u'declarants']:
                                 if declarant_id != individu_id:
-                                    menage, other_role = find_menage_and_role(test_case, declarant_id)
+                                    menage, other_role = menage_and_role_by_id.get(declarant_id, (None, None))
                                     if other_role == u'personne_de_reference' and menage[u'conjoint'] is None:
                                         # Quand l'individu n'est pas encore dans un ménage, mais qu'il est déclarant
                                         # dans un foyer fiscal, qu'il y a un autre déclarant dans ce foyer fiscal et que
@@ -535,6 +417,7 @@ class Scenario(scenarios.AbstractScenario):
                                         # pas de conjoint dans ce ménage, alors ajoute l'individu comme conjoint de ce
                                         # ménage.
                                         menage[u'conjoint'] = individu_id
+                                        menage_and_role_by_id[individu_id] = (menage, u'conjoint')
                                         menages_individus_id.remove(individu_id)
                                     elif other_role == u'conjoint' and menage[u'personne_de_reference'] is None:
                                         # Quand l'individu n'est pas encore dans un ménage, mais qu'il est déclarant
@@ -543,17 +426,19 @@ class Scenario(scenarios.AbstractScenario):
                                         # personne de référence dans ce ménage, alors ajoute l'individu comme personne
                                         # de référence de ce ménage.
                                         menage[u'personne_de_reference'] = individu_id
+                                        menage_and_role_by_id[individu_id] = (menage, u'personne_de_reference')
                                         menages_individus_id.remove(individu_id)
                                     break
                         elif foyer_fiscal_role == u'personnes_a_charge' and foyer_fiscal[u'declarants']:
                             for declarant_id in foyer_fiscal[u'declarants']:
-                                menage, other_role = find_menage_and_role(test_case, declarant_id)
+                                menage, other_role = menage_and_role_by_id.get(declarant_id, (None, None))
                                 if other_role in (u'personne_de_reference', u'conjoint'):
                                     # Quand l'individu n'est pas encore dans un ménage, mais qu'il est personne à charge
                                     # dans un foyer fiscal, qu'il y a un déclarant dans ce foyer fiscal et que ce
                                     # déclarant est personne de référence ou conjoint dans un ménage, alors ajoute
                                     # l'individu comme enfant de ce ménage.
                                     menage[u'enfants'].append(individu_id)
+                                    menage_and_role_by_id[individu_id] = (menage, u'enfants')
                                     menages_individus_id.remove(individu_id)
                                     break
 
@@ -561,16 +446,19 @@ class Scenario(scenarios.AbstractScenario):
                         # L'individu n'est toujours pas affecté à un ménage.
                         if new_menage[u'personne_de_reference'] is None:
                             new_menage[u'personne_de_reference'] = individu_id
+                            menage_and_role_by_id[individu_id] = (new_menage, u'personne_de_reference')
                         elif new_menage[u'conjoint'] is None:
                             new_menage[u'conjoint'] = individu_id
+                            menage_and_role_by_id[individu_id] = (new_menage, u'conjoint')
                         else:
                             new_menage[u'enfants'].append(individu_id)
+                            menage_and_role_by_id[individu_id] = (new_menage, u'enfants')
                         if new_menage_id is None:
                             new_menage[u'id'] = new_menage_id = unicode(uuid.uuid4())
                             test_case[u'menages'].append(new_menage)
                         menages_individus_id.remove(individu_id)
 
-            remaining_individus_id = set(familles_individus_id).union(foyers_fiscaux_individus_id, menages_individus_id)
+            remaining_individus_id = familles_individus_id.union(foyers_fiscaux_individus_id, menages_individus_id)
             if remaining_individus_id:
                 individu_index_by_id = {
                     individu[u'id']: individu_index
@@ -702,6 +590,34 @@ class Scenario(scenarios.AbstractScenario):
 
         return json_or_python_to_test_case
 
+    def new_simulation(self, debug = False, debug_all = False, reference = False, trace = False, array_cache = None,
+            compact_float_tolerance = None, memory_inspector = None, monthly_panel_variables_name = None,
+            profiler = None, sparse_max_density = None):
+        assert isinstance(reference, (bool, int)), \
+            'Parameter reference must be a boolean. When True, the reference tax-benefit system is used.'
+        tax_benefit_system = self.tax_benefit_system
+        if reference:
+            while True:
+                reference_tax_benefit_system = tax_benefit_system.reference
+                if reference_tax_benefit_system is None:
+                    break
+                tax_benefit_system = reference_tax_benefit_system
+        simulation = simulations.Simulation(
+            array_cache = array_cache,
+            compact_float_tolerance = compact_float_tolerance,
+            debug = debug,
+            debug_all = debug_all,
+            memory_inspector = memory_inspector,
+            monthly_panel_variables_name = monthly_panel_variables_name,
+            period = self.period,
+            profiler = profiler,
+            sparse_max_density = sparse_max_density,
+            tax_benefit_system = tax_benefit_system,
+            trace = trace,
+            )
+        self.fill_simulation(simulation)
+        return simulation
+
     def suggest(self):
         """Returns a dict of suggestions and modifies self.test_case applying those suggestions."""
         test_case = self.test_case
@@ -712,11 +628,16 @@ class Scenario(scenarios.AbstractScenario):
         period_start_year = self.period.start.year
         suggestions = dict()
 
+        parents_id = set(
+            parent_id
+            for famille in test_case['familles']
+            for parent_id in famille['parents']
+            )
         for individu in test_case['individus']:
             individu_id = individu['id']
             if individu.get('age') is None and individu.get('age_en_mois') is None and individu.get('date_naissance') is None:
                 # Add missing date_naissance date to person (a parent is 40 years old and a child is 10 years old.
-                is_parent = any(individu_id in famille['parents'] for famille in test_case['familles'])
+                is_parent = individu_id in parents_id
                 birth_year = period_start_year - 40 if is_parent else period_start_year - 10
                 date_naissance = datetime.date(birth_year, 1, 1)
                 individu['date_naissance'] = date_naissance
@@ -880,6 +801,278 @@ def find_age(individu, date, default = None):
     return default
 
 
+def get_axis_value(axis, index):
+    if axis['count'] == 1:
+        return axis['min']
+    return axis['min'] + index * (axis['max'] - axis['min']) / (axis['count'] - 1.0)
+
+
+def iter_chunks_axes(axes, chunk_size):
+    """Yield the axes of successive chunks of the grid of the given axes, each with at most chunk_size steps.
+
+    `axes` is a list of groups of parallel axes, like the `axes` attribute of a scenario.
+    """
+    assert chunk_size >= 1
+    # Groups of axes, from the slowest to the fastest varying in the steps of a simulation. The first two groups are
+    # swapped, like numpy.meshgrid does.
+    groups = [
+        parallel_axes if isinstance(parallel_axes, list) else [parallel_axes]
+        for parallel_axes in axes
+        ]
+    if len(groups) >= 2:
+        groups[0], groups[1] = groups[1], groups[0]
+
+    def iter_chunks(depth, fixed_axes):
+        parallel_axes = groups[depth]
+        count = parallel_axes[0]['count']
+        inner_count = 1
+        for inner_parallel_axes in groups[depth + 1:]:
+            inner_count *= inner_parallel_axes[0]['count']
+        if inner_count > chunk_size:
+            # Fix each value of this group, and split the faster groups.
+            for index in xrange(count):
+                for chunk_axes in iter_chunks(depth + 1, fixed_axes + [
+                        dict(axis, count = 1, max = get_axis_value(axis, index), min = get_axis_value(axis, index))
+                        for axis in parallel_axes
+                        ]):
+                    yield chunk_axes
+            return
+        step = chunk_size // inner_count
+        for start in xrange(0, count, step):
+            stop = min(start + step, count)
+            chunk_groups = [[
+                dict(axis, count = stop - start, max = get_axis_value(axis, stop - 1),
+                    min = get_axis_value(axis, start))
+                for axis in parallel_axes
+                ]] + groups[depth + 1:]
+            # A group of a single step can't be a group of its own (the simulation would divide by zero): it becomes
+            # a constant axis, parallel to an other group.
+            varying_groups = [
+                group
+                for group in chunk_groups
+                if group[0]['count'] > 1
+                ] or chunk_groups[:1]
+            constant_axes = fixed_axes + [
+                axis
+                for group in chunk_groups
+                if group[0]['count'] == 1 and group is not varying_groups[0]
+                for axis in group
+                ]
+            if len(varying_groups) >= 2:
+                varying_groups[0], varying_groups[1] = varying_groups[1], varying_groups[0]
+            varying_groups[0] = varying_groups[0] + [
+                dict(axis, count = varying_groups[0][0]['count'])
+                for axis in constant_axes
+                ]
+            yield varying_groups
+
+    if not groups:
+        yield axes
+        return
+    for chunk_axes in iter_chunks(0, []):
+        yield chunk_axes
+
+
+def get_test_case_first_step_converter(tax_benefit_system):
+    """Return the converter of the first validation step of test cases, built once by tax-benefit system.
+
+    Building this converter requires a pass over all the columns of the tax-benefit system, which is much slower than
+    converting a small test case.
+    """
+    column_by_name = tax_benefit_system.column_by_name
+    columns_count, converter = first_step_converter_by_tax_benefit_system.get(tax_benefit_system, (None, None))
+    if columns_count != len(column_by_name):
+        json_to_python_by_name_by_entity = {}
+        for column in column_by_name.itervalues():
+            json_to_python_by_name_by_entity.setdefault(column.entity, {})[column.name] = column.json_to_python
+        converter = conv.pipe(
+            conv.test_isinstance(dict),
+            conv.struct(
+                dict(
+                    familles = conv.pipe(
+                        conv.make_item_to_singleton(),
+                        conv.test_isinstance(list),
+                        conv.uniform_sequence(
+                            conv.test_isinstance(dict),
+                            drop_none_items = True,
+                            ),
+                        conv.function(scenarios.set_entities_json_id),
+                        conv.uniform_sequence(
+                            conv.struct(
+                                dict(itertools.chain(
+                                    dict(
+                                        enfants = conv.pipe(
+                                            conv.make_item_to_singleton(),
+                                            conv.test_isinstance(list),
+                                            conv.uniform_sequence(
+                                                conv.test_isinstance((basestring, int)),
+                                                drop_none_items = True,
+                                                ),
+                                            conv.default([]),
+                                            ),
+                                        id = conv.pipe(
+                                            conv.test_isinstance((basestring, int)),
+                                            conv.not_none,
+                                            ),
+                                        parents = conv.pipe(
+                                            conv.make_item_to_singleton(),
+                                            conv.test_isinstance(list),
+                                            conv.uniform_sequence(
+                                                conv.test_isinstance((basestring, int)),
+                                                drop_none_items = True,
+                                                ),
+                                            conv.default([]),
+                                            ),
+                                        ).iteritems(),
+                                    json_to_python_by_name_by_entity.get('fam', {}).iteritems(),
+                                    )),
+                                drop_none_values = True,
+                                ),
+                            drop_none_items = True,
+                            ),
+                        conv.default([]),
+                        ),
+                    foyers_fiscaux = conv.pipe(
+                        conv.make_item_to_singleton(),
+                        conv.test_isinstance(list),
+                        conv.uniform_sequence(
+                            conv.test_isinstance(dict),
+                            drop_none_items = True,
+                            ),
+                        conv.function(scenarios.set_entities_json_id),
+                        conv.uniform_sequence(
+                            conv.struct(
+                                dict(itertools.chain(
+                                    dict(
+                                        declarants = conv.pipe(
+                                            conv.make_item_to_singleton(),
+                                            conv.test_isinstance(list),
+                                            conv.uniform_sequence(
+                                                conv.test_isinstance((basestring, int)),
+                                                drop_none_items = True,
+                                                ),
+                                            conv.default([]),
+                                            ),
+                                        id = conv.pipe(
+                                            conv.test_isinstance((basestring, int)),
+                                            conv.not_none,
+                                            ),
+                                        personnes_a_charge = conv.pipe(
+                                            conv.make_item_to_singleton(),
+                                            conv.test_isinstance(list),
+                                            conv.uniform_sequence(
+                                                conv.test_isinstance((basestring, int)),
+                                                drop_none_items = True,
+                                                ),
+                                            conv.default([]),
+                                            ),
+                                        ).iteritems(),
+                                    json_to_python_by_name_by_entity.get('foy', {}).iteritems(),
+                                    )),
+                                drop_none_values = True,
+                                ),
+                            drop_none_items = True,
+                            ),
+                        conv.default([]),
+                        ),
+                    individus = conv.pipe(
+                        conv.make_item_to_singleton(),
+                        conv.test_isinstance(list),
+                        conv.uniform_sequence(
+                            conv.test_isinstance(dict),
+                            drop_none_items = True,
+                            ),
+                        conv.function(scenarios.set_entities_json_id),
+                        conv.uniform_sequence(
+                            conv.struct(
+                                dict(itertools.chain(
+                                    dict(
+                                        id = conv.pipe(
+                                            conv.test_isinstance((basestring, int)),
+                                            conv.not_none,
+                                            ),
+                                        ).iteritems(),
+                                    (
+                                        (name, json_to_python)
+                                        for name, json_to_python in json_to_python_by_name_by_entity.get('ind',
+                                            {}).iteritems()
+                                        if name not in ('idfam', 'idfoy', 'idmen', 'quifam', 'quifoy', 'quimen')
+                                        ),
+                                    )),
+                                drop_none_values = True,
+                                ),
+                            drop_none_items = True,
+                            ),
+                        conv.empty_to_none,
+                        conv.not_none,
+                        ),
+                    menages = conv.pipe(
+                        conv.make_item_to_singleton(),
+                        conv.test_isinstance(list),
+                        conv.uniform_sequence(
+                            conv.test_isinstance(dict),
+                            drop_none_items = True,
+                            ),
+                        conv.function(scenarios.set_entities_json_id),
+                        conv.uniform_sequence(
+                            conv.struct(
+                                dict(itertools.chain(
+                                    dict(
+                                        autres = conv.pipe(
+                                            # personnes ayant un lien autre avec la personne de référence
+                                            conv.make_item_to_singleton(),
+                                            conv.test_isinstance(list),
+                                            conv.uniform_sequence(
+                                                conv.test_isinstance((basestring, int)),
+                                                drop_none_items = True,
+                                                ),
+                                            conv.default([]),
+                                            ),
+                                        # conjoint de la personne de référence
+                                        conjoint = conv.test_isinstance((basestring, int)),
+                                        enfants = conv.pipe(
+                                            # enfants de la personne de référence ou de son conjoint
+                                            conv.make_item_to_singleton(),
+                                            conv.test_isinstance(list),
+                                            conv.uniform_sequence(
+                                                conv.test_isinstance((basestring, int)),
+                                                drop_none_items = True,
+                                                ),
+                                            conv.default([]),
+                                            ),
+                                        id = conv.pipe(
+                                            conv.test_isinstance((basestring, int)),
+                                            conv.not_none,
+                                            ),
+                                        personne_de_reference = conv.test_isinstance((basestring, int)),
+                                        ).iteritems(),
+                                    json_to_python_by_name_by_entity.get('men', {}).iteritems(),
+                                    )),
+                                drop_none_values = True,
+                                ),
+                            drop_none_items = True,
+                            ),
+                        conv.default([]),
+                        ),
+                    ),
+                ),
+            )
+        first_step_converter_by_tax_benefit_system[tax_benefit_system] = (len(column_by_name), converter)
+    return converter
+
+
+def get_entity_and_role_by_individu_id(entities, roles):
+    """Return the first entity & role of each person, like `find_famille_and_role` & co, for all the persons at once."""
+    entity_and_role_by_individu_id = {}
+    for entity in entities:
+        for role in roles:
+            value = entity[role]
+            for individu_id in (value if isinstance(value, list) else [value]):
+                if individu_id is not None:
+                    entity_and_role_by_individu_id.setdefault(individu_id, (entity, role))
+    return entity_and_role_by_individu_id
+
+
 def find_famille_and_role(test_case, individu_id):
     for famille in test_case['familles']:
         for role in (u'parents', u'enfants'):
@@ -1,273 +1,258 @@
 #! /usr/bin/env python
 # -*- coding: utf-8 -*-
 
-"""Measure performances of formulas calculations to compare to other OpenFisca implementations."""
+"""Benchmark the calculation of the main variables of OpenFisca-France, for growing populations.
+
+Each benchmark builds a population of identical households (payslip, foyer fiscal, famille receiving RSA & PPA, ménage
+receiving an aide au logement, full revenu disponible), whose first person has an income growing from 0 to a maximum.
+The population is given directly to the holders of a simulation (see `openfisca_france.surveys`), so that building it
+is linear in its size. Then the calculation of the variables of the benchmark is timed:
+- cold: in a new simulation, after emptying the in-memory cache of compact legislations;
+- warm: in other new simulations, when the legislation is already compiled (best of several runs).
+
+Each benchmark and size is measured in its own child process, so that its peak memory is not hidden by the peak of a
+previous (larger) run. For each benchmark and size, the throughput (households & persons by second), the stored size of
+the arrays of the simulation (see `openfisca_france.memory`), the peak memory of the child process and its increase
+during the runs are reported. Results can be saved as a JSON baseline, and compared to a previous baseline (for example
+computed with another release).
+"""
 
 
 import argparse
+import gc
+import json
 import logging
+import multiprocessing
+import platform
+import resource
 import sys
-import time
+import timeit
 
 import numpy as np
-from openfisca_core import periods, simulations
-from openfisca_core.tools import assert_near
-from openfisca_france import init_country
-
-
-args = None
+import pkg_resources
+from openfisca_core import periods
+from openfisca_france import init_country, memory, surveys
+
+
+# Members of a household: (age, quifam, quifoy, quimen)
+celibataire = [(40, 0, 0, 0)]
+couple_1_enfant = [(40, 0, 0, 0), (38, 1, 1, 1), (10, 2, 2, 2)]
+couple_2_enfants = [(40, 0, 0, 0), (38, 1, 1, 1), (10, 2, 2, 2), (8, 2, 2, 2)]
+parent_isole_2_enfants = [(35, 0, 0, 0), (10, 2, 2, 2), (8, 2, 2, 2)]
+
+benchmarks = [
+    dict(
+        income_max = 10000,
+        income_name = 'salaire_de_base',
+        members = celibataire,
+        name = 'fiche_de_paie',
+        period = '2015-01',
+        variables_name = ['salaire_net', 'cout_du_travail'],
+        ),
+    dict(
+        income_max = 150000,
+        income_name = 'salaire_imposable',
+        members = couple_2_enfants,
+        name = 'ir',
+        period = '2014',
+        variables_name = ['irpp'],
+        ),
+    dict(
+        income_max = 2000,
+        income_name = 'salaire_de_base',
+        members = parent_isole_2_enfants,
+        name = 'rsa_ppa',
+        period = '2016-01',
+        variables_name = ['rsa', 'ppa'],
+        ),
+    dict(
+        income_max = 4000,
+        income_name = 'salaire_de_base',
+        members = couple_1_enfant,
+        menage = dict(
+            loyer = 600,
+            statut_occupation_logement = 4,  # Locataire d'un logement loué vide non-HLM
+            zone_apl = 2,
+            ),
+        name = 'aides_logement',
+        period = '2015-01',
+        variables_name = ['aide_logement'],
+        ),
+    dict(
+        income_max = 150000,
+        income_name = 'salaire_imposable',
+        members = couple_2_enfants,
+        name = 'revdisp',
+        period = '2014',
+        variables_name = ['revdisp'],
+        ),
+    ]
 log = logging.getLogger(__name__)
-
-
-def add_member(entity, **variables_value_by_name):
-    entity.count += 1
-    entity.step_size += 1
-    member_index = entity.count - 1
-    simulation = entity.simulation
-
-    # Add a cell to all arrays of all variables of entity.
-    for variable_name, variable_holder in entity.holder_by_name.iteritems():
-        column = variable_holder.column
-        if column.is_permanent:
-            variable_holder._array = np.hstack((variable_holder._array, [column.default]))
-        else:
-            array_by_period = variable_holder._array_by_period
-            if array_by_period is None:
-                variable_holder._array_by_period = array_by_period = {}
-            for period, array in array_by_period.iteritems():
-                array_by_period[period] = np.hstack((array, [column.default]))
-
-    # When entity is a person, ensure that the index & role of the person in the other entities are set.
-    value_by_name = variables_value_by_name.copy()
-    if entity.is_persons_entity:
-        for other_entity in simulation.entity_by_key_singular.itervalues():
-            if not other_entity.is_persons_entity:
-                assert other_entity.count > 0
-                value_by_name.setdefault(other_entity.index_for_person_variable_name, other_entity.count - 1)
-                role = value_by_name.get(other_entity.role_for_person_variable_name)
-                assert role is not None, "Missing role {} in person arguments: {}".format(
-                    other_entity.role_for_person_variable_name, value_by_name)
-                if role >= other_entity.roles_count:
-                    other_entity.roles_count = role + 1
-
-    # Set arguments in variables.
-    for variable_name, value in value_by_name.iteritems():
-        variable_holder = simulation.get_or_new_holder(variable_name)
-        column = variable_holder.column
-        if isinstance(value, dict):
-            for period, period_value in value.iteritems():
-                array = variable_holder.get_array(period)
-                if array is None:
-                    array = np.empty(entity.count, dtype = column.dtype)
-                    array.fill(column.default)
-                    variable_holder.put_in_cache(array, period)
-                array[member_index] = period_value
-        else:
-            period = simulation.period
-            array = variable_holder.get_array(period)
-            if array is None:
-                array = np.empty(entity.count, dtype = column.dtype)
-                array.fill(column.default)
-                variable_holder.put_in_cache(array, period)
-            array[member_index] = value
-
-    return member_index
-
-
-def timeit(method):
-    def timed(*args, **kwargs):
-        start_time = time.time()
-        result = method(*args, **kwargs)
-        # print '%r (%r, %r) %2.9f s' % (method.__name__, args, kw, time.time() - start_time)
-        print '{:2.6f} s'.format(time.time() - start_time)
-        return result
-
-    return timed
-
-
-TaxBenefitSystem = init_country()
-tax_benefit_system = TaxBenefitSystem()
-
-
-@timeit
-def test_irpp(year, irpp, **variables_value_by_name):
-    simulation = simulations.Simulation(period = periods.period(year), tax_benefit_system = tax_benefit_system,
-        debug = args.verbose)
-    famille = simulation.entity_by_key_singular['famille']
-    foyer_fiscal = simulation.entity_by_key_singular['foyer_fiscal']
-    individu = simulation.entity_by_key_singular['individu']
-    menage = simulation.entity_by_key_singular['menage']
-
-    # Dispatch arguments to their respective entities.
-    variables_value_by_name_by_entity = {}
-    for variable_name, value in variables_value_by_name.iteritems():
-        variable_holder = simulation.get_or_new_holder(variable_name)
-        entity_variables_value_by_name = variables_value_by_name_by_entity.setdefault(variable_holder.entity, {})
-        entity_variables_value_by_name[variable_name] = value
-
-    add_member(famille, **variables_value_by_name_by_entity.get(famille, {}))
-    add_member(foyer_fiscal, **variables_value_by_name_by_entity.get(foyer_fiscal, {}))
-    add_member(menage, **variables_value_by_name_by_entity.get(menage, {}))
-    add_member(individu, quifam = 1, quifoy = 1, quimen = 1, **variables_value_by_name_by_entity.get(individu, {}))
-    assert_near(simulation.calculate('irpp'), irpp, absolute_error_margin = 0.51)
+worker_tax_benefit_system = None  # Tax-benefit system of the current child process
+
+
+def compare_to_baseline(results, baseline, tolerance):
+    """Print the ratio of the warm time of each result to the baseline, and return the number of regressions."""
+    baseline_result_by_key = dict(
+        ((result['benchmark'], result['households']), result)
+        for result in baseline['results']
+        )
+    regressions_count = 0
+    for result in results:
+        baseline_result = baseline_result_by_key.get((result['benchmark'], result['households']))
+        if baseline_result is None:
+            continue
+        ratio = result['warm_seconds'] / baseline_result['warm_seconds']
+        regression = ratio > 1 + tolerance
+        if regression:
+            regressions_count += 1
+        print u'{:<16} {:>8} households: {:6.2f} × baseline{}'.format(result['benchmark'], result['households'], ratio,
+            u'  REGRESSION' if regression else u'').encode('utf-8')
+    return regressions_count
+
+
+def get_environment():
+    try:
+        version = pkg_resources.get_distribution('OpenFisca-France').version
+    except pkg_resources.DistributionNotFound:
+        version = None
+    return dict(
+        machine = platform.machine(),
+        numpy = np.__version__,
+        openfisca_france = version,
+        processor = platform.processor(),
+        python = platform.python_version(),
+        system = platform.system(),
+        )
+
+
+def get_max_rss_bytes():
+    """Return the peak resident memory of the current process."""
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+def init_worker():
+    global worker_tax_benefit_system
+    TaxBenefitSystem = init_country()
+    worker_tax_benefit_system = TaxBenefitSystem()
+
+
+def measure(task):
+    """Run a benchmark for a number of households, cold then warm, and return its result."""
+    benchmark, households_count, repeat = task
+    start_max_rss_bytes = get_max_rss_bytes()
+    simulation, cold_seconds = run_benchmark(worker_tax_benefit_system, benchmark, households_count, cold = True)
+    # Stored sizes, without rebuilding the dense arrays of panels, compact or sparse arrays.
+    arrays_bytes_by_entity = memory.get_bytes_by(memory.get_memory_rows(simulation), 'entity')
+    persons_count = simulation.persons.count
+    del simulation
+    warm_seconds = min(
+        run_benchmark(worker_tax_benefit_system, benchmark, households_count)[1]
+        for run_index in xrange(repeat)
+        )
+    max_rss_bytes = get_max_rss_bytes()
+    return dict(
+        arrays_bytes = sum(arrays_bytes_by_entity.itervalues()),
+        arrays_bytes_by_entity = arrays_bytes_by_entity,
+        benchmark = benchmark['name'],
+        cold_seconds = cold_seconds,
+        households = households_count,
+        households_per_second = households_count / warm_seconds if warm_seconds > 0 else None,
+        max_rss_bytes = max_rss_bytes,
+        max_rss_increase_bytes = max_rss_bytes - start_max_rss_bytes,
+        persons = persons_count,
+        persons_per_second = persons_count / warm_seconds if warm_seconds > 0 else None,
+        warm_seconds = warm_seconds,
+        )
+
+
+def new_tables(benchmark, households_count):
+    """Return the survey tables of the population of a benchmark."""
+    members = benchmark['members']
+    members_count = len(members)
+    household_index = np.repeat(np.arange(households_count), members_count)
+    individus = dict(
+        age = np.tile([age for age, quifam, quifoy, quimen in members], households_count),
+        idfam = household_index,
+        idfoy = household_index,
+        idmen = household_index,
+        quifam = np.tile([quifam for age, quifam, quifoy, quimen in members], households_count),
+        quifoy = np.tile([quifoy for age, quifam, quifoy, quimen in members], households_count),
+        quimen = np.tile([quimen for age, quifam, quifoy, quimen in members], households_count),
+        )
+    income = np.zeros(len(household_index))
+    income[::members_count] = np.linspace(0, benchmark['income_max'], households_count)
+    individus[benchmark['income_name']] = income
+    tables = dict(individus = individus)
+    if benchmark.get('menage'):
+        menages = dict(
+            (name, np.repeat(value, households_count))
+            for name, value in benchmark['menage'].iteritems()
+            )
+        menages['idmen'] = np.arange(households_count)
+        tables['menages'] = menages
+    return tables
+
+
+def run_benchmark(tax_benefit_system, benchmark, households_count, cold = False):
+    """Calculate the variables of a benchmark in a new simulation, and return the simulation and the elapsed time."""
+    period = periods.period(benchmark['period'])
+    simulation = surveys.new_simulation(tax_benefit_system, period, new_tables(benchmark, households_count))
+    if cold:
+        tax_benefit_system.compact_legislation_by_instant_cache.clear()
+    gc.collect()
+    start_time = timeit.default_timer()
+    for variable_name in benchmark['variables_name']:
+        simulation.calculate_add(variable_name, period)
+    return simulation, timeit.default_timer() - start_time
 
 
 def main():
-    parser = argparse.ArgumentParser(description = __doc__)
+    parser = argparse.ArgumentParser(description = __doc__, formatter_class = argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('-b', '--benchmark', action = 'append', choices = [
+        benchmark['name']
+        for benchmark in benchmarks
+        ], dest = 'benchmarks_name', help = "benchmarks to run (default: all)")
+    parser.add_argument('--baseline', help = "JSON file of a previous run to compare to")
+    parser.add_argument('-o', '--output', help = "JSON file where results are saved, to be used as a baseline")
+    parser.add_argument('-r', '--repeat', default = 3, help = "number of warm runs", type = int)
+    parser.add_argument('-s', '--size', action = 'append', dest = 'sizes',
+        help = "numbers of households (default: 1, 10, ..., 10^6)", type = int)
+    parser.add_argument('-t', '--tolerance', default = 0.1, help = "slowdown allowed before a regression is reported",
+        type = float)
     parser.add_argument('-v', '--verbose', action = 'store_true', default = False, help = "increase output verbosity")
-    global args
     args = parser.parse_args()
     logging.basicConfig(level = logging.DEBUG if args.verbose else logging.WARNING, stream = sys.stdout)
 
-    print 'salaire_imposable'
-
-    test_irpp(2010, -1181, salaire_imposable =  20000)
-    test_irpp(2010, -7934, salaire_imposable =  50000)
-    test_irpp(2010, -42338, salaire_imposable =  150000)
-    test_irpp(2011, -1181, salaire_imposable =  20000)
-    test_irpp(2011, -7934, salaire_imposable =  50000)
-    test_irpp(2011, -42338, salaire_imposable =  150000)
-    test_irpp(2012, -1181, salaire_imposable =  20000)
-    test_irpp(2012, -7934, salaire_imposable =  50000)
-    test_irpp(2012, -43222, salaire_imposable =  150000)
-    test_irpp(2013, -1170, salaire_imposable =  20000)
-    test_irpp(2013, -7889, salaire_imposable =  50000)
-    test_irpp(2013, -43076, salaire_imposable =  150000)
-
-    print 'retraite_imposable'
-
-    test_irpp(2010, -1181, retraite_imposable = 20000)
-    test_irpp(2010, -8336, retraite_imposable = 50000)
-    test_irpp(2010, -46642, retraite_imposable = 150000)
-    test_irpp(2011, -1181, retraite_imposable = 20000)
-    test_irpp(2011, -8336, retraite_imposable = 50000)
-    test_irpp(2011, -46642, retraite_imposable = 150000)
-    test_irpp(2012, -1181, retraite_imposable = 20000)
-    test_irpp(2012, -8336, retraite_imposable = 50000)
-    test_irpp(2012, -46642, retraite_imposable = 150000)
-    test_irpp(2013, -1170, retraite_imposable = 20000)
-    test_irpp(2013, -8283, retraite_imposable = 50000)
-    test_irpp(2013, -46523, retraite_imposable = 150000)
-
-    print 'f2da'
-
-    test_irpp(2010, 0, f2da = 20000)
-    test_irpp(2010, 0, f2da = 50000)
-    test_irpp(2010, 0, f2da = 150000)
-    test_irpp(2011, 0, f2da = 20000)
-    test_irpp(2011, 0, f2da = 50000)
-    test_irpp(2011, 0, f2da = 150000)
-    test_irpp(2012, 0, f2da = 20000)
-    test_irpp(2012, 0, f2da = 50000)
-    test_irpp(2012, 0, f2da = 150000)
-    # test_irpp(2013, 0, f2da = 20000)
-    # test_irpp(2013, 0, f2da = 50000)
-    # test_irpp(2013, 0, f2da = 150000)
-
-    print 'f2dc'
-
-    test_irpp(2010, 0, f2dc = 20000)
-    test_irpp(2010, -2976, f2dc = 50000)
-    test_irpp(2010, -22917, f2dc = 150000)
-    test_irpp(2011, 0, f2dc = 20000)
-    test_irpp(2011, -2976, f2dc = 50000)
-    test_irpp(2011, -22917, f2dc = 150000)
-    test_irpp(2012, 0, f2dc = 20000)
-    test_irpp(2012, -3434, f2dc = 50000)
-    test_irpp(2012, -23542, f2dc = 150000)
-    # test_irpp(2013, 0, f2dc = 20000)
-    # test_irpp(2013, 0, f2dc = 50000)
-    # test_irpp(2013, 0, f2dc = 150000)
-
-    print 'f2dh'
-
-    test_irpp(2010, 345, f2dh = 20000)
-    test_irpp(2010, 345, f2dh = 50000)
-    test_irpp(2010, 345, f2dh = 150000)
-    test_irpp(2011, 345, f2dh = 20000)
-    test_irpp(2011, 345, f2dh = 50000)
-    test_irpp(2011, 345, f2dh = 150000)
-    test_irpp(2012, 345, f2dh = 20000)
-    test_irpp(2012, 345, f2dh = 50000)
-    test_irpp(2012, 345, f2dh = 150000)
-    test_irpp(2013, 345, f2dh = 20000)
-    test_irpp(2013, 345, f2dh = 50000)
-    test_irpp(2013, 345, f2dh = 150000)
-
-    print 'f2tr'
-
-    test_irpp(2010, -1461, f2tr = 20000)
-    test_irpp(2010, -9434, f2tr = 50000)
-    test_irpp(2010, -48142, f2tr = 150000)
-    test_irpp(2011, -1461, f2tr = 20000)
-    test_irpp(2011, -9434, f2tr = 50000)
-    test_irpp(2011, -48142, f2tr = 150000)
-    test_irpp(2012, -1461, f2tr = 20000)
-    test_irpp(2012, -9434, f2tr = 50000)
-    test_irpp(2012, -48142, f2tr = 150000)
-    test_irpp(2013, -1450, f2tr = 20000)
-    test_irpp(2013, -9389, f2tr = 50000)
-    test_irpp(2013, -48036, f2tr = 150000)
-
-    print 'f2ts'
-
-    test_irpp(2010, -1461, f2ts = 20000)
-    test_irpp(2010, -9434, f2ts = 50000)
-    test_irpp(2010, -48142, f2ts = 150000)
-    test_irpp(2011, -1461, f2ts = 20000)
-    test_irpp(2011, -9434, f2ts = 50000)
-    test_irpp(2011, -48142, f2ts = 150000)
-    test_irpp(2012, -1461, f2ts = 20000)
-    test_irpp(2012, -9434, f2ts = 50000)
-    test_irpp(2012, -48142, f2ts = 150000)
-    test_irpp(2013, -1450, f2ts = 20000)
-    test_irpp(2013, -9389, f2ts = 50000)
-    test_irpp(2013, -48036, f2ts = 150000)
-
-    print 'f3vg'
-
-    test_irpp(2010, -3600, f3vg = 20000)
-    test_irpp(2010, -9000, f3vg = 50000)
-    test_irpp(2010, -27000, f3vg = 150000)
-    test_irpp(2011, -3800, f3vg = 20000)
-    test_irpp(2011, -9500, f3vg = 50000)
-    test_irpp(2011, -28500, f3vg = 150000)
-    test_irpp(2012, -4800, f3vg = 20000)
-    test_irpp(2012, -12000, f3vg = 50000)
-    test_irpp(2012, -36000, f3vg = 150000)
-    test_irpp(2013, -1450, f3vg = 20000)
-    test_irpp(2013, -9389, f3vg = 50000)
-    test_irpp(2013, -48036, f3vg = 150000)
-
-    print 'f3vz'
-
-    # test_irpp(2010, 0, f3vz = 20000)
-    # test_irpp(2010, 0, f3vz = 50000)
-    # test_irpp(2010, 0, f3vz = 150000)
-    test_irpp(2011, 0, f3vz = 20000)
-    test_irpp(2011, 0, f3vz = 50000)
-    test_irpp(2011, 0, f3vz = 150000)
-    test_irpp(2012, 0, f3vz = 20000)
-    test_irpp(2012, 0, f3vz = 50000)
-    test_irpp(2012, 0, f3vz = 150000)
-    test_irpp(2013, 0, f3vz = 20000)
-    test_irpp(2013, 0, f3vz = 50000)
-    test_irpp(2013, 0, f3vz = 150000)
-
-    print 'f4ba'
-
-    test_irpp(2010, -1461, f4ba = 20000)
-    test_irpp(2010, -9434, f4ba = 50000)
-    test_irpp(2010, -48142, f4ba = 150000)
-    test_irpp(2011, -1461, f4ba = 20000)
-    test_irpp(2011, -9434, f4ba = 50000)
-    test_irpp(2011, -48142, f4ba = 150000)
-    test_irpp(2012, -1461, f4ba = 20000)
-    test_irpp(2012, -9434, f4ba = 50000)
-    test_irpp(2012, -48142, f4ba = 150000)
-    test_irpp(2013, -1450, f4ba = 20000)
-    test_irpp(2013, -9389, f4ba = 50000)
-    test_irpp(2013, -48036, f4ba = 150000)
+    # Each run is made in a new child process, to measure its own peak memory.
+    pool = multiprocessing.Pool(processes = 1, initializer = init_worker, maxtasksperchild = 1)
+    results = []
+    try:
+        for benchmark in benchmarks:
+            if args.benchmarks_name and benchmark['name'] not in args.benchmarks_name:
+                continue
+            for households_count in sorted(args.sizes or [10 ** exponent for exponent in xrange(7)]):
+                result = pool.apply(measure, ((benchmark, households_count, args.repeat),))
+                results.append(result)
+                print u'{:<16} {:>8} households: cold {:9.4f} s, warm {:9.4f} s, {:>12} persons/s, ' \
+                    u'arrays {:8.1f} MB, peak {:8.1f} MB (+{:8.1f} MB)'.format(benchmark['name'], households_count,
+                        result['cold_seconds'], result['warm_seconds'], int(result['persons_per_second'] or 0),
+                        result['arrays_bytes'] / 1e6, result['max_rss_bytes'] / 1e6,
+                        result['max_rss_increase_bytes'] / 1e6).encode('utf-8')
+    finally:
+        pool.close()
+        pool.join()
+
+    if args.output is not None:
+        with open(args.output, 'w') as output_file:
+            json.dump(dict(environment = get_environment(), results = results), output_file, indent = 2,
+                sort_keys = True)
+    if args.baseline is not None:
+        with open(args.baseline) as baseline_file:
+            baseline = json.load(baseline_file)
+        if compare_to_baseline(results, baseline, args.tolerance):
+            return 1
+    return 0
 
 
 if __name__ == "__main__":
@@ -10,16 +10,20 @@
 ## et pour les pensions il suffit d'inscrire une pension versée et reçue au sein même du foyer (mais le script n'aide pas
 ## à calculer la pension optimale - qui est la plupart du temps la pension maximale (5698€ si l'enfant n'habite pas chez
 ## les parents)
-#TODO: gestion des APL et autres prestations (pour l'instant on retourne l'irpp, je ne sais pas si en retournant le
-# revenu disponible on gérerait les droits aux prestations)
+## Toutes les combinaisons de rattachement sont calculées dans une seule simulation, qui contient une copie du cas type
+## par combinaison. Pour tenir compte des prestations, on peut comparer le revenu disponible (revdisp) au lieu de
+## l'irpp.
 
 
 import copy
+import datetime
+import itertools
 import logging
 import numpy as np
 import os
 
 import openfisca_france
+from openfisca_france.scenarios import find_age
 
 
 app_name = os.path.splitext(os.path.basename(__file__))[0]
@@ -28,67 +32,98 @@ TaxBenefitSystem = openfisca_france.init_country()
 tax_benefit_system = TaxBenefitSystem()
 
 
-def split(scenario):
-# On fait l'hypothèse que le scénario ne contient qu'un seul foyer fiscal
-    tax_benefit_system = scenario.tax_benefit_system
+def iter_rattachements(scenario):
+    """Yield the tuples of the ids of the young adults that can be attached to the foyer fiscal of the scenario."""
+    # On fait l'hypothèse que le scénario ne contient qu'un seul foyer fiscal
     test_case = scenario.test_case
     foyer_fiscal = test_case['foyers_fiscaux'][0]
-    individus = test_case['individus']
-    year = scenario.year
-    rattachements_possibles = [] # Contient en réalité les détachements possibles puisqu'au départ tous les membres sous rattachés au même foyer
-    detachements_impossibles = []
-    scenarios = []
-    impots = []
-
-    for pac_index, pac_id in enumerate(foyer_fiscal.pop('personnes_a_charge')):
-        pac = individus[pac_id].copy()
-        age = year - pac.pop('date_naissance').year - 1
-        if 18 <= age < (21 + 4 * (pac['activite'] == 2)): # Exprime la condition de rattachement au foyer pour les majeurs
+    individu_by_id = dict(
+        (individu['id'], individu)
+        for individu in test_case['individus']
+        )
+    # Contient en réalité les détachements possibles puisqu'au départ tous les membres sont rattachés au même foyer
+    rattachements_possibles = []
+    for pac_id in foyer_fiscal['personnes_a_charge']:
+        pac = individu_by_id[pac_id]
+        age = find_age(pac, datetime.date(scenario.period.start.year, 1, 1))
+        # Exprime la condition de rattachement au foyer pour les majeurs
+        if 18 <= age < (21 + 4 * (pac.get('activite') == 2)):
             rattachements_possibles.append(pac_id)
-        else:
-            detachements_impossibles.append(pac_id)
-
-    foyers_possibles = partiesDe(list(rattachements_possibles))
-    n = len(foyers_possibles)
-    j = 1
-    min_ = [-1, 0]
-    for i in range(0, n):
-        scenarios.append(scenario.__class__())
-        scenarios[i].__dict__ = copy.copy(scenario.__dict__)
-        scenarios[i].test_case = copy.deepcopy(scenario.test_case)
-        scenarios[i].test_case['foyers_fiscaux'][0]['personnes_a_charge'] = foyers_possibles[i]+detachements_impossibles
-        for jeune in rattachements_possibles:
-            if jeune not in foyers_possibles[i]:
-                scenarios[i].test_case['foyers_fiscaux'][j] = { 'declarants': [jeune], 'personnes_a_charge': [] }
-                j += 1
-        scenarios[i].suggest()
-        simulation  = scenarios[i].new_simulation()
-        irpp = - round(np.sum(simulation.calculate('irpp')))
-        if irpp < min_[1] or min_[0] == -1:
-            min_ = [i, irpp]
-        impots.append(irpp)
-
-    print "Le plus avantageux pour votre famille est que les jeunes rattachés à votre foyer fiscal soient : {}. Vous paierez alors {}€ d'impôts. (Seuls les jeunes éligibles au rattachement sont indiqués (18 <= age < 21 si pas étudiant / 25 sinon. Le calculateur a émis l'hypothèse qu'il n'y avait qu'un seul foyer fiscal au départ, auquel tous les jeunes éligibles étaient rattachés.)".format(foyers_possibles[min_[0]],min_[1])
-    return impots
-
-
-def partiesDe(tab): # Calcule l'ensemble des parties des éléments d'un array, sous forme d'un array d'arrays
-    n = len(tab)
-    if n == 0:
-        return [[]]
-    else:
-        a = tab.pop()
-        tab2 = partiesDe(tab)
-        return add(a, tab2)
-
-
-def add(a, tab): # Concatène un array d'arrays (tab) avec le même array où un élément (a) aura été rajouté à chaque sous-array
-    n = len(tab)
-    for i in range (0, n):
-        b = list(tab[i])
-        tab.append(b)
-        tab[i].append(a)
-    return tab
+    for count in range(len(rattachements_possibles) + 1):
+        for rattachement in itertools.combinations(rattachements_possibles, count):
+            yield rattachement
+
+
+def split(scenario, variable_name = 'irpp'):
+    """Compute a variable for every possible rattachement of the young adults of the foyer fiscal of the scenario.
+
+    Every combination of foyers fiscaux is a copy of the whole test case, where the young adults that are not attached
+    to the foyer fiscal of their parents have their own foyer. All the copies are computed in a single simulation.
+
+    Return the list of rattachements and the array of the sums of the variable for each of them.
+    """
+    rattachements = list(iter_rattachements(scenario))
+    test_case = scenario.test_case
+    foyer_fiscal = test_case['foyers_fiscaux'][0]
+    detachables_id = set(
+        individu_id
+        for rattachement in rattachements
+        for individu_id in rattachement
+        )
+    combined_test_case = dict(
+        (key_plural, [])
+        for key_plural in ('familles', 'foyers_fiscaux', 'individus', 'menages')
+        )
+    # Index of the rattachement of each entity of the combined test case, by entity
+    rattachement_index_by_key_plural = dict(
+        (key_plural, [])
+        for key_plural in combined_test_case
+        )
+    for rattachement_index, rattachement in enumerate(rattachements):
+        suffix = u'-{}'.format(rattachement_index)
+        new_id_by_id = dict(
+            (individu['id'], u'{}{}'.format(individu['id'], suffix))
+            for individu in test_case['individus']
+            )
+
+        def copy_entity(entity, key_plural):
+            entity = copy.deepcopy(entity)
+            for key, value in entity.iteritems():
+                if key == 'id':
+                    entity[key] = u'{}{}'.format(value, suffix)
+                elif isinstance(value, list) and all(item in new_id_by_id for item in value):
+                    entity[key] = [new_id_by_id[item] for item in value]
+                elif isinstance(value, basestring) and value in new_id_by_id:
+                    entity[key] = new_id_by_id[value]
+            combined_test_case[key_plural].append(entity)
+            rattachement_index_by_key_plural[key_plural].append(rattachement_index)
+            return entity
+
+        for key_plural in ('familles', 'individus', 'menages'):
+            for entity in test_case[key_plural]:
+                copy_entity(entity, key_plural)
+        new_foyer_fiscal = copy_entity(foyer_fiscal, 'foyers_fiscaux')
+        new_foyer_fiscal['personnes_a_charge'] = [
+            new_id_by_id[individu_id]
+            for individu_id in foyer_fiscal['personnes_a_charge']
+            if individu_id not in detachables_id or individu_id in rattachement
+            ]
+        for individu_id in foyer_fiscal['personnes_a_charge']:
+            if individu_id in detachables_id and individu_id not in rattachement:
+                copy_entity(
+                    dict(declarants = [individu_id], id = u'foyer_{}'.format(individu_id), personnes_a_charge = []),
+                    'foyers_fiscaux',
+                    )
+
+    combined_scenario = scenario.__class__()
+    combined_scenario.__dict__ = copy.copy(scenario.__dict__)
+    combined_scenario.test_case = combined_test_case
+    combined_scenario.suggest()
+    simulation = combined_scenario.new_simulation()
+    values = simulation.calculate(variable_name)
+    key_plural = simulation.get_or_new_holder(variable_name).entity.key_plural
+    return rattachements, np.bincount(rattachement_index_by_key_plural[key_plural], weights = values,
+        minlength = len(rattachements))
 
 
 def define_scenario(year):
@@ -122,7 +157,13 @@ def define_scenario(year):
 
 
 def main():
-    split(define_scenario(2014))
+    rattachements, irpp = split(define_scenario(2014))
+    best_index = np.argmax(irpp)  # L'irpp est négatif.
+    print u"Le plus avantageux pour votre famille est que les jeunes rattachés à votre foyer fiscal soient : {}. " \
+        u"Vous paierez alors {}€ d'impôts. (Seuls les jeunes éligibles au rattachement sont indiqués (18 <= age < 21 " \
+        u"si pas étudiant / 25 sinon. Le calculateur a émis l'hypothèse qu'il n'y avait qu'un seul foyer fiscal au " \
+        u"départ, auquel tous les jeunes éligibles étaient rattachés.)".format(list(rattachements[best_index]),
+            - round(irpp[best_index])).encode('utf-8')
     return 0
 
 
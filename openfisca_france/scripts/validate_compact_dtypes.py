@@ -0,0 +1,89 @@
+#! /usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""Compare the results of the YAML tests computed with and without the storage of arrays in compact dtypes.
+
+For each output variable of each test, the variable is computed in a simulation storing its arrays in their own dtype
+and in a simulation storing them in compact dtypes (see module openfisca_france.compact). The report gives, by
+variable, the maximal absolute difference between both results, and the tests where this difference exceeds the error
+margin of the test.
+"""
+
+
+import argparse
+import collections
+import json
+import logging
+import sys
+
+import numpy as np
+
+from openfisca_france.tests import test_yaml
+
+
+log = logging.getLogger(__name__)
+
+
+def compare(test, float_tolerance, calculate_output = False):
+    """Iterate on the (variable name, period, absolute difference, max absolute value) of each output of a test."""
+    scenario = test['scenario']
+    scenario.suggest()
+    simulation = scenario.new_simulation()
+    compact_simulation = scenario.new_simulation(compact_float_tolerance = float_tolerance)
+    for variable_name, expected_value in (test.get(u'output_variables') or {}).iteritems():
+        requested_periods = expected_value.keys() if isinstance(expected_value, dict) else [None]
+        for requested_period in requested_periods:
+            if calculate_output:
+                array = simulation.calculate_output(variable_name, requested_period)
+                compact_array = compact_simulation.calculate_output(variable_name, requested_period)
+            else:
+                array = simulation.calculate(variable_name, requested_period)
+                compact_array = compact_simulation.calculate(variable_name, requested_period)
+            if array.dtype.kind in 'biuf' and array.size:
+                array = array.astype(np.float64)
+                yield variable_name, requested_period, float(np.abs(array - compact_array).max()), \
+                    float(np.abs(array).max())
+            else:
+                yield variable_name, requested_period, 0.0 if (array == compact_array).all() else float('inf'), 0.0
+
+
+def main():
+    parser = argparse.ArgumentParser(description = __doc__)
+    parser.add_argument('-n', '--name', default = None, help = "partial name of tests to execute")
+    parser.add_argument('-o', '--output', help = "JSON file where the report is saved")
+    parser.add_argument('-t', '--tolerance', default = 0.005, help = "tolerance of the rounding of floats",
+        type = float)
+    parser.add_argument('-v', '--verbose', action = 'store_true', default = False, help = "increase output verbosity")
+    args = parser.parse_args()
+    logging.basicConfig(level = logging.DEBUG if args.verbose else logging.WARNING, stream = sys.stdout)
+
+    report_by_variable_name = collections.defaultdict(lambda: dict(count = 0, max_difference = 0.0, failures = []))
+    for checker, yaml_path, name, period_str, test, force in test_yaml.test(name_filter = args.name):
+        for variable_name, requested_period, difference, max_value in compare(test, args.tolerance,
+                calculate_output = checker is test_yaml.check_calculate_output):
+            margin = test.get('absolute_error_margin')
+            if margin is None:
+                margin = (test.get('relative_error_margin') or 0.0) * max_value
+            report = report_by_variable_name[variable_name]
+            report['count'] += 1
+            report['max_difference'] = max(report['max_difference'], difference)
+            if difference > margin:
+                report['failures'].append(u'{} {}@{}: {} > {}'.format(yaml_path, name,
+                    requested_period or period_str, difference, margin))
+
+    failures_count = 0
+    for variable_name, report in sorted(report_by_variable_name.iteritems(),
+            key = lambda item: item[1]['max_difference'], reverse = True):
+        print u'{:<48} {:>6} results, max difference {:.6g}'.format(variable_name, report['count'],
+            report['max_difference']).encode('utf-8')
+        for failure in report['failures']:
+            print u'    {}'.format(failure).encode('utf-8')
+        failures_count += len(report['failures'])
+    if args.output is not None:
+        with open(args.output, 'w') as output_file:
+            json.dump(report_by_variable_name, output_file, indent = 2, sort_keys = True)
+    return 1 if failures_count else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,91 @@
+# -*- coding: utf-8 -*-
+
+"""Reductions of persons arrays to entities (familles, foyers fiscaux, ménages), by segments of persons.
+
+The persons are sorted by entity once, so that the members of each entity are a contiguous segment of the sorted
+persons (a CSR index). Reducing a persons array (sum, min, max, any, count), optionally filtered by role and by a
+condition, is then a single `reduceat` over the sorted array, whatever the number of roles.
+"""
+
+
+import numpy as np
+
+
+class EntitySegments(object):
+    entity_count = None
+    entity_index = None  # Index of the entity of each person
+    non_empty = None  # Whether each entity has at least one member
+    offsets = None  # Start of the segment of each entity in the sorted persons, followed by the end of the last one
+    order = None  # Persons sorted by entity
+    role = None  # Role of each person in its entity
+    role_mask_by_roles = None
+    sorted_role = None
+
+    def __init__(self, entity_index, role, entity_count):
+        self.entity_count = entity_count
+        self.entity_index = entity_index
+        self.role = role
+        self.order = np.argsort(entity_index, kind = 'mergesort')
+        self.offsets = np.searchsorted(entity_index[self.order], np.arange(entity_count + 1))
+        self.non_empty = self.offsets[:-1] < self.offsets[1:]
+        self.role_mask_by_roles = {}
+        self.sorted_role = role[self.order]
+
+    def any(self, condition, roles = None):
+        return self.reduce(np.logical_or, np.asarray(condition, dtype = np.bool_), False, roles = roles)
+
+    def count(self, condition = None, roles = None):
+        if condition is None:
+            condition = np.ones(len(self.order), dtype = np.int32)
+        return self.reduce(np.add, np.asarray(condition, dtype = np.int32), 0, roles = roles)
+
+    def get_role_mask(self, roles):
+        """Return whether the role of each sorted person is in roles."""
+        roles = tuple(roles)
+        role_mask = self.role_mask_by_roles.get(roles)
+        if role_mask is None:
+            role_mask = self.role_mask_by_roles[roles] = np.in1d(self.sorted_role, roles)
+        return role_mask
+
+    def is_up_to_date(self, entity_index, role, entity_count):
+        return self.entity_index is entity_index and self.role is role and self.entity_count == entity_count
+
+    def max(self, array, condition = None, default = None, roles = None):
+        """Return the max of array over the members of each entity, or default when no member is selected."""
+        array = np.asarray(array)
+        if default is None:
+            default = -np.inf if array.dtype.kind == 'f' else np.iinfo(array.dtype).min
+        return self.reduce(np.maximum, array, default, condition = condition, roles = roles)
+
+    def min(self, array, condition = None, default = None, roles = None):
+        """Return the min of array over the members of each entity, or default when no member is selected."""
+        array = np.asarray(array)
+        if default is None:
+            default = np.inf if array.dtype.kind == 'f' else np.iinfo(array.dtype).max
+        return self.reduce(np.minimum, array, default, condition = condition, roles = roles)
+
+    def reduce(self, ufunc, array, identity, condition = None, roles = None):
+        """Reduce a persons array with ufunc over the selected members of each entity.
+
+        Members are selected by their role and by condition. `identity` is the value of the reduction of no member.
+        """
+        values = np.asarray(array)[self.order]
+        mask = None
+        if roles is not None:
+            mask = self.get_role_mask(roles)
+        if condition is not None:
+            sorted_condition = np.asarray(condition, dtype = np.bool_)[self.order]
+            mask = sorted_condition if mask is None else mask & sorted_condition
+        identity = np.array(identity, dtype = values.dtype)
+        if mask is not None:
+            values = np.where(mask, values, identity)
+        result = np.empty(self.entity_count, dtype = values.dtype)
+        result.fill(identity)
+        starts = self.offsets[:-1][self.non_empty]
+        if len(starts) > 0:
+            # Persons whose entity index is out of range are after the end of the last segment.
+            result[self.non_empty] = ufunc.reduceat(values[:self.offsets[-1]], starts)
+        return result
+
+    def sum(self, array, condition = None, roles = None):
+        return self.reduce(np.add, array, 0, condition = condition, roles = roles)
@@ -0,0 +1,250 @@
+# -*- coding: utf-8 -*-
+
+"""Simulation used by the scenarios of OpenFisca-France, with optional storage modes.
+
+The simulation records which variables are read by the formula of each variable, so that when an input variable is
+changed, only the arrays computed (directly or not) from it are deleted (see `Simulation.update_input`). This is
+also used to compute effective marginal tax rates in a lightweight clone (see `Simulation.calculate_marginal_rate`).
+
+When the simulation is given a profiler (see module profiling), the computation of each variable is also timed. When
+it is given a memory inspector (see module memory), snapshots of its arrays are taken during the computations.
+Optionally, the arrays of cerfa fields that are nearly all empty are stored as sparse arrays (see module sparse), and
+the other arrays in compact dtypes (see module compact), and the computed arrays may be evicted beyond a memory budget
+(see module array_cache) or released once their last consumer is computed (see module releases).
+"""
+
+
+import numpy as np
+from openfisca_core import periods, simulations
+
+from . import compact, panels, profiling, sparse
+
+
+class Simulation(simulations.Simulation):
+    array_cache = None  # Optional array_cache.ArrayCache, evicting computed arrays beyond a memory budget, not cloned
+    # When not None, arrays are stored in compact dtypes, with floats rounded within this tolerance. See module compact.
+    compact_float_tolerance = None
+    computing_variables_name = None  # Stack of the variables whose formula is being computed
+    dependents_name_by_variable_name = None  # Names of the variables whose formula read each variable
+    memory_inspector = None  # Optional memory.MemoryInspector, taking snapshots of the arrays during the computations
+    # Names of the (monthly) variables whose months are stored in yearly panels. See module panels.
+    monthly_panel_variables_name = None
+    profiler = None  # Optional profiling.Profiler, shared with the clones of the simulation
+    release_plan = None  # Optional releases.ReleasePlan, releasing the intermediate arrays during its runs
+    # Maximal proportion of non-default cells of the arrays of cerfa fields stored as sparse arrays. See module sparse.
+    sparse_max_density = None
+
+    def __init__(self, array_cache = None, compact_float_tolerance = None, memory_inspector = None,
+            monthly_panel_variables_name = None, profiler = None, sparse_max_density = None, **kwargs):
+        super(Simulation, self).__init__(**kwargs)
+        self.array_cache = array_cache
+        self.compact_float_tolerance = compact_float_tolerance
+        self.computing_variables_name = []
+        self.dependents_name_by_variable_name = {}
+        if monthly_panel_variables_name is not None:
+            self.monthly_panel_variables_name = frozenset(monthly_panel_variables_name)
+        self.memory_inspector = memory_inspector
+        self.profiler = profiler
+        self.sparse_max_density = sparse_max_density
+
+    def calculate_add(self, column_name, period = None, max_nb_cycles = None):
+        if period is not None and not self.trace:
+            monthly_panels = self.get_or_new_holder(column_name)._array_by_period
+            if isinstance(monthly_panels, panels.MonthlyPanels):
+                array = monthly_panels.get(period)
+                if array is None:
+                    array = monthly_panels.sum_months(period)
+                if array is not None:
+                    self.record_read(column_name)
+                    return array
+        return super(Simulation, self).calculate_add(column_name, period = period, max_nb_cycles = max_nb_cycles)
+
+    def calculate_marginal_rate(self, target_name, varying_name, period = None, variation = 1):
+        """Return the effective marginal tax rate of each entity of the target variable, by finite difference.
+
+        `variation` is added to every array of the varying input variable during period, in a clone of the simulation.
+        In this clone, only the variables computed from the varying variable are computed again: the other arrays are
+        reused without being computed again (shared with this simulation, except arrays stored in monthly panels, which
+        the clone copies).
+        """
+        if period is None:
+            period = self.period
+        target = self.calculate_add(target_name, period)
+        varying = self.calculate_add(varying_name, period)
+        target_entity = self.get_or_new_holder(target_name).entity
+        varying_entity = self.get_or_new_holder(varying_name).entity
+
+        simulation = self.clone(debug = self.debug, debug_all = self.debug_all, trace = self.trace)
+        simulation.requested_periods_by_variable_name = {}
+        holder = simulation.get_or_new_holder(varying_name)
+        for array_period, array in (holder._array_by_period or {}).items():
+            if period.start <= array_period.start and array_period.stop <= period.stop:
+                holder.set_array(array_period, array + variation)
+        simulation.invalidate(varying_name)
+        target_variation = simulation.calculate_add(target_name, period) - target
+        varying_variation = simulation.calculate_add(varying_name, period) - varying
+
+        if varying_entity.key_plural != target_entity.key_plural:
+            assert varying_entity.is_persons_entity, u'Variable {} must be a variable of {} or of persons'.format(
+                varying_name, target_entity.key_plural)
+            varying_variation = target_entity.segments.sum(varying_variation)
+        with np.errstate(divide = 'ignore', invalid = 'ignore'):
+            return 1 - target_variation / varying_variation
+
+    def calculate_monthly_panel(self, column_name, year):
+        """Return the (12 × N) array of the 12 months of a year of a variable stored in monthly panels."""
+        holder = self.get_or_new_holder(column_name)
+        assert isinstance(holder._array_by_period, panels.MonthlyPanels), \
+            u'Variable {} is not stored in monthly panels'.format(column_name)
+        panel = holder._array_by_period.get_panel(year)
+        if panel is None:
+            for month in xrange(1, 13):
+                self.calculate(column_name, periods.period(u'{}-{:02d}'.format(year, month)))
+            panel = holder._array_by_period.get_panel(year)
+            assert panel is not None, u'Formula of variable {} is not monthly'.format(column_name)
+        return panel
+
+    def clone(self, debug = False, debug_all = False, trace = False):
+        new = super(Simulation, self).clone(debug = debug, debug_all = debug_all, trace = trace)
+        # The arrays of the clone don't count in the memory budget of this simulation.
+        new.array_cache = None
+        new.computing_variables_name = []
+        new.dependents_name_by_variable_name = dict(
+            (name, dependents_name.copy())
+            for name, dependents_name in self.dependents_name_by_variable_name.iteritems()
+            )
+        new.release_plan = None
+        return new
+
+    def compute(self, column_name, *args, **kwargs):
+        return self.compute_recording_reads(super(Simulation, self).compute, column_name, *args, **kwargs)
+
+    def compute_add(self, column_name, *args, **kwargs):
+        return self.compute_recording_reads(super(Simulation, self).compute_add, column_name, *args, **kwargs)
+
+    def compute_add_divide(self, column_name, *args, **kwargs):
+        return self.compute_recording_reads(super(Simulation, self).compute_add_divide, column_name, *args, **kwargs)
+
+    def compute_divide(self, column_name, *args, **kwargs):
+        return self.compute_recording_reads(super(Simulation, self).compute_divide, column_name, *args, **kwargs)
+
+    def compute_recording_reads(self, compute, column_name, *args, **kwargs):
+        """Call a compute method, recording that the variable being computed reads the given variable."""
+        self.record_read(column_name)
+        array_cache = self.array_cache
+        release_plan = self.release_plan
+        if array_cache is not None or release_plan is not None:
+            period = self.get_requested_period(*args, **kwargs)
+        if array_cache is not None:
+            holder = self.get_or_new_holder(column_name)
+            stored_periods = array_cache.requested(column_name, holder, period,
+                requested_directly = not self.computing_variables_name)
+        if release_plan is not None:
+            release_plan.started(self, column_name, period)
+        if self.profiler is not None:
+            dated_holder = self.compute_profiling(compute, column_name, *args, **kwargs)
+        else:
+            self.computing_variables_name.append(column_name)
+            try:
+                dated_holder = compute(column_name, *args, **kwargs)
+            finally:
+                self.computing_variables_name.pop()
+        if release_plan is not None:
+            release_plan.stopped(self, column_name, period)
+        if array_cache is not None:
+            array_cache.computed(self, column_name, holder, period, stored_periods)
+        if self.memory_inspector is not None:
+            self.memory_inspector.computed(self, column_name)
+        return dated_holder
+
+    def compute_profiling(self, compute, column_name, *args, **kwargs):
+        """Call a compute method like `compute_recording_reads`, recording its statistics in the profiler."""
+        period = self.get_requested_period(*args, **kwargs)
+        holder = self.get_or_new_holder(column_name)
+        cache_hit = holder.get_array(period) is not None
+        profiler = self.profiler
+        profiler.start(column_name)
+        self.computing_variables_name.append(column_name)
+        dated_holder = None
+        try:
+            dated_holder = compute(column_name, *args, **kwargs)
+            return dated_holder
+        finally:
+            self.computing_variables_name.pop()
+            profiler.stop(column_name, period, function_start = profiling.get_function_start(holder, period),
+                array = dated_holder.array if dated_holder is not None else None, cache_hit = cache_hit)
+
+    def get_array(self, column_name, period = None):
+        self.record_read(column_name)
+        if self.release_plan is not None:
+            self.release_plan.read(self, column_name, self.get_requested_period(period))
+        return super(Simulation, self).get_array(column_name, period = period)
+
+    def get_dependents_name(self, column_name):
+        """Return the names of the variables computed, directly or not, from the given variable."""
+        dependents_name = set()
+        variables_name = [column_name]
+        while variables_name:
+            for dependent_name in self.dependents_name_by_variable_name.get(variables_name.pop(), ()):
+                if dependent_name not in dependents_name:
+                    dependents_name.add(dependent_name)
+                    variables_name.append(dependent_name)
+        return dependents_name
+
+    def get_requested_period(self, period = None, *args, **kwargs):
+        """Return the period given to a compute method."""
+        if period is None:
+            return self.period
+        if not isinstance(period, periods.Period):
+            return periods.period(period)
+        return period
+
+    def get_or_new_holder(self, column_name):
+        holder = super(Simulation, self).get_or_new_holder(column_name)
+        if self.monthly_panel_variables_name is not None and column_name in self.monthly_panel_variables_name \
+                and not holder.column.is_permanent \
+                and not isinstance(holder._array_by_period, panels.MonthlyPanels):
+            holder._array_by_period = panels.MonthlyPanels(holder._array_by_period)
+        elif self.sparse_max_density is not None and getattr(holder.column, 'cerfa_field', None) is not None \
+                and not holder.column.is_permanent \
+                and not isinstance(holder._array_by_period, sparse.SparseArrays):
+            holder._array_by_period = sparse.SparseArrays(holder.column.default, self.sparse_max_density,
+                holder._array_by_period)
+        elif self.compact_float_tolerance is not None and not holder.column.is_permanent \
+                and not isinstance(holder._array_by_period, (compact.CompactArrays, panels.MonthlyPanels,
+                    sparse.SparseArrays)):
+            holder._array_by_period = compact.CompactArrays(self.compact_float_tolerance, holder._array_by_period)
+        return holder
+
+    def invalidate(self, column_name):
+        """Delete the arrays of the variables computed, directly or not, from the given variable.
+
+        The arrays of the variables that don't depend on this variable stay cached.
+        """
+        for name in self.get_dependents_name(column_name):
+            holder = self.holder_by_name.get(name)
+            if holder is not None:
+                holder.delete_arrays()
+                if self.array_cache is not None:
+                    self.array_cache.forget(holder)
+
+    def record_read(self, column_name):
+        if self.computing_variables_name:
+            reader_name = self.computing_variables_name[-1]
+            if reader_name != column_name:
+                self.dependents_name_by_variable_name.setdefault(column_name, set()).add(reader_name)
+
+    def set_monthly_panel(self, column_name, year, array):
+        """Set the values of the 12 months of a year of a variable stored in monthly panels, from a (12 × N) array."""
+        holder = self.get_or_new_holder(column_name)
+        assert isinstance(holder._array_by_period, panels.MonthlyPanels), \
+            u'Variable {} is not stored in monthly panels'.format(column_name)
+        assert array.shape == (12, holder.entity.count)
+        for month in xrange(1, 13):
+            holder.set_array(periods.period(u'{}-{:02d}'.format(year, month)),
+                array[month - 1].astype(holder.column.dtype))
+
+    def update_input(self, column_name, period, array):
+        """Set the array of an input variable, then delete the arrays that were computed from its previous value."""
+        self.get_or_new_holder(column_name).set_array(period, array)
+        self.invalidate(column_name)
@@ -0,0 +1,95 @@
+# -*- coding: utf-8 -*-
+
+"""Sparse storage of the arrays of cerfa fields, whose cells nearly all have the default value.
+
+Most boxes of the tax declaration (`f7ud`, `f7xs`, `f2dc`…) are empty for nearly all foyers fiscaux. When a simulation
+is given a maximal density, the holders of cerfa fields store their arrays in a `SparseArrays` mapping: each array set
+whose proportion of non-default cells is at most this density is stored as the indexes and values of these cells only.
+
+The dense array is rebuilt each time it is read by a formula, and is released once the formula is computed, so that
+only the sparse arrays are kept in memory.
+"""
+
+
+import collections
+
+import numpy as np
+
+
+class SparseArray(object):
+    """An array of mostly default values, stored as the indexes and values of its other cells."""
+    count = None
+    default = None
+    dtype = None
+    index = None
+    values = None
+
+    def __init__(self, count, dtype, default, index, values):
+        self.count = count
+        self.default = default
+        self.dtype = dtype
+        self.index = index
+        self.values = values
+
+    @classmethod
+    def from_array(cls, array, default):
+        index = np.flatnonzero(array != default)
+        index = index.astype(np.int32) if len(array) <= np.iinfo(np.int32).max else index
+        return cls(len(array), array.dtype, default, index, array[index])
+
+    @property
+    def nbytes(self):
+        return self.index.nbytes + self.values.nbytes
+
+    def to_array(self):
+        array = np.empty(self.count, dtype = self.dtype)
+        array.fill(self.default)
+        array[self.index] = self.values
+        return array
+
+
+class SparseArrays(collections.MutableMapping):
+    """Arrays of a holder by period, where the arrays with few non-default cells are stored as sparse arrays.
+
+    This mapping replaces the `_array_by_period` dictionary of a holder. Getting an item returns a new dense array.
+    """
+    default = None
+    item_by_period = None  # Dense or sparse array of each period
+    max_density = None
+
+    def __init__(self, default, max_density, array_by_period = None):
+        self.default = default
+        self.item_by_period = {}
+        self.max_density = max_density
+        if array_by_period:
+            self.update(array_by_period)
+
+    def __contains__(self, period):
+        return period in self.item_by_period
+
+    def __delitem__(self, period):
+        del self.item_by_period[period]
+
+    def __getitem__(self, period):
+        item = self.item_by_period[period]
+        if isinstance(item, SparseArray):
+            return item.to_array()
+        return item
+
+    def __iter__(self):
+        return iter(self.item_by_period)
+
+    def __len__(self):
+        return len(self.item_by_period)
+
+    def __setitem__(self, period, array):
+        if isinstance(array, np.ndarray) and array.ndim == 1 and array.dtype.kind in 'biuf' and len(array) > 0 \
+                and np.count_nonzero(array != self.default) <= self.max_density * len(array):
+            array = SparseArray.from_array(array, self.default)
+        self.item_by_period[period] = array
+
+    def copy(self):
+        # Sparse arrays are never modified in place, so they can be shared.
+        new = SparseArrays(self.default, self.max_density)
+        new.item_by_period = self.item_by_period.copy()
+        return new
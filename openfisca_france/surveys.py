@@ -0,0 +1,164 @@
+# -*- coding: utf-8 -*-
+
+"""Creation of simulations from surveys, given as columns of arrays by entity.
+
+A survey is a table (a mapping from variable names to arrays) for each entity: individus, and optionally familles,
+foyers_fiscaux and menages. The table of individus gives the id and the role of each person in each group entity
+(`idfam` & `quifam`, `idfoy` & `quifoy`, `idmen` & `quimen`). The ids are any integers. The table of a group entity,
+when given, has a column with the same name as the id of this entity in the individus table (for example `idfam`).
+
+Unlike test cases, the survey is neither converted row by row nor checked column by column: its structure is checked
+with vectorized operations, and its arrays are given directly to the holders of the simulation. Invalid surveys raise a
+ValueError.
+"""
+
+
+import os
+
+import numpy as np
+
+from . import entities, simulations
+
+try:
+    import pandas
+except ImportError:
+    pandas = None
+
+
+# Role of the first person of a group entity that may have many persons with the same role (enfants, personnes à
+# charge, autres)
+first_plural_role_by_key_plural = dict(
+    familles = 2,
+    foyers_fiscaux = 2,
+    menages = 2,
+    )
+
+
+def load_table(file_path):
+    """Load the table (a dict of arrays by variable name) of an entity from a npz, HDF5 or Parquet file."""
+    extension = os.path.splitext(file_path)[1].lower()
+    if extension == '.npz':
+        with np.load(file_path) as npz_file:
+            return dict(
+                (name, npz_file[name])
+                for name in npz_file.files
+                )
+    if pandas is None:
+        raise ImportError(u'Reading {} files requires pandas'.format(extension))
+    if extension in ('.h5', '.hdf', '.hdf5'):
+        data_frame = pandas.read_hdf(file_path)
+    elif extension == '.parquet':
+        data_frame = pandas.read_parquet(file_path)
+    else:
+        raise ValueError(u'Unknown survey file format: {}'.format(file_path))
+    return dict(
+        (name, data_frame[name].values)
+        for name in data_frame.columns
+        )
+
+
+def new_simulation(tax_benefit_system, period, table_by_key_plural, debug = False, debug_all = False, trace = False,
+        **kwargs):
+    """Create a simulation from the tables of a survey, by entity key plural.
+
+    A table is either a dict of arrays by variable name, or the path of a file (see `load_table`). The arrays of the
+    variables are set for the given period. Other keyword arguments are given to the simulation.
+    """
+    table_by_key_plural = dict(
+        (key_plural, load_table(table) if isinstance(table, basestring) else table)
+        for key_plural, table in table_by_key_plural.iteritems()
+        )
+    for key_plural, table in table_by_key_plural.iteritems():
+        if key_plural not in entities.entity_class_by_key_plural:
+            raise ValueError(u'Unknown entity: {}'.format(key_plural))
+        lengths = set(len(array) for array in table.itervalues())
+        if len(lengths) > 1:
+            raise ValueError(u'The columns of {} have different lengths: {}'.format(key_plural, sorted(lengths)))
+    if 'individus' not in table_by_key_plural:
+        raise ValueError(u'The table of individus is required')
+    individus = table_by_key_plural['individus']
+    persons_count = len(individus.itervalues().next()) if individus else 0
+
+    simulation = simulations.Simulation(
+        debug = debug,
+        debug_all = debug_all,
+        period = period,
+        tax_benefit_system = tax_benefit_system,
+        trace = trace,
+        **kwargs
+        )
+    array_by_name_by_entity = {simulation.persons: dict(individus)}
+    simulation.persons.count = simulation.persons.step_size = persons_count
+    for entity in simulation.entity_by_key_plural.itervalues():
+        if entity.is_persons_entity:
+            continue
+        id_name = entity.index_for_person_variable_name
+        role_name = entity.role_for_person_variable_name
+        table = table_by_key_plural.get(entity.key_plural)
+        if id_name not in individus:
+            if table:
+                raise ValueError(u'Persons of {} are missing: column {} of individus is required'.format(
+                    entity.key_plural, id_name))
+            continue
+        if role_name not in individus:
+            raise ValueError(u'Column {} of individus is required'.format(role_name))
+        ids, entity_index = np.unique(individus[id_name], return_inverse = True)
+        role = get_roles(entity, entity_index, np.asarray(individus[role_name]), len(ids))
+        array_by_name = array_by_name_by_entity.setdefault(entity, {})
+        if table:
+            if id_name not in table:
+                raise ValueError(u'Column {} of {} is required'.format(id_name, entity.key_plural))
+            # Reorder the rows of the table like the sorted ids of the persons table.
+            table_ids = np.asarray(table[id_name])
+            order = np.argsort(table_ids, kind = 'mergesort')
+            if len(table_ids) != len(ids) or not (table_ids[order] == ids).all():
+                raise ValueError(u'The ids of {} differ from the ids {} of individus'.format(entity.key_plural,
+                    id_name))
+            for name, array in table.iteritems():
+                if name != id_name:
+                    array_by_name[name] = np.asarray(array)[order]
+        entity.count = entity.step_size = len(ids)
+        entity.roles_count = int(role.max()) + 1 if len(role) else 1
+        array_by_name_by_entity[simulation.persons][id_name] = entity_index
+        array_by_name_by_entity[simulation.persons][role_name] = role
+
+    for entity, array_by_name in array_by_name_by_entity.iteritems():
+        for name, array in array_by_name.iteritems():
+            holder = simulation.get_or_new_holder(name)
+            if holder.entity.key_plural != entity.key_plural:
+                raise ValueError(u'Variable {} is not a variable of {}'.format(name, entity.key_plural))
+            array = np.asarray(array)
+            if array.dtype != holder.column.dtype:
+                array = array.astype(holder.column.dtype)
+            holder.set_input(period, array)
+    return simulation
+
+
+def get_roles(entity, entity_index, role, count):
+    """Check the roles of the persons in a group entity, and number the persons that share a plural role.
+
+    Each group has a single person of role 0 and at most one person of role 1. The persons of a plural role (enfants,
+    personnes à charge…) get successive roles, in the order of the persons table, like in test cases.
+    """
+    first_plural_role = first_plural_role_by_key_plural[entity.key_plural]
+    if (role < 0).any():
+        raise ValueError(u'Negative roles in {}'.format(entity.role_for_person_variable_name))
+    for singular_role in xrange(first_plural_role):
+        singular_role_count = np.bincount(entity_index[role == singular_role], minlength = count)
+        if singular_role == 0:
+            if (singular_role_count != 1).any():
+                raise ValueError(u'{} groups of {} have no or many persons of role 0'.format(
+                    (singular_role_count != 1).sum(), entity.key_plural))
+        elif (singular_role_count > 1).any():
+            raise ValueError(u'{} groups of {} have many persons of role {}'.format(
+                (singular_role_count > 1).sum(), entity.key_plural, singular_role))
+    role = role.astype(np.int32)
+    plural = role >= first_plural_role
+    plural_entity_index = entity_index[plural]
+    order = np.argsort(plural_entity_index, kind = 'mergesort')
+    sorted_entity_index = plural_entity_index[order]
+    # Rank of each person among the persons of the same group that have a plural role
+    rank = np.empty(len(order), dtype = np.int32)
+    rank[order] = np.arange(len(order)) - np.searchsorted(sorted_entity_index, sorted_entity_index)
+    role[plural] = first_plural_role + rank
+    return role
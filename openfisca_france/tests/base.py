@@ -8,6 +8,7 @@ from ..reforms import (
     aides_ville_paris,
     allocations_familiales_imposables,
     cesthra_invalidee,
+    de_net_a_brut,
     plf2016,
     plf2016_ayrault_muet,
     plf2015,
@@ -37,6 +38,7 @@ build_reform_function_by_key = {
     'aides_ville_paris': aides_ville_paris.build_reform,
     'allocations_familiales_imposables': allocations_familiales_imposables.build_reform,
     'cesthra_invalidee': cesthra_invalidee.build_reform,
+    'de_net_a_brut': de_net_a_brut.build_reform,
     'plf2016': plf2016.build_reform,
     'ayrault_muet': plf2016_ayrault_muet.build_reform,
     'plf2016_counterfactual': plf2016.build_counterfactual_reform,
@@ -46,16 +48,6 @@ build_reform_function_by_key = {
     'trannoy_wasmer': trannoy_wasmer.build_reform,
     }
 
-# Only use the following reform if scipy can be imported
-try:
-    import scipy
-except ImportError:
-    scipy = None
-
-if scipy is not None:
-    from ..reforms import de_net_a_brut
-    build_reform_function_by_key['de_net_a_brut'] = de_net_a_brut.build_reform
-
 reform_by_full_key = {}
 
 
@@ -0,0 +1,64 @@
+# -*- coding: utf-8 -*-
+
+from openfisca_core import periods
+
+from openfisca_france import array_cache
+from openfisca_france.tests import base
+
+
+def test_array_cache_eviction():
+    cache = array_cache.ArrayCache(0)
+    scenario = base.tax_benefit_system.new_scenario().init_single_entity(
+        period = 2014,
+        parent1 = dict(age = 40, salaire_imposable = 30000),
+        enfants = [dict(age = 10)],
+        )
+    simulation = scenario.new_simulation(array_cache = cache)
+    revdisp = simulation.calculate('revdisp')
+    stats = cache.get_stats()
+    assert stats['evictions_count'] > 0
+    assert stats['misses_count'] > 0
+    # Requested variables are pinned, and inputs are never evicted.
+    assert 'revdisp' in cache.pinned_variables_name
+    assert simulation.get_or_new_holder('revdisp').get_array(periods.period(2014)) is not None
+    assert simulation.get_or_new_holder('salaire_imposable').get_array(periods.period(2014)) is not None
+
+    # Evicted arrays are computed again.
+    cache.unpin('revdisp')
+    cache.pin('salaire_imposable')
+    cache.evict(simulation)
+    assert simulation.get_or_new_holder('revdisp').get_array(periods.period(2014)) is None
+    base.assert_near(simulation.calculate('revdisp'), revdisp, absolute_error_margin = 0.01)
+    base.assert_near(simulation.calculate('revdisp'), scenario.new_simulation().calculate('revdisp'),
+        absolute_error_margin = 0.01)
+    assert cache.get_stats()['hits_count'] > 0
+
+
+def test_array_cache_registrations():
+    cache = array_cache.ArrayCache(10 ** 9)
+    simulation = base.tax_benefit_system.new_scenario().init_single_entity(
+        period = 2014,
+        parent1 = dict(age = 40, salaire_imposable = 30000),
+        ).new_simulation(array_cache = cache)
+    simulation.calculate('revdisp')
+    assert cache.bytes > 0
+    registered_bytes = cache.bytes
+
+    # Clones don't register their arrays in the cache of the simulation.
+    simulation.calculate_marginal_rate('revdisp', 'salaire_imposable', variation = 100)
+    assert cache.bytes == registered_bytes
+
+    # The arrays deleted by an update of an input are unregistered.
+    simulation.update_input('salaire_imposable', periods.period(2014),
+        simulation.calculate('salaire_imposable') + 1000)
+    assert cache.bytes < registered_bytes
+    assert cache.bytes == sum(array_bytes for variable_name, array_bytes in cache.item_by_key.itervalues())
+
+
+if __name__ == '__main__':
+    import logging
+    import sys
+
+    logging.basicConfig(level = logging.ERROR, stream = sys.stdout)
+    test_array_cache_eviction()
+    test_array_cache_registrations()
@@ -0,0 +1,49 @@
+# -*- coding: utf-8 -*-
+
+import numpy as np
+
+from openfisca_france.tests import base
+
+
+def new_scenario():
+    return base.tax_benefit_system.new_scenario().init_single_entity(
+        axes = [
+            dict(
+                count = 7,
+                name = 'salaire_imposable',
+                max = 60000,
+                min = 0,
+                ),
+            dict(
+                count = 5,
+                name = 'loyer',
+                max = 12000,
+                min = 0,
+                ),
+            ],
+        period = 2014,
+        parent1 = dict(age_en_mois = 40 * 12 + 6),
+        menage = dict(zone_apl = 1),
+        )
+
+
+def test_iter_calculate_axes():
+    variables_name = ['loyer', 'revdisp', 'salaire_imposable']
+    simulation = new_scenario().new_simulation()
+    for chunk_size in (4, 10, 35):
+        chunks = list(new_scenario().iter_calculate_axes(variables_name, chunk_size = chunk_size))
+        assert all(len(chunk['revdisp']) <= chunk_size for chunk in chunks)
+        for variable_name in variables_name:
+            base.assert_near(
+                np.concatenate([chunk[variable_name] for chunk in chunks]),
+                simulation.calculate(variable_name),
+                absolute_error_margin = 0.01,
+                )
+
+
+if __name__ == '__main__':
+    import logging
+    import sys
+
+    logging.basicConfig(level = logging.ERROR, stream = sys.stdout)
+    test_iter_calculate_axes()
@@ -0,0 +1,75 @@
+# -*- coding: utf-8 -*-
+
+import numpy as np
+from openfisca_core import periods
+
+from openfisca_france.model.base import CAT
+from openfisca_france.model.prelevements_obligatoires.prelevements_sociaux.cotisations_sociales.base import (
+    apply_bareme_for_relevant_type_sal, CompiledBaremes, cotisations_matrix_by_type_by_simulation)
+from openfisca_france.tests import base
+
+
+def check_compiled_baremes(bareme_by_type_sal_name):
+    random_state = np.random.RandomState(1234)
+    count = 1000
+    base_cotisations = random_state.uniform(0, 20000, count)
+    categorie_salarie = random_state.randint(0, len(CAT), count)
+    plafond_securite_sociale = random_state.uniform(1000, 3200, count)
+    compiled_baremes = CompiledBaremes.get(bareme_by_type_sal_name)
+    assert compiled_baremes is CompiledBaremes.get(bareme_by_type_sal_name)
+    assert compiled_baremes.index_by_bareme_name
+    cotisations = compiled_baremes.calc(categorie_salarie, base_cotisations, plafond_securite_sociale,
+        round_base_decimals = 2)
+    for bareme_name, bareme_index in compiled_baremes.index_by_bareme_name.iteritems():
+        expected = 0
+        for type_sal_name, type_sal_index in CAT:
+            if type_sal_name not in bareme_by_type_sal_name:
+                continue
+            bareme = bareme_by_type_sal_name[type_sal_name].get(bareme_name)
+            if bareme is not None:
+                expected += bareme.calc(
+                    base_cotisations * (categorie_salarie == type_sal_index),
+                    factor = plafond_securite_sociale,
+                    round_base_decimals = 2,
+                    )
+        base.assert_near(cotisations[bareme_index], expected, absolute_error_margin = 1e-9)
+        base.assert_near(
+            apply_bareme_for_relevant_type_sal(
+                bareme_by_type_sal_name = bareme_by_type_sal_name,
+                bareme_name = bareme_name,
+                categorie_salarie = categorie_salarie,
+                base = base_cotisations,
+                plafond_securite_sociale = plafond_securite_sociale,
+                ),
+            - expected,
+            absolute_error_margin = 1e-9,
+            )
+
+
+def test_compiled_baremes():
+    for year in (2012, 2015):
+        cotsoc = base.tax_benefit_system.get_compact_legislation(periods.instant(year)).cotsoc
+        yield check_compiled_baremes, cotsoc.cotisations_employeur
+        yield check_compiled_baremes, cotsoc.cotisations_salarie
+
+
+def test_cotisations_matrix_of_last_period():
+    simulation = base.tax_benefit_system.new_scenario().init_single_entity(
+        period = 2014,
+        parent1 = dict(age = 40, salaire_de_base = 30000),
+        ).new_simulation()
+    for month in (u'2014-01', u'2014-02'):
+        simulation.calculate('agff_salarie', month)
+    cotisations_matrix_by_type = cotisations_matrix_by_type_by_simulation[simulation]
+    assert cotisations_matrix_by_type.keys() == ['salarie']
+    assert cotisations_matrix_by_type['salarie'].period == periods.period(u'2014-02')
+
+
+if __name__ == '__main__':
+    import logging
+    import sys
+
+    logging.basicConfig(level = logging.ERROR, stream = sys.stdout)
+    for function_and_arguments in test_compiled_baremes():
+        function_and_arguments[0](*function_and_arguments[1:])
+    test_cotisations_matrix_of_last_period()
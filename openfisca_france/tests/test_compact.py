@@ -0,0 +1,56 @@
+# -*- coding: utf-8 -*-
+
+import numpy as np
+
+from openfisca_france import compact
+from openfisca_france.tests import base
+
+
+def test_compact_arrays():
+    compact_arrays = compact.CompactArrays(0.005)
+    compact_arrays['bool'] = np.array([True, False, True] * 5)
+    compact_arrays['enum'] = np.array([0, 3, 8], dtype = np.int32)
+    compact_arrays['int'] = np.array([0, 100000], dtype = np.int32)
+    compact_arrays['float'] = np.array([0, 1234.56, 25000.01])
+    compact_arrays['big_float'] = np.array([0, 1e9 + 0.01])
+    assert compact_arrays.item_by_period['bool'].nbytes == 2
+    assert compact_arrays.item_by_period['enum'].array.dtype == np.int8
+    assert isinstance(compact_arrays.item_by_period['int'], np.ndarray)
+    assert compact_arrays.item_by_period['float'].array.dtype == np.float32
+    assert isinstance(compact_arrays.item_by_period['big_float'], np.ndarray)
+    for name, array in (
+            ('bool', np.array([True, False, True] * 5)),
+            ('enum', np.array([0, 3, 8], dtype = np.int32)),
+            ('int', np.array([0, 100000], dtype = np.int32)),
+            ):
+        assert compact_arrays[name].dtype == array.dtype
+        assert (compact_arrays[name] == array).all()
+    assert compact_arrays['float'].dtype == np.float64
+    assert (np.abs(compact_arrays['float'] - [0, 1234.56, 25000.01]) <= 0.005).all()
+
+
+def test_compact_simulation():
+    scenario = base.tax_benefit_system.new_scenario().init_single_entity(
+        axes = [
+            dict(
+                count = 10,
+                name = 'salaire_imposable',
+                max = 100000,
+                min = 0,
+                ),
+            ],
+        period = 2014,
+        parent1 = dict(age = 40),
+        enfants = [dict(age = 10)],
+        )
+    base.assert_near(scenario.new_simulation(compact_float_tolerance = 0.005).calculate('revdisp'),
+        scenario.new_simulation().calculate('revdisp'), absolute_error_margin = 0.1)
+
+
+if __name__ == '__main__':
+    import logging
+    import sys
+
+    logging.basicConfig(level = logging.ERROR, stream = sys.stdout)
+    test_compact_arrays()
+    test_compact_simulation()
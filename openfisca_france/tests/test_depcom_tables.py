@@ -0,0 +1,46 @@
+# -*- coding: utf-8 -*-
+
+import numpy as np
+
+from openfisca_france import depcom_tables
+
+
+def test_depcom_to_code():
+    depcom = np.array(['01001', '2A004', '2B002', '97101', '97611', '', 'ABCDE'], dtype = 'S5')
+    code = depcom_tables.depcom_to_code(depcom)
+    assert code.dtype == np.int32
+    assert (code == [1001, 20004, 20002, 97101, 97611, 0, 0]).all()
+    assert (depcom_tables.departement_from_code(code) == [1, 20, 20, 971, 976, 0, 0]).all()
+
+
+def test_lookup_default_value():
+    table = depcom_tables.DepcomTable.from_value_by_depcom(
+        {'01001': 3, '75056': 1, '75101': 1},
+        default_value = 2,
+        dtype = np.int16,
+        )
+    depcom = np.array(['75101', '00000', '01001', '99999', '75056'], dtype = 'S5')
+    assert (table.lookup(depcom) == [1, 2, 3, 2, 1]).all()
+    assert (table.lookup(depcom_tables.depcom_to_code(depcom)) == [1, 2, 3, 2, 1]).all()
+
+
+def test_zone_apl():
+    depcom = np.array(['75056', '75101', '01001', '99999'], dtype = 'S5')
+    assert (depcom_tables.lookup('zone_apl', depcom) == [1, 1, 3, 2]).all()
+
+
+def test_taux_versement_transport():
+    depcom = np.array(['01033', '01001', '99999'], dtype = 'S5')
+    assert (depcom_tables.lookup('taux_aot', depcom) == [0.25, 0, 0]).all()
+    assert (depcom_tables.lookup('taux_smt', depcom) == [0, 0, 0]).all()
+
+
+if __name__ == '__main__':
+    import logging
+    import sys
+
+    logging.basicConfig(level = logging.ERROR, stream = sys.stdout)
+    test_depcom_to_code()
+    test_lookup_default_value()
+    test_zone_apl()
+    test_taux_versement_transport()
@@ -0,0 +1,52 @@
+# -*- coding: utf-8 -*-
+
+from __future__ import division
+
+import numpy as np
+
+from openfisca_france import inversions
+
+
+def test_invert_piecewise_linear():
+    evaluations = []
+
+    def net_from_brut(brut):
+        evaluations.append(brut)
+        return np.where(brut < 3000, 0.78 * brut, 0.78 * 3000 + 0.7 * (brut - 3000))
+
+    net = net_from_brut(np.array([0, 100, 2300, 3000, 10000, 1e6]))
+    breakpoints = np.outer([0, 3000, 4000], np.ones(len(net)))
+    del evaluations[:]
+    brut = inversions.invert_piecewise_linear(net_from_brut, net, breakpoints)
+    assert (np.abs(brut - [0, 100, 2300, 3000, 10000, 1e6]) < 1e-6).all()
+    # One evaluation by breakpoint, then a single check of the solution.
+    assert len(evaluations) == 4
+
+
+def test_solve_increasing():
+    evaluated_rows = []
+
+    def net_from_brut(brut):
+        evaluated_rows.append(brut.copy())
+        # A piecewise linear function, rounded to the cent, like a net salary computed from a brut one.
+        return np.round(np.where(brut < 3000, 0.78 * brut, 0.78 * 3000 + 0.7 * (brut - 3000)), 2)
+
+    brut = np.array([0, 100, 2300, 2999.99, 3000, 10000, 1e6])
+    net = net_from_brut(brut)
+    del evaluated_rows[:]
+    solution = inversions.solve_increasing(net_from_brut, net, net * 1.3)
+    assert (np.abs(net_from_brut(solution) - net) <= 0.01).all()
+    assert len(evaluated_rows) < 20
+    # The solution of the rows that have converged is not modified anymore.
+    for previous_rows, rows in zip(evaluated_rows[:-2], evaluated_rows[1:-1]):
+        converged = np.abs(net_from_brut(previous_rows) - net) <= 0.01
+        assert (previous_rows[converged] == rows[converged]).all()
+
+
+if __name__ == '__main__':
+    import logging
+    import sys
+
+    logging.basicConfig(level = logging.ERROR, stream = sys.stdout)
+    test_invert_piecewise_linear()
+    test_solve_increasing()
@@ -0,0 +1,47 @@
+# -*- coding: utf-8 -*-
+
+import os
+import shutil
+import tempfile
+
+from openfisca_core import periods
+
+from openfisca_france import caches, legislation_cache
+from openfisca_france.tests import base
+
+
+def test_legislation_key_changes_with_sources():
+    temporary_dir = tempfile.mkdtemp()
+    try:
+        xml_file_path = os.path.join(temporary_dir, 'param.xml')
+        with open(xml_file_path, 'w') as xml_file:
+            xml_file.write('<NODE code="root"/>')
+        key = legislation_cache.get_legislation_key([(xml_file_path, None)])
+        assert key == legislation_cache.get_legislation_key([(xml_file_path, None)])
+        assert key != legislation_cache.get_legislation_key([(xml_file_path, ('children', 'ir'))])
+        with open(xml_file_path, 'w') as xml_file:
+            xml_file.write('<NODE code="root2"/>')
+        assert key != legislation_cache.get_legislation_key([(xml_file_path, None)])
+    finally:
+        shutil.rmtree(temporary_dir)
+
+
+def test_cached_legislation():
+    temporary_dir = tempfile.mkdtemp()
+    cache_dir = os.environ.get(caches.CACHE_DIR_ENVIRONMENT_VARIABLE)
+    os.environ[caches.CACHE_DIR_ENVIRONMENT_VARIABLE] = temporary_dir
+    try:
+        instant = periods.instant(2015)
+        tax_benefit_system = base.TaxBenefitSystem()  # Fills the cache
+        compact_legislation = tax_benefit_system.get_compact_legislation(instant)
+        cached_tax_benefit_system = base.TaxBenefitSystem()
+        assert cached_tax_benefit_system.legislation_json == tax_benefit_system.legislation_json
+        cached_compact_legislation = cached_tax_benefit_system.get_compact_legislation(instant)
+        assert cached_compact_legislation is not compact_legislation
+        assert cached_compact_legislation.ir.decote.seuil_celib == compact_legislation.ir.decote.seuil_celib
+    finally:
+        if cache_dir is None:
+            del os.environ[caches.CACHE_DIR_ENVIRONMENT_VARIABLE]
+        else:
+            os.environ[caches.CACHE_DIR_ENVIRONMENT_VARIABLE] = cache_dir
+        shutil.rmtree(temporary_dir)
@@ -0,0 +1,53 @@
+# -*- coding: utf-8 -*-
+
+from openfisca_core import periods
+
+from openfisca_france import memory
+from openfisca_france.tests import base
+
+
+def test_memory_rows():
+    simulation = base.tax_benefit_system.new_scenario().init_single_entity(
+        period = 2014,
+        parent1 = dict(age = 40, salaire_imposable = 30000),
+        ).new_simulation()
+    simulation.calculate('revdisp')
+    holder = simulation.get_or_new_holder('salaire_imposable')
+    array = holder.get_array(periods.period(2014))
+    holder.set_array(periods.period(2013), array.copy())
+    holder.set_array(periods.period(2012), array[:])
+
+    rows = memory.get_memory_rows(simulation, find_duplicates = True)
+    row_by_key = dict(
+        ((row['variable'], row['period']), row)
+        for row in rows
+        )
+    assert row_by_key[('salaire_imposable', u'2014')]['bytes'] >= array.nbytes
+    assert row_by_key[('salaire_imposable', u'2013')]['duplicate_of'] == ('salaire_imposable', u'2014')
+    assert row_by_key[('salaire_imposable', u'2012')]['bytes'] == 0
+    assert row_by_key[('salaire_imposable', u'2012')]['shared_with'] == ('salaire_imposable', u'2014')
+    assert memory.get_bytes_by(rows, 'entity')['individus'] > 0
+
+
+def test_memory_snapshots():
+    memory_inspector = memory.MemoryInspector(variables_name = ['irpp'])
+    simulation = base.tax_benefit_system.new_scenario().init_single_entity(
+        period = 2014,
+        parent1 = dict(age = 40, salaire_imposable = 30000),
+        ).new_simulation(memory_inspector = memory_inspector)
+    simulation.calculate('revdisp')
+    assert memory_inspector.snapshots
+    snapshot = memory_inspector.snapshots[0]
+    assert snapshot['label'].startswith(u'irpp ')
+    assert snapshot['bytes'] == sum(snapshot['bytes_by_entity'].itervalues())
+    snapshot = memory_inspector.take_snapshot(simulation, u'end')
+    assert snapshot['bytes'] > memory_inspector.snapshots[0]['bytes']
+
+
+if __name__ == '__main__':
+    import logging
+    import sys
+
+    logging.basicConfig(level = logging.ERROR, stream = sys.stdout)
+    test_memory_rows()
+    test_memory_snapshots()
@@ -0,0 +1,106 @@
+# -*- coding: utf-8 -*-
+
+import numpy as np
+from openfisca_core import periods
+
+from openfisca_france import panels
+from openfisca_france.tests import base
+
+
+def month(year, month):
+    return periods.period(u'{}-{:02d}'.format(year, month))
+
+
+def test_monthly_panels():
+    monthly_panels = panels.MonthlyPanels()
+    for index in xrange(1, 13):
+        monthly_panels[month(2014, index)] = np.array([index, 10 * index], dtype = np.float32)
+    monthly_panels[month(2015, 1)] = np.array([100, 1000], dtype = np.float32)
+    monthly_panels[periods.period(2015)] = np.array([-1, -1], dtype = np.float32)
+    assert len(monthly_panels) == 14
+    assert set(monthly_panels) == set([month(2014, index) for index in xrange(1, 13)] + [month(2015, 1),
+        periods.period(2015)])
+    assert (monthly_panels[month(2014, 3)] == [3, 30]).all()
+    assert (monthly_panels[periods.period(2015)] == [-1, -1]).all()
+    assert monthly_panels.get_panel(2014).shape == (12, 2)
+    assert monthly_panels.get_panel(2015) is None
+    assert (monthly_panels.sum_months(periods.period(2014)) == [78, 780]).all()
+    assert (monthly_panels.sum_months(periods.period(u'month', u'2014-10', 3)) == [33, 330]).all()
+    assert (monthly_panels.sum_months(periods.period(u'month', u'2014-12', 2)) == [112, 1120]).all()
+    assert monthly_panels.sum_months(periods.period(u'month', u'2015-01', 2)) is None
+
+    # Arrays that don't fit in the panel are stored apart.
+    monthly_panels[month(2014, 5)] = np.array([5, 50, 500], dtype = np.float32)
+    assert (monthly_panels[month(2014, 5)] == [5, 50, 500]).all()
+    assert monthly_panels.sum_months(periods.period(2014)) is None
+    del monthly_panels[month(2014, 5)]
+    assert month(2014, 5) not in monthly_panels
+
+
+def test_monthly_panels_cumulative_sums():
+    monthly_panels = panels.MonthlyPanels()
+    for index in xrange(1, 13):
+        monthly_panels[month(2015, index)] = np.array([index % 2, index], dtype = np.int32)
+        monthly_panels[month(2016, index)] = np.array([index % 3 == 0, False])
+    assert (monthly_panels.sum_months(periods.period(u'month', u'2015-02', 11)) == [5, 77]).all()
+    assert monthly_panels.sum_months(periods.period(u'month', u'2015-02', 11)).dtype == np.int32
+    monthly_panels[month(2015, 12)] = np.array([100, 1000], dtype = np.int32)
+    assert (monthly_panels.sum_months(periods.period(u'month', u'2015-02', 11)) == [105, 1065]).all()
+    assert (monthly_panels.sum_months(periods.period(2016)) == [True, False]).all()
+    assert (monthly_panels.sum_months(periods.period(u'month', u'2016-01', 2)) == [False, False]).all()
+
+
+def test_monthly_panels_set_then_fill():
+    monthly_panels = panels.MonthlyPanels()
+    array = np.zeros(3, dtype = np.int32)
+    monthly_panels[month(2015, 2)] = array
+    # Arrays are often filled after having been stored in a holder.
+    array[1] = 7
+    assert (monthly_panels[month(2015, 2)] == [0, 7, 0]).all()
+    assert (monthly_panels.copy()[month(2015, 2)] == [0, 7, 0]).all()
+
+
+def test_monthly_panels_read_only():
+    monthly_panels = panels.MonthlyPanels()
+    for index in xrange(1, 13):
+        monthly_panels[month(2015, index)] = np.array([index, 0], dtype = np.float32)
+    assert (monthly_panels.sum_months(periods.period(2015)) == [78, 0]).all()
+    for array in (monthly_panels[month(2015, 3)], monthly_panels.get_panel(2015)):
+        try:
+            array[0] += 1
+        except ValueError:
+            pass
+        else:
+            assert False, u'Rows and panels must be read-only'
+    monthly_panels[month(2015, 3)] = np.array([3, 10], dtype = np.float32)
+    assert (monthly_panels.sum_months(periods.period(2015)) == [78, 10]).all()
+
+
+def test_simulation_calculate_add_after_monthly_read():
+    simulation = base.tax_benefit_system.new_scenario().init_single_entity(
+        period = 2014,
+        parent1 = dict(age = 40),
+        ).new_simulation(monthly_panel_variables_name = ['salaire_de_base'])
+    simulation.set_monthly_panel('salaire_de_base', 2014, np.ones((12, 1)) * 1000)
+    assert (simulation.calculate_add('salaire_de_base', periods.period(2014)) == [12000]).all()
+    panel = simulation.get_or_new_holder('salaire_de_base')._array_by_period.panel_by_year[2014]
+    cumulative_sums = panel.cumulative_sums
+    assert cumulative_sums is not None
+    assert (simulation.calculate('salaire_de_base', month(2014, 3)) == [1000]).all()
+    # Reading a month keeps the cumulative sums.
+    assert (simulation.calculate_add('salaire_de_base', periods.period(u'month', u'2014-02', 11)) == [11000]).all()
+    assert panel.cumulative_sums is cumulative_sums
+    simulation.update_input('salaire_de_base', month(2014, 3), np.array([2000], dtype = np.float32))
+    assert (simulation.calculate_add('salaire_de_base', periods.period(2014)) == [13000]).all()
+
+
+if __name__ == '__main__':
+    import logging
+    import sys
+
+    logging.basicConfig(level = logging.ERROR, stream = sys.stdout)
+    test_monthly_panels()
+    test_monthly_panels_cumulative_sums()
+    test_monthly_panels_set_then_fill()
+    test_monthly_panels_read_only()
+    test_simulation_calculate_add_after_monthly_read()
@@ -0,0 +1,37 @@
+# -*- coding: utf-8 -*-
+
+import numpy as np
+from openfisca_core import periods
+
+from openfisca_france import parallel, surveys
+from openfisca_france.tests import base
+from openfisca_france.tests.test_surveys import new_tables
+
+
+def test_get_components():
+    individus = dict(
+        idfam = np.array([5, 5, 9, 9, 1, 3, 3]),
+        idfoy = np.array([5, 9, 9, 2, 1, 3, 3]),
+        )
+    component = parallel.get_components(individus, parallel.get_ids_name(individus))
+    assert (component == [0, 0, 0, 0, 4, 5, 5]).all()
+    assert (parallel.get_persons_shard(component, 2) == [0, 0, 0, 0, 1, 1, 1]).all()
+
+
+def test_parallel_calculate():
+    period = periods.period(2013)
+    variables_name = ['salaire_net', 'irpp', 'revdisp']
+    array_by_name = parallel.calculate(new_tables(), period, variables_name, processes_count = 2, shards_count = 2)
+    simulation = surveys.new_simulation(base.tax_benefit_system, period, new_tables())
+    for variable_name in variables_name:
+        base.assert_near(array_by_name[variable_name], simulation.calculate(variable_name, period),
+            absolute_error_margin = 0.01)
+
+
+if __name__ == '__main__':
+    import logging
+    import sys
+
+    logging.basicConfig(level = logging.ERROR, stream = sys.stdout)
+    test_get_components()
+    test_parallel_calculate()
@@ -0,0 +1,57 @@
+# -*- coding: utf-8 -*-
+
+import os
+import shutil
+import tempfile
+
+from openfisca_core import periods
+
+from openfisca_france import profiling
+from openfisca_france.tests import base
+
+
+def test_profile_revdisp():
+    year = 2014
+    profiler = profiling.Profiler()
+    simulation = base.tax_benefit_system.new_scenario().init_single_entity(
+        period = year,
+        parent1 = dict(age = 40, salaire_imposable = 30000),
+        ).new_simulation(profiler = profiler)
+    simulation.calculate('revdisp')
+    simulation.calculate('revdisp')
+    assert not profiler.stack
+
+    row_by_variable_name = dict(
+        (row['variable'], row)
+        for row in profiler.get_rows()
+        if row['function'] is None
+        )
+    revdisp_row = row_by_variable_name['revdisp']
+    assert revdisp_row['calls'] == 2
+    assert revdisp_row['cache_hits'] == 1
+    assert revdisp_row['periods'] == unicode(periods.period(year))
+    assert 'irpp' in row_by_variable_name
+    for row in profiler.get_rows():
+        assert 0 <= row['self_seconds'] <= row['wall_seconds'] + 1e-6
+    # The self times of all the computations add up to the wall time of the first one.
+    assert abs(sum(row['self_seconds'] for row in profiler.get_rows()) - revdisp_row['wall_seconds']) < 1e-3
+
+    temporary_dir = tempfile.mkdtemp()
+    try:
+        stacks_file_path = os.path.join(temporary_dir, 'revdisp.stacks')
+        profiler.write_collapsed_stacks(stacks_file_path)
+        with open(stacks_file_path) as stacks_file:
+            stacks = [line.rsplit(' ', 1)[0] for line in stacks_file]
+        assert 'revdisp' in stacks
+        assert all(stack.split(';')[0] == 'revdisp' for stack in stacks)
+        profiler.write_table(os.path.join(temporary_dir, 'revdisp.csv'))
+    finally:
+        shutil.rmtree(temporary_dir)
+
+
+if __name__ == '__main__':
+    import logging
+    import sys
+
+    logging.basicConfig(level = logging.ERROR, stream = sys.stdout)
+    test_profile_revdisp()
@@ -0,0 +1,27 @@
+# -*- coding: utf-8 -*-
+
+from openfisca_france import init_country
+from openfisca_france.model import registry
+from openfisca_france.tests import base
+
+
+def test_lazy_column_by_name():
+    TaxBenefitSystem = init_country(lazy_variables = True)
+    tax_benefit_system = TaxBenefitSystem()
+    column_by_name = tax_benefit_system.column_by_name
+    assert isinstance(column_by_name, registry.LazyColumnByName)
+    assert 'salaire_net' in column_by_name
+    assert column_by_name['salaire_net'].name == 'salaire_net'
+    assert column_by_name.get('unknown_variable') is None
+    assert set(column_by_name) == set(base.tax_benefit_system.column_by_name)
+
+
+def test_manifest():
+    # The model is already loaded by module base, so the manifest is built in a fresh process.
+    assert registry.is_model_loaded()
+    module_name_by_variable_name = registry.build_manifest()
+    assert 'salaire_net' in module_name_by_variable_name
+    assert 'irpp' in module_name_by_variable_name
+    assert set(module_name_by_variable_name) <= set(base.tax_benefit_system.column_by_name)
+    assert registry.load_manifest() == module_name_by_variable_name
+    assert set(module_name_by_variable_name.itervalues()) <= set(registry.formula_modules_name)
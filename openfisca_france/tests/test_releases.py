@@ -0,0 +1,46 @@
+# -*- coding: utf-8 -*-
+
+from openfisca_core import periods
+
+from openfisca_france import releases
+from openfisca_france.tests import base
+
+
+def test_release_intermediates():
+    release_plan = releases.ReleasePlan(['revdisp', 'nivvie'])
+    release_plan.record(base.tax_benefit_system.new_scenario().init_single_entity(
+        period = 2014,
+        parent1 = dict(age = 40, salaire_imposable = 20000),
+        enfants = [dict(age = 10)],
+        ).new_simulation())
+    assert release_plan.consumers_key_by_key
+
+    scenario = base.tax_benefit_system.new_scenario().init_single_entity(
+        period = 2014,
+        parent1 = dict(age = 40, salaire_imposable = 30000),
+        enfants = [dict(age = 10)],
+        )
+    simulation = scenario.new_simulation()
+    # Inputs of salaire_imposable are divided into months, although this variable has a formula.
+    input_periods = set(simulation.get_or_new_holder('salaire_imposable')._array_by_period)
+    assert input_periods
+    array_by_output_name = release_plan.calculate_outputs(simulation)
+    assert release_plan.get_stats()['releases_count'] > 0
+    assert release_plan.get_stats()['recomputations_count'] == 0
+    period = periods.period(2014)
+    # Intermediate arrays are released, but not outputs and inputs.
+    assert not simulation.get_or_new_holder('irpp')._array_by_period
+    assert simulation.get_or_new_holder('revdisp').get_array(period) is not None
+    assert set(simulation.get_or_new_holder('salaire_imposable')._array_by_period) >= input_periods
+
+    reference_simulation = scenario.new_simulation()
+    for output_name, array in array_by_output_name.iteritems():
+        base.assert_near(array, reference_simulation.calculate(output_name), absolute_error_margin = 0.01)
+
+
+if __name__ == '__main__':
+    import logging
+    import sys
+
+    logging.basicConfig(level = logging.ERROR, stream = sys.stdout)
+    test_release_intermediates()
@@ -5,6 +5,8 @@ import json
 
 from nose.tools import assert_equal
 
+from openfisca_france import scenarios
+
 from . import base
 
 
@@ -430,6 +432,55 @@ def test_menage_1_personne_de_reference_1_conjoint_2_enfants():
         )
 
 
+def test_many_foyers_fiscaux_personnes_a_charge():
+    year = 2013
+    menages_count = 100
+    scenario = base.tax_benefit_system.new_scenario().init_from_attributes(
+        test_case = dict(
+            familles = [
+                dict(
+                    parents = [menage_index * 3, menage_index * 3 + 1],
+                    enfants = [menage_index * 3 + 2],
+                    )
+                for menage_index in range(menages_count)
+                ],
+            foyers_fiscaux = [
+                dict(
+                    declarants = [menage_index * 3, menage_index * 3 + 1],
+                    )
+                for menage_index in range(menages_count)
+                ],
+            individus = [
+                dict(date_naissance = datetime.date(year - age, 1, 1))
+                for menage_index in range(menages_count)
+                for age in (40, 38, 10)
+                ],
+            menages = [
+                dict(
+                    personne_de_reference = menage_index * 3,
+                    conjoint = menage_index * 3 + 1,
+                    enfants = [menage_index * 3 + 2],
+                    )
+                for menage_index in range(menages_count)
+                ],
+            ),
+        repair = True,
+        year = year,
+        )
+    assert_equal(
+        [foyer_fiscal['personnes_a_charge'] for foyer_fiscal in scenario.test_case['foyers_fiscaux']],
+        [
+            [menage_index * 3 + 2]
+            for menage_index in range(menages_count)
+            ],
+        )
+
+
+def test_test_case_converter_is_built_once():
+    converter = scenarios.get_test_case_first_step_converter(base.tax_benefit_system)
+    assert converter is scenarios.get_test_case_first_step_converter(base.tax_benefit_system)
+
+
 if __name__ == '__main__':
     import logging
     import sys
@@ -442,3 +493,5 @@ if __name__ == '__main__':
     test_foyer_fiscal_2_declarants_2_personnes_a_charge()
     test_menage_1_personne_de_reference_3_enfants()
     test_menage_1_personne_de_reference_1_conjoint_2_enfants()
+    test_many_foyers_fiscaux_personnes_a_charge()
+    test_test_case_converter_is_built_once()
@@ -0,0 +1,42 @@
+# -*- coding: utf-8 -*-
+
+import numpy as np
+
+from openfisca_france import segments
+
+
+# 3 familles: the second one is empty, and the last person belongs to no famille (index out of range).
+entity_index = np.array([2, 0, 0, 2, 0, 2, 3], dtype = np.int32)
+role = np.array([0, 0, 2, 1, 3, 2, 0], dtype = np.int32)
+entity_segments = segments.EntitySegments(entity_index, role, 3)
+
+
+def test_count():
+    assert (entity_segments.count() == [3, 0, 3]).all()
+    assert (entity_segments.count(roles = [2, 3, 4]) == [2, 0, 1]).all()
+    assert (entity_segments.count(np.array([1, 1, 0, 0, 0, 1, 1]), roles = [0, 2]) == [1, 0, 2]).all()
+
+
+def test_max_min():
+    age = np.array([40, 38, 10, 41, 4, 17, 30], dtype = np.int32)
+    assert (entity_segments.max(age, default = -9999, roles = [2, 3]) == [10, -9999, 17]).all()
+    assert (entity_segments.min(age, default = 9999, roles = [2, 3]) == [4, 9999, 17]).all()
+    assert (entity_segments.min(age, condition = age > 5, default = 9999) == [10, 9999, 17]).all()
+    assert entity_segments.max(age.astype(np.float32))[1] == -np.inf
+
+
+def test_sum_any():
+    salaire = np.array([1000., 2000., 0., 500., 0., 100., 9999.], dtype = np.float32)
+    assert (entity_segments.sum(salaire) == [2000., 0., 1600.]).all()
+    assert (entity_segments.sum(salaire, roles = [0, 1]) == [2000., 0., 1500.]).all()
+    assert (entity_segments.any(salaire > 0, roles = [2, 3]) == [False, False, True]).all()
+
+
+if __name__ == '__main__':
+    import logging
+    import sys
+
+    logging.basicConfig(level = logging.ERROR, stream = sys.stdout)
+    test_count()
+    test_max_min()
+    test_sum_any()
@@ -0,0 +1,43 @@
+# -*- coding: utf-8 -*-
+
+from __future__ import division
+
+from openfisca_core import periods
+from openfisca_core.tools import assert_near
+
+from openfisca_france.tests import base
+
+
+def new_simulation(salaire_de_base):
+    scenario = base.tax_benefit_system.new_scenario()
+    scenario.init_single_entity(
+        period = periods.period(u'2015-01'),
+        parent1 = dict(
+            salaire_de_base = salaire_de_base,
+            ),
+        )
+    return scenario.new_simulation(debug = False)
+
+
+def test_update_input():
+    period = periods.period(u'2015-01')
+    simulation = new_simulation(2000)
+    simulation.calculate('salaire_net', period)
+    assert 'salaire_net' in simulation.get_dependents_name('salaire_de_base')
+    assert 'plafond_securite_sociale' not in simulation.get_dependents_name('salaire_de_base')
+    assert simulation.holder_by_name['plafond_securite_sociale'].get_array(period) is not None
+
+    simulation.update_input('salaire_de_base', period, simulation.calculate('salaire_de_base', period) * 2)
+    assert simulation.holder_by_name['salaire_net'].get_array(period) is None
+    # Variables that don't depend on salaire_de_base are not computed again.
+    assert simulation.holder_by_name['plafond_securite_sociale'].get_array(period) is not None
+    assert_near(simulation.calculate('salaire_net', period), new_simulation(4000).calculate('salaire_net', period),
+        absolute_error_margin = 0.01)
+
+
+if __name__ == '__main__':
+    import logging
+    import sys
+
+    logging.basicConfig(level = logging.ERROR, stream = sys.stdout)
+    test_update_input()
@@ -0,0 +1,58 @@
+# -*- coding: utf-8 -*-
+
+import numpy as np
+from openfisca_core import periods
+
+from openfisca_france import sparse
+from openfisca_france.tests import base
+
+
+def test_sparse_arrays():
+    sparse_arrays = sparse.SparseArrays(0, 0.1)
+    array = np.zeros(100, dtype = np.int32)
+    array[[3, 50]] = [1000, 2000]
+    sparse_arrays[periods.period(2014)] = array
+    sparse_arrays[periods.period(2015)] = np.arange(100, dtype = np.int32)
+    assert isinstance(sparse_arrays.item_by_period[periods.period(2014)], sparse.SparseArray)
+    assert isinstance(sparse_arrays.item_by_period[periods.period(2015)], np.ndarray)
+    assert sparse_arrays.item_by_period[periods.period(2014)].nbytes < array.nbytes
+    assert (sparse_arrays[periods.period(2014)] == array).all()
+    assert sparse_arrays[periods.period(2014)].dtype == np.int32
+    # Reading an array returns a new array.
+    sparse_arrays[periods.period(2014)][3] = 0
+    assert sparse_arrays[periods.period(2014)][3] == 1000
+    assert len(sparse_arrays.copy()) == 2
+    del sparse_arrays[periods.period(2015)]
+    assert list(sparse_arrays) == [periods.period(2014)]
+
+
+def test_sparse_cerfa_fields():
+    year = 2014
+    scenario = base.tax_benefit_system.new_scenario().init_single_entity(
+        axes = [
+            dict(
+                count = 50,
+                name = 'f7uf',
+                max = 5000,
+                min = 0,
+                ),
+            ],
+        period = year,
+        parent1 = dict(age = 40, salaire_imposable = 30000),
+        foyer_fiscal = dict(f2dc = 1000, f7ud = 0),
+        )
+    simulation = scenario.new_simulation(sparse_max_density = 0.05)
+    holder = simulation.get_or_new_holder('f7ud')
+    assert isinstance(holder._array_by_period, sparse.SparseArrays)
+    assert isinstance(holder._array_by_period.item_by_period[periods.period(year)], sparse.SparseArray)
+    base.assert_near(simulation.calculate('irpp'), scenario.new_simulation().calculate('irpp'),
+        absolute_error_margin = 0.01)
+
+
+if __name__ == '__main__':
+    import logging
+    import sys
+
+    logging.basicConfig(level = logging.ERROR, stream = sys.stdout)
+    test_sparse_arrays()
+    test_sparse_cerfa_fields()
@@ -0,0 +1,70 @@
+# -*- coding: utf-8 -*-
+
+import numpy as np
+from openfisca_core import periods
+
+from openfisca_france import surveys
+from openfisca_france.tests import base
+
+
+def new_tables():
+    # A couple with 2 children, and a single person, with arbitrary ids.
+    return dict(
+        individus = dict(
+            age = np.array([40, 38, 10, 45, 8]),
+            idfam = np.array([30, 30, 30, 7, 30]),
+            idfoy = np.array([30, 30, 30, 7, 30]),
+            idmen = np.array([30, 30, 30, 7, 30]),
+            quifam = np.array([0, 1, 2, 0, 2]),
+            quifoy = np.array([0, 1, 2, 0, 2]),
+            quimen = np.array([0, 1, 2, 0, 2]),
+            salaire_imposable = np.array([30000, 20000, 0, 25000, 0]),
+            ),
+        menages = dict(
+            idmen = np.array([30, 7]),
+            loyer = np.array([6000, 4800]),
+            ),
+        )
+
+
+def test_get_roles():
+    entity = base.tax_benefit_system.entity_class_by_key_plural['familles']
+    role = surveys.get_roles(entity, np.array([1, 1, 1, 0, 1]), np.array([0, 1, 2, 0, 2]), 2)
+    assert (role == [0, 1, 2, 0, 3]).all()
+
+
+def test_new_simulation():
+    year = 2013
+    simulation = surveys.new_simulation(base.tax_benefit_system, periods.period(year), new_tables())
+    assert simulation.entity_by_key_plural['familles'].count == 2
+    assert (simulation.calculate('idmen') == [1, 1, 1, 0, 1]).all()
+    assert (simulation.calculate('loyer') == [4800, 6000]).all()
+    assert (simulation.calculate('quifoy') == [0, 1, 2, 0, 3]).all()
+
+    single_simulation = base.tax_benefit_system.new_scenario().init_single_entity(
+        period = year,
+        parent1 = dict(age = 45, salaire_imposable = 25000),
+        ).new_simulation()
+    base.assert_near(simulation.calculate('irpp')[0], single_simulation.calculate('irpp')[0],
+        absolute_error_margin = 0.01)
+
+
+def test_new_simulation_invalid_tables():
+    tables = new_tables()
+    tables['individus']['quifam'] = np.array([0, 0, 2, 0, 2])
+    try:
+        surveys.new_simulation(base.tax_benefit_system, periods.period(2013), tables)
+    except ValueError:
+        pass
+    else:
+        raise AssertionError(u'A famille with 2 persons of role 0 must be rejected')
+
+
+if __name__ == '__main__':
+    import logging
+    import sys
+
+    logging.basicConfig(level = logging.ERROR, stream = sys.stdout)
+    test_get_roles()
+    test_new_simulation()
+    test_new_simulation_invalid_tables()
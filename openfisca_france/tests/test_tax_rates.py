@@ -1,5 +1,7 @@
 # -*- coding: utf-8 -*-
 
+from __future__ import division
+
 from openfisca_core.rates import average_rate, marginal_rate
 from openfisca_france.tests import base
 
@@ -44,9 +46,40 @@ def test_marginal_tax_rate():
         ) == 0).all()
 
 
+def test_marginal_tax_rate_by_finite_difference():
+    year = 2013
+    scenario = base.tax_benefit_system.new_scenario().init_single_entity(
+        axes = [
+            dict(
+                count = 2,
+                name = 'salaire_imposable',
+                max = 21200,
+                min = 20000,
+                ),
+            ],
+        period = year,
+        parent1 = dict(age_en_mois = 40 * 12 + 6),
+        )
+    simulation = scenario.new_simulation()
+    revdisp = simulation.calculate('revdisp')
+    holder = simulation.get_or_new_holder('salaire_imposable')
+    array_by_period = dict(
+        (period, array.copy())
+        for period, array in holder._array_by_period.iteritems()
+        )
+    # salaire_imposable is stored by month: 100 € more each month is 1200 € more in the year.
+    marginal_rate = simulation.calculate_marginal_rate('revdisp', 'salaire_imposable', variation = 100)
+    base.assert_near(marginal_rate[0], 1 - (revdisp[1] - revdisp[0]) / 1200, absolute_error_margin = 0.01)
+    # The inputs of the simulation itself are not modified.
+    assert sorted(holder._array_by_period) == sorted(array_by_period)
+    for period, array in array_by_period.iteritems():
+        assert (holder._array_by_period[period] == array).all()
+    base.assert_near(scenario.new_simulation().calculate('revdisp'), revdisp, absolute_error_margin = 0)
+
 if __name__ == '__main__':
     import logging
     import sys
     logging.basicConfig(level = logging.ERROR, stream = sys.stdout)
     test_marginal_tax_rate()
+    test_marginal_tax_rate_by_finite_difference()
     test_average_tax_rate()
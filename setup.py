@@ -29,12 +29,6 @@ setup(
         ('share/openfisca/openfisca-france', ['CHANGELOG.md', 'LICENSE', 'README.md']),
         ],
     extras_require = {
-        'inversion_revenus': [
-            'scipy >= 0.12',
-            ],
-        'de_net_a_brut': [
-            'scipy >= 0.12',
-            ],
         'taxipp': [
             'pandas >= 0.13',
             ],